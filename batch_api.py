@@ -0,0 +1,268 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pocketflow import Flow
+from flow import (
+    ExtractTopicsAndQuestions, DedupeQuestions, ProcessContent, FanOutAnswers, GenerateHTML,
+    build_extraction_prompt, build_processing_prompt, build_packed_processing_prompt
+)
+from utils.batch import shard_key
+from utils.call_llm import use_provider, use_responses, prompt_key, get_model_for_task, get_openai_sdk_client
+from utils.files import write_json
+from utils.normalize import normalize_video_info
+from utils.youtube_processor import get_video_info
+
+logger = logging.getLogger(__name__)
+
+BATCH_POLL_SECONDS = float(os.getenv("BATCH_POLL_SECONDS", "60"))
+BATCH_COMPLETION_WINDOW = os.getenv("BATCH_COMPLETION_WINDOW", "24h")
+# Providers with an OpenAI-style files + batches API
+BATCH_PROVIDERS = ("openai", "compatible")
+# Batch statuses after which nothing more will come back
+FINISHED_STATUSES = ("completed", "expired", "failed", "cancelled")
+# Stages of a job, in order
+STAGES = ("fetch", "extract", "answer", "render", "done")
+
+def job_name(urls, provider):
+    """Default job name: stable for the same URLs and provider, so rerunning a command resumes it"""
+    digest = hashlib.sha1("\n".join(sorted(set(urls))).encode("utf-8")).hexdigest()[:10]
+    return f"{digest}-{provider}"
+
+def parse_batch_output(text):
+    """{custom_id: response text} for the successful lines of a batch output file"""
+    responses = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        response = entry.get("response") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            logger.warning(f"Batch request {entry.get('custom_id')} failed: {entry.get('error') or response.get('status_code')}")
+            continue
+        responses[entry["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return responses
+
+class BatchJob:
+    """
+    Summarize many videos through the provider's batch API instead of live calls.
+
+    Batch endpoints are slower to answer (up to the completion window) but
+    have far higher throughput limits and cost less. A job moves through:
+
+      fetch    transcripts are fetched and normalized once
+      extract  one batch with every video's extraction prompt
+      answer   one batch with every answering prompt, topics packed as ProcessContent packs them
+      render   the regular nodes run on the batch responses and write the HTML
+
+    Each step is recorded in state_dir/state.json, so a restarted process
+    picks up the same batches instead of submitting new ones. Prompts whose
+    batch request failed, or that the nodes only ask after a batch (e.g. a
+    packed response that had to be split), become ordinary calls.
+
+    fit overrides the prompt fitting options (see utils.fitting) for every
+    stage; resume a job with the same fit, or its prompts won't match.
+    """
+    def __init__(self, urls, provider, output_dir="output", name=None, normalize=None, fit=None):
+        if provider not in BATCH_PROVIDERS:
+            raise ValueError(f"Batch mode needs a provider with a batch API: {', '.join(BATCH_PROVIDERS)}")
+        self.urls = list(urls)
+        self.provider = provider
+        self.output_dir = output_dir
+        self.normalize = normalize
+        self.fit = fit
+        self.name = name or job_name(self.urls, provider)
+        self.state_dir = os.path.join(output_dir, "batch-api", self.name)
+        os.makedirs(os.path.join(self.state_dir, "videos"), exist_ok=True)
+        self.state = self._load_state()
+
+    def _path(self, *parts):
+        return os.path.join(self.state_dir, *parts)
+
+    def _load_state(self):
+        if not os.path.exists(self._path("state.json")):
+            return {"provider": self.provider, "urls": self.urls, "stage": "fetch",
+                    "videos": {}, "batches": {}, "outputs": {}}
+        with open(self._path("state.json"), encoding="utf-8") as f:
+            state = json.load(f)
+        if state["provider"] != self.provider:
+            raise ValueError(f"{self.state_dir} belongs to a {state['provider']} job")
+        return state
+
+    def _save(self):
+        write_json(self._path("state.json"), self.state)
+
+    @property
+    def stage(self):
+        return self.state["stage"]
+
+    def _videos(self):
+        """(key, video_info) for every video whose transcript was fetched"""
+        for key, video in self.state["videos"].items():
+            if "file" in video:
+                with open(self._path("videos", video["file"]), encoding="utf-8") as f:
+                    yield key, json.load(f)
+
+    def _shared(self, video_info, **extra):
+        """Shared store for running the nodes on one video"""
+        shared = {"video_info": video_info, **extra}
+        if self.fit:
+            shared["fit"] = self.fit
+        return shared
+
+    def _responses(self, stage):
+        path = self._path(f"responses-{stage}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def fetch(self):
+        """Fetch and normalize every transcript not fetched yet"""
+        for url in self.state["urls"]:
+            key = shard_key(url)
+            if key in self.state["videos"]:
+                continue
+            video_info = get_video_info(url)
+            if "error" in video_info:
+                logger.warning(f"Skipping {url}: {video_info['error']}")
+                self.state["videos"][key] = {"url": url, "error": video_info["error"]}
+                continue
+            video_info, _ = normalize_video_info(video_info, self.normalize)
+            record = {k: video_info.get(k) for k in ("title", "video_id", "thumbnail_url", "transcript")}
+            write_json(self._path("videos", f"{key}.json"), record)
+            self.state["videos"][key] = {"url": url, "file": f"{key}.json"}
+        self._save()
+
+    def requests(self, stage):
+        """{prompt_key: (task, prompt)} for a batch stage; identical prompts are sent once"""
+        requests = {}
+        if stage == "extract":
+            for _, video_info in self._videos():
+                # The node's prep fits the transcript to the model, so these are the prompts it will send
+                data = ExtractTopicsAndQuestions().prep(self._shared(video_info))
+                for transcript in data["transcripts"]:
+                    prompt = build_extraction_prompt(data["title"], transcript)
+                    requests[prompt_key(prompt)] = ("analysis", prompt)
+            return requests
+
+        # The answering prompts are exactly the ones ProcessContent will send for the extracted topics
+        extracted = self._responses("extract")
+        for _, video_info in self._videos():
+            shared = self._shared(video_info)
+            extract = ExtractTopicsAndQuestions()
+            extract >> DedupeQuestions()
+            with use_responses(extracted):
+                Flow(start=extract).run(shared)
+            transcript = video_info.get("transcript", "")
+            for item in ProcessContent().prep(shared):
+                if "topics" in item:
+                    prompt = build_packed_processing_prompt(item["topics"], transcript)
+                else:
+                    prompt = build_processing_prompt(item["topic"].title, item["topic"].questions, transcript)
+                requests[prompt_key(prompt)] = ("simplification", prompt)
+        return requests
+
+    def submit(self, stage, requests):
+        """Upload a stage's requests as a batch input file and create the batch"""
+        client = get_openai_sdk_client(self.provider)
+        lines = [json.dumps({
+            "custom_id": key,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": get_model_for_task(self.provider, task),
+                     "messages": [{"role": "user", "content": prompt}]},
+        }) for key, (task, prompt) in requests.items()]
+        input_path = self._path(f"{stage}-input.jsonl")
+        with open(input_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(input_path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(input_file_id=input_file.id, endpoint="/v1/chat/completions",
+                                      completion_window=BATCH_COMPLETION_WINDOW,
+                                      metadata={"job": self.name, "stage": stage})
+        self.state["batches"][stage] = {"id": batch.id, "input_file_id": input_file.id,
+                                        "status": batch.status, "requests": len(lines)}
+        self._save()
+        logger.info(f"Submitted {stage} batch {batch.id} with {len(lines)} requests")
+
+    def poll(self, stage):
+        """Refresh a stage's batch status; once it finished, download its responses. Returns whether it finished."""
+        info = self.state["batches"][stage]
+        client = get_openai_sdk_client(self.provider)
+        if info["status"] not in FINISHED_STATUSES:
+            batch = client.batches.retrieve(info["id"])
+            info["status"] = batch.status
+            info["output_file_id"] = getattr(batch, "output_file_id", None)
+            self._save()
+            if batch.status not in FINISHED_STATUSES:
+                logger.info(f"{stage.capitalize()} batch {info['id']} is {batch.status}")
+                return False
+
+        responses = {}
+        if info.get("output_file_id"):
+            responses = parse_batch_output(client.files.content(info["output_file_id"]).text)
+        elif info["status"] == "failed":
+            raise RuntimeError(f"{stage.capitalize()} batch {info['id']} failed")
+        write_json(self._path(f"responses-{stage}.json"), responses)
+        logger.info(f"{stage.capitalize()} batch {info['id']} {info['status']}: "
+                    f"{len(responses)} of {info['requests']} requests answered")
+        return True
+
+    def render(self):
+        """Run the topic flow for every video on the batch responses and write its HTML"""
+        responses = {**self._responses("extract"), **self._responses("answer")}
+        for key, video_info in self._videos():
+            if key in self.state["outputs"]:
+                continue
+            extract = ExtractTopicsAndQuestions(max_retries=2, wait=10)
+            extract >> DedupeQuestions() >> ProcessContent(max_retries=2, wait=10) >> FanOutAnswers() >> GenerateHTML()
+            shared = self._shared(video_info, output_dir=self.output_dir)
+            try:
+                with use_provider(self.provider), use_responses(responses):
+                    Flow(start=extract).run(shared)
+            except Exception as e:
+                logger.error(f"Rendering {key} failed: {e}")
+                self.state["videos"][key]["error"] = str(e)
+                continue
+            self.state["outputs"][key] = shared["output_file"]
+            self._save()
+
+    def step(self):
+        """Advance the job as far as it can go without waiting; returns the stage it reached"""
+        if self.stage == "fetch":
+            self.fetch()
+            self.state["stage"] = "extract"
+        while self.stage in ("extract", "answer"):
+            stage = self.stage
+            if stage not in self.state["batches"]:
+                # Prompts are fitted to the job provider's models, as the nodes will fit them
+                with use_provider(self.provider):
+                    requests = self.requests(stage)
+                if requests:
+                    self.submit(stage, requests)
+                    return stage
+                self.state["batches"][stage] = {"id": None, "status": "completed", "requests": 0}
+            if self.state["batches"][stage]["id"] and not self.poll(stage):
+                return stage
+            self.state["stage"] = STAGES[STAGES.index(stage) + 1]
+            self._save()
+        if self.stage == "render":
+            self.render()
+            self.state["stage"] = "done"
+            self._save()
+        return self.stage
+
+def run_batch_job(job, poll_interval=BATCH_POLL_SECONDS, once=False):
+    """
+    Step a batch job until it is done; returns {video key: HTML path}.
+
+    once advances the job as far as possible and returns, for running from
+    cron: each run polls the pending batch and moves on when it finishes.
+    """
+    while True:
+        stage = job.step()
+        if stage == "done" or once:
+            return job.state["outputs"]
+        time.sleep(poll_interval)
@@ -1,11 +1,29 @@
 from typing import List, Dict, Any, Tuple
 import yaml
 import logging
+import asyncio
 import os
 import re
-from pocketflow import Node, BatchNode, Flow
-from utils.call_llm import call_llm
+import time
+from itertools import zip_longest
+from pocketflow import Node, BatchNode, Flow, AsyncNode, AsyncParallelBatchNode, AsyncFlow
+from utils.call_llm import call_llm, get_current_provider, get_provider_for_task, get_model_for_task
 from utils.youtube_processor import get_video_info
+from utils.caption_files import load_transcript_file
+from utils.normalize import normalize_video_info
+from utils.chapters import build_chapters, format_timestamp, timestamp_url
+from utils.strategy import (
+    plan_strategy, strategy_options, split_transcript, pack_topics,
+    PROCESS_OUTPUT_TOKEN_BUDGET, ANSWER_OUTPUT_TOKENS
+)
+from utils.dedup import dedup_options, find_duplicates
+from utils.topics import Question, Topic, assign_ids, ensure_ids
+from utils.cascade import (
+    cascade_options, cascade_active, run_cascade, record_escalations,
+    validate_answered_topic, validate_extracted_topics
+)
+from utils.fitting import fit_transcript, PromptTooLargeError
+from utils.deadline import DeadlineExceeded, retry_allowed, sleep_before_retry
 from utils.html_generator import html_generator
 
 # Set up logging
@@ -15,6 +33,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Chapter summaries that may be in flight at once in chapter mode
+CHAPTER_CONCURRENCY = int(os.getenv("CHAPTER_CONCURRENCY", "8"))
+
+# Errors that another attempt can't fix, so nodes don't retry them
+NON_RETRYABLE_ERRORS = (PromptTooLargeError, DeadlineExceeded)
+
 def sanitize_filename(filename):
     """Sanitize a string to be safe for use as a filename"""
     # Remove or replace characters that are invalid in filenames
@@ -32,9 +56,319 @@ def sanitize_filename(filename):
         sanitized = "youtube_video"
     return sanitized
 
+def fit_prompt_transcript(shared, stage, task, build, transcript, chunkable=False):
+    """
+    The transcript(s) to build stage's prompt from with build(transcript), so
+    the prompt fits task's model under the run's fit policy (shared["fit"]
+    overrides it). Anything other than an unchanged fit is noted in
+    shared["prompt_fit"][stage].
+    """
+    provider = get_provider_for_task(task)
+    plan = fit_transcript(build, transcript, provider, get_model_for_task(provider, task),
+                          shared.get("fit"), chunkable=chunkable)
+    if plan["action"] != "fits":
+        report = {key: plan[key] for key in ("action", "tokens", "limit", "model")}
+        report["parts"] = len(plan["transcripts"])
+        shared.setdefault("prompt_fit", {})[stage] = report
+        logger.warning(f"{stage.capitalize()} prompt of about {plan['tokens']} tokens is over the "
+                       f"{plan['limit']}-token budget; {plan['action']} ({report['parts']} part(s), {plan['model']})")
+    return plan["transcripts"]
+
+def build_extraction_prompt(title, transcript):
+    """Build the prompt ExtractTopicsAndQuestions sends for a transcript"""
+    return f"""
+You are an expert content analyzer. Given a YouTube video transcript, identify at most 5 most interesting topics discussed and generate at most 3 most thought-provoking questions for each topic.
+These questions don't need to be directly asked in the video. It's good to have clarification questions.
+
+VIDEO TITLE: {title}
+
+TRANSCRIPT:
+{transcript}
+
+Format your response in YAML:
+
+```yaml
+topics:
+  - title: |
+        First Topic Title
+    questions:
+      - |
+        Question 1 about first topic?
+      - |
+        Question 2 ...
+  - title: |
+        Second Topic Title
+    questions:
+        ...
+```
+        """
+
+def _question_lines(questions):
+    """Prompt lines for questions: "- [id] text" for Questions with IDs, "- text" for plain strings"""
+    return "\n".join(f"- [{q.id}] {q.original}" if isinstance(q, Question) and q.id else f"- {q}"
+                     for q in questions)
+
+def _question_example(questions, index, indent):
+    """YAML example entry echoing question index (with its id when it has one)"""
+    q = questions[index] if len(questions) > index else ""
+    if isinstance(q, Question):
+        id_line = f"{indent}- id: {q.id}\n{indent}  " if q.id else f"{indent}- "
+        return f"{id_line}original: |\n{indent}      {q.original}"
+    return f"{indent}- original: |\n{indent}      {q}"
+
+def build_processing_prompt(topic_title, questions, transcript):
+    """
+    Build the prompt ProcessContent sends for one topic and its questions.
+
+    questions are Question objects (their IDs go to the LLM and come back in
+    the response) or plain strings.
+    """
+    ids = any(isinstance(q, Question) and q.id for q in questions)
+    id_rule = "\n\nCopy each question's id (in square brackets above) into your response unchanged." if ids else ""
+    return f"""You are an expert content processor. Given a topic and questions from a YouTube video, rephrase the topic title and questions to be clearer and more engaging, and provide concise, informative answers.
+
+TOPIC: {topic_title}
+
+QUESTIONS:
+{_question_lines(questions)}
+
+TRANSCRIPT EXCERPT:
+{transcript}
+
+For topic title and questions:
+1. Keep them engaging and clear, but concise
+2. Make them accessible to a general adult audience
+
+For your answers:
+1. Format them using HTML with <b> and <i> tags for highlighting. 
+2. Prefer lists with <ol> and <li> tags. Ideally, <li> followed by <b> for the key points.
+3. Define technical terms clearly but don't oversimplify (e.g., "<b>Quantum computing</b> uses quantum mechanical phenomena to process information exponentially faster than classical computers")
+4. Provide comprehensive yet concise explanations suitable for an educated audience
+5. Focus on clarity and accuracy rather than simplification{id_rule}
+
+Format your response in YAML:
+
+```yaml
+rephrased_title: |
+    Clear and engaging topic title
+questions:
+{_question_example(questions, 0, "  ")}
+    rephrased: |
+        Clear, engaging question
+    answer: |
+        Comprehensive, well-structured answer with proper technical depth
+{_question_example(questions, 1, "  ")}
+    ...
+```
+        """
+
+def build_packed_processing_prompt(topics, transcript):
+    """Build the prompt ProcessContent sends for several Topics at once; topic and question IDs round-trip"""
+    listing = "\n\n".join(f"TOPIC [{topic.id}]: {topic.title}\nQUESTIONS:\n{_question_lines(topic.questions)}"
+                           for topic in topics)
+    return f"""You are an expert content processor. Given several topics and questions from a YouTube video, rephrase each topic title and its questions to be clearer and more engaging, and provide concise, informative answers.
+
+{listing}
+
+TRANSCRIPT EXCERPT:
+{transcript}
+
+For topic titles and questions:
+1. Keep them engaging and clear, but concise
+2. Make them accessible to a general adult audience
+
+For your answers:
+1. Format them using HTML with <b> and <i> tags for highlighting. 
+2. Prefer lists with <ol> and <li> tags. Ideally, <li> followed by <b> for the key points.
+3. Define technical terms clearly but don't oversimplify (e.g., "<b>Quantum computing</b> uses quantum mechanical phenomena to process information exponentially faster than classical computers")
+4. Provide comprehensive yet concise explanations suitable for an educated audience
+5. Focus on clarity and accuracy rather than simplification
+
+Answer all {len(topics)} topics, in the same order, copying every topic's and question's id (in square brackets above) unchanged. Format your response in YAML:
+
+```yaml
+topics:
+  - id: {topics[0].id}
+    rephrased_title: |
+        Clear and engaging topic title
+    questions:
+{_question_example(topics[0].questions, 0, "      ")}
+        rephrased: |
+            Clear, engaging question
+        answer: |
+            Comprehensive, well-structured answer with proper technical depth
+      ...
+  - id: {topics[1].id if len(topics) > 1 else '...'}
+    ...
+```
+"""
+
+def build_chapter_prompt(video_title, chapter_title, transcript):
+    """Build the prompt SummarizeChapters sends for one chapter"""
+    title_line = f"CHAPTER TITLE: {chapter_title}" if chapter_title else "CHAPTER TITLE: (none - propose a short one)"
+    return f"""You are an expert content processor. Given one chapter of a YouTube video, write a clear chapter title, then pick at most 3 of the most thought-provoking questions about this chapter and answer them concisely.
+
+VIDEO TITLE: {video_title}
+{title_line}
+
+CHAPTER TRANSCRIPT:
+{transcript}
+
+For the title and questions:
+1. Keep them engaging and clear, but concise
+2. Make them accessible to a general adult audience
+
+For your answers:
+1. Format them using HTML with <b> and <i> tags for highlighting.
+2. Prefer lists with <ol> and <li> tags. Ideally, <li> followed by <b> for the key points.
+3. Only use what is said in this chapter
+
+Format your response in YAML:
+
+```yaml
+rephrased_title: |
+    Clear and engaging chapter title
+questions:
+  - original: |
+        Question about this chapter?
+    rephrased: |
+        Clear, engaging question
+    answer: |
+        Comprehensive, well-structured answer
+```
+"""
+
+def build_combined_prompt(title, transcript, max_topics=5, part=None):
+    """
+    Build the prompt that extracts topics and answers their questions in one call.
+
+    part is (index, count) when the transcript is one chunk of a longer video.
+    """
+    source = "a YouTube video transcript"
+    if part:
+        source = f"part {part[0]} of {part[1]} of a long YouTube video's transcript"
+    return f"""You are an expert content analyzer and processor. Given {source}, identify at most {max_topics} most interesting topics discussed and at most 3 most thought-provoking questions for each topic, then answer every question concisely.
+These questions don't need to be directly asked in the video. It's good to have clarification questions.
+
+VIDEO TITLE: {title}
+
+TRANSCRIPT:
+{transcript}
+
+For topic titles and questions:
+1. Keep them engaging and clear, but concise
+2. Make them accessible to a general adult audience
+
+For your answers:
+1. Format them using HTML with <b> and <i> tags for highlighting.
+2. Prefer lists with <ol> and <li> tags. Ideally, <li> followed by <b> for the key points.
+3. Provide comprehensive yet concise explanations suitable for an educated audience
+
+Format your response in YAML:
+
+```yaml
+topics:
+  - title: |
+        Clear and engaging topic title
+    questions:
+      - original: |
+            Question about this topic?
+        rephrased: |
+            Clear, engaging question
+        answer: |
+            Comprehensive, well-structured answer
+  - title: |
+        Second Topic Title
+    questions:
+        ...
+```
+"""
+
+def build_selection_prompt(title, candidates, max_topics=5):
+    """Build the prompt SelectTopics sends to pick the best Topics found across chunks"""
+    listing = "\n".join(
+        f"{i}. {topic.title.strip()}: " + "; ".join((q.rephrased or q.original).strip() for q in topic.questions)
+        for i, topic in enumerate(candidates, 1)
+    )
+    return f"""You are an expert content analyzer. The topics below were found in consecutive parts of one long YouTube video. Pick the {max_topics} most interesting topics for a summary of the whole video, skipping topics that repeat one already picked.
+
+VIDEO TITLE: {title}
+
+TOPICS:
+{listing}
+
+Format your response in YAML, listing the numbers of the topics you picked:
+
+```yaml
+selected:
+  - 3
+  - 1
+```
+"""
+
+def parse_answered_topics(response, max_topics=5, prefix=""):
+    """Topics with answered questions from a build_combined_prompt response, with IDs starting with prefix"""
+    # Extract YAML content
+    yaml_content = response.split("```yaml")[1].split("```")[0].strip() if "```yaml" in response else response
+    
+    parsed = yaml.safe_load(yaml_content)
+    
+    if parsed is None:
+        raise ValueError("Failed to parse YAML response from LLM - parsed result is None")
+    
+    topics = []
+    for topic in parsed.get("topics", [])[:max_topics]:
+        title = (topic.get("title") or "").strip()
+        questions = [
+            Question(None, (q.get("original") or "").strip(),
+                     (q.get("rephrased") or q.get("original") or "").strip(), q.get("answer") or "")
+            for q in topic.get("questions", [])
+        ]
+        topics.append(Topic(None, title, questions, rephrased_title=title))
+    return assign_ids(topics, prefix)
+
+def _should_retry(node, attempt, error):
+    """Whether node gets another attempt after error on attempt (counted from 0)"""
+    return (attempt < node.max_retries - 1 and not isinstance(error, NON_RETRYABLE_ERRORS)
+            and retry_allowed(node.wait))
+
+class RetryNode(Node):
+    """
+    Node whose retries respect the run's deadline (see utils.deadline).
+
+    A retry is only attempted when waiting for it leaves time for the attempt,
+    the wait ends early if the run is cancelled, and NON_RETRYABLE_ERRORS go
+    to the fallback at once. The attempt counter is local to each call, so
+    items run concurrently on one node don't share it.
+    """
+    def _exec(self, prep_res):
+        for attempt in range(self.max_retries):
+            try:
+                return self.exec(prep_res)
+            except Exception as e:
+                if not _should_retry(self, attempt, e):
+                    return self.exec_fallback(prep_res, e)
+                if self.wait > 0:
+                    sleep_before_retry(self.wait)
+
+class RetryBatchNode(BatchNode, RetryNode):
+    """BatchNode with RetryNode's retries for each item"""
+
+class AsyncRetryNode(AsyncNode):
+    """AsyncNode with RetryNode's retries"""
+    async def _exec(self, prep_res):
+        for attempt in range(self.max_retries):
+            try:
+                return await self.exec_async(prep_res)
+            except Exception as e:
+                if not _should_retry(self, attempt, e):
+                    return await self.exec_fallback_async(prep_res, e)
+                if self.wait > 0:
+                    await asyncio.to_thread(sleep_before_retry, self.wait)
+
 # Define the specific nodes for the YouTube Content Processor
 
-class ProcessYouTubeURL(Node):
+class ProcessYouTubeURL(RetryNode):
     """Process YouTube URL to extract video information"""
     def prep(self, shared):
         """Get URL from shared"""
@@ -48,59 +382,216 @@ class ProcessYouTubeURL(Node):
         logger.info(f"Processing YouTube URL: {url}")
         video_info = get_video_info(url)
         
-        if "error" in video_info:
+        # Permanent failures are raised in post, which isn't retried
+        if "error" in video_info and not video_info.get("permanent"):
             raise ValueError(f"Error processing video: {video_info['error']}")
         
         return video_info
     
     def post(self, shared, prep_res, exec_res):
         """Store video information in shared"""
+        if "error" in exec_res:
+            raise ValueError(f"Error processing video: {exec_res['error']}")
         shared["video_info"] = exec_res
         logger.info(f"Video title: {exec_res.get('title')}")
         logger.info(f"Transcript length: {len(exec_res.get('transcript', ''))}")
         return "default"
 
-class ExtractTopicsAndQuestions(Node):
+class LoadTranscriptFile(Node):
+    """Load video information from a local caption file instead of YouTube"""
+    def prep(self, shared):
+        """Get transcript file path from shared"""
+        return shared.get("transcript_file", "")
+    
+    def exec(self, path):
+        """Parse the caption file"""
+        if not path:
+            raise ValueError("No transcript file provided")
+        
+        logger.info(f"Reading transcript file: {path}")
+        video_info = load_transcript_file(path)
+        
+        if "error" in video_info:
+            raise ValueError(f"Error reading transcript: {video_info['error']}")
+        
+        return video_info
+    
+    def post(self, shared, prep_res, exec_res):
+        """Store video information in shared"""
+        shared["video_info"] = exec_res
+        logger.info(f"Video title: {exec_res.get('title')}")
+        logger.info(f"Transcript length: {len(exec_res.get('transcript', ''))}")
+        return "default"
+
+class NormalizeTranscript(Node):
+    """Clean up caption noise before the transcript is sent to the LLM"""
+    def prep(self, shared):
+        """Get video info and normalization options from shared"""
+        return shared.get("video_info", {}), shared.get("normalize")
+    
+    def exec(self, prep_res):
+        """Strip annotations, repeated fragments and (optionally) fillers"""
+        video_info, options = prep_res
+        return normalize_video_info(video_info, options)
+    
+    def post(self, shared, prep_res, exec_res):
+        """Replace the transcript and record how many tokens were saved"""
+        video_info, report = exec_res
+        shared["video_info"] = video_info
+        shared["normalization"] = report
+        if report["enabled"]:
+            logger.info(f"Normalized transcript: {report['tokens_before']} -> {report['tokens_after']} tokens "
+                        f"({report['reduction']:.0%} fewer)")
+        return "default"
+
+class ChooseStrategy(Node):
+    """Pick how to summarize the video from its transcript size and the models' context limits"""
+    def prep(self, shared):
+        """Get the transcript and any strategy overrides"""
+        transcript = shared.get("video_info", {}).get("transcript", "")
+        return transcript, shared.get("strategy")
+    
+    def exec(self, data):
+        """Count tokens and choose"""
+        transcript, options = data
+        # Tasks routed with {TASK}_PROVIDER are planned against their own provider's model
+        return plan_strategy(transcript, get_current_provider(), options)
+    
+    def post(self, shared, prep_res, exec_res):
+        """Store the plan and branch to its strategy"""
+        shared["strategy_plan"] = exec_res
+        logger.info(f"Strategy {exec_res['strategy']} ({exec_res['reason']}): "
+                    f"{exec_res['transcript_tokens']} transcript tokens, {exec_res['context_tokens']} context")
+        return exec_res["strategy"]
+
+class SummarizeInOneCall(RetryNode):
+    """Extract topics and answer their questions in a single call (short videos)"""
+    def prep(self, shared):
+        """Get transcript and title from video_info, with the transcript fitted to the model's context"""
+        video_info = shared.get("video_info", {})
+        title = video_info.get("title", "")
+        transcript, = fit_prompt_transcript(shared, "single", "analysis",
+                                            lambda text: build_combined_prompt(title, text),
+                                            video_info.get("transcript", ""))
+        return {"transcript": transcript, "title": title}
+    
+    def exec(self, data):
+        """Extract and answer using LLM"""
+        prompt = build_combined_prompt(data["title"], data["transcript"])
+        response = call_llm(prompt, task="analysis")
+        return parse_answered_topics(response)
+    
+    def post(self, shared, prep_res, exec_res):
+        """Store answered topics in shared"""
+        shared["topics"] = exec_res
+        total_questions = sum(len(topic.questions) for topic in exec_res)
+        logger.info(f"Extracted and answered {len(exec_res)} topics with {total_questions} questions in one call")
+        return "default"
+
+class SummarizeChunks(RetryBatchNode):
+    """Extract and answer topics for each chunk of a very long transcript (the map step)"""
+    def prep(self, shared):
+        """Split the transcript into chunks that fit the models' context"""
+        video_info = shared.get("video_info", {})
+        chunk_tokens = shared.get("strategy_plan", {}).get("chunk_tokens") or strategy_options()["chunk_tokens"]
+        chunks = split_transcript(video_info.get("transcript", ""), chunk_tokens)
+        title = video_info.get("title", "")
+        # Chunks are sized from the strategy's estimate; one still over the analysis model's
+        # budget is routed, split further, trimmed or fails under the fit policy like any prompt
+        build = lambda text: build_combined_prompt(title, text, max_topics=3, part=(len(chunks), len(chunks)))
+        chunks = [piece for i, chunk in enumerate(chunks, 1)
+                  for piece in fit_prompt_transcript(shared, f"chunk {i}", "analysis", build, chunk, chunkable=True)]
+        return [{"title": title, "transcript": chunk, "part": (i, len(chunks))}
+                for i, chunk in enumerate(chunks, 1)]
+    
+    def exec(self, item):
+        """Summarize one chunk using LLM"""
+        prompt = build_combined_prompt(item["title"], item["transcript"], max_topics=3, part=item["part"])
+        response = call_llm(prompt, task="analysis")
+        # IDs are prefixed by chunk so they stay unique across chunks
+        return parse_answered_topics(response, max_topics=3, prefix=f"p{item['part'][0]}.")
+    
+    def post(self, shared, prep_res, exec_res_list):
+        """Store every chunk's topics, in transcript order"""
+        shared["candidate_topics"] = [topic for topics in exec_res_list for topic in topics]
+        logger.info(f"Summarized {len(exec_res_list)} chunks into {len(shared['candidate_topics'])} candidate topics")
+        return "default"
+
+class SelectTopics(RetryNode):
+    """Pick the best topics found across chunks (the reduce step)"""
+    def prep(self, shared):
+        """Get candidate topics, with repeated titles dropped"""
+        seen, candidates = set(), []
+        for topic in shared.get("candidate_topics", []):
+            key = topic.title.casefold()
+            if key not in seen:
+                seen.add(key)
+                candidates.append(topic)
+        return shared.get("video_info", {}).get("title", ""), candidates
+    
+    def exec(self, data):
+        """Ask the LLM which topics to keep, unless there are few enough already"""
+        title, candidates = data
+        if len(candidates) <= 5:
+            return candidates
+        response = call_llm(build_selection_prompt(title, candidates), task="analysis")
+        yaml_content = response.split("```yaml")[1].split("```")[0].strip() if "```yaml" in response else response
+        selected = (yaml.safe_load(yaml_content) or {}).get("selected", [])
+        indexes = sorted({int(i) - 1 for i in selected if 0 < int(i) <= len(candidates)})[:5]
+        if not indexes:
+            raise ValueError("LLM selected no topics")
+        # Keep the video's order
+        return [candidates[i] for i in indexes]
+    
+    def post(self, shared, prep_res, exec_res):
+        """Store the selected topics"""
+        shared["topics"] = exec_res
+        logger.info(f"Selected {len(exec_res)} of {len(prep_res[1])} candidate topics")
+        return "default"
+
+class ExtractTopicsAndQuestions(RetryNode):
     """Extract interesting topics and generate questions from the video transcript"""
+    # Cascade options for the run (shared["cascade"] overrides) and its (items, escalated)
+    cascade = cascade_options()
+    escalations = None
+    
     def prep(self, shared):
         """Get transcript and title from video_info"""
+        self.cascade = cascade_options(shared.get("cascade"))
+        self.escalations = None
         video_info = shared.get("video_info", {})
         transcript = video_info.get("transcript", "")
         title = video_info.get("title", "")
-        return {"transcript": transcript, "title": title}
+        # Under the chunk policy, a transcript too long for the model is extracted in parts
+        transcripts = fit_prompt_transcript(shared, "extraction", "analysis",
+                                            lambda text: build_extraction_prompt(title, text), transcript,
+                                            chunkable=True)
+        return {"transcript": transcripts[0], "title": title, "transcripts": transcripts}
     
     def exec(self, data):
-        """Extract topics and generate questions using LLM"""
-        transcript = data["transcript"]
-        title = data["title"]
+        """Extract topics, on the fast model first when the analysis task cascades"""
+        if not cascade_active("analysis", self.cascade):
+            return self.extract(data)
+        results, escalated = run_cascade(
+            "analysis", [data], lambda items: [self.extract(item) for item in items],
+            lambda item, topics, options: validate_extracted_topics(topics, options), self.cascade)
+        self.escalations = (1, escalated)
+        return results[0]
+    
+    def extract(self, data):
+        """Extract topics and generate questions, with one call per transcript part"""
+        parts = [self.extract_part(data["title"], transcript)
+                 for transcript in data.get("transcripts") or [data["transcript"]]]
+        # Take topics from each part in turn, so every part of the video is represented
+        topics = [topic for row in zip_longest(*parts) for topic in row if topic is not None]
         
+        # IDs (t1, t1q1, ...) identify topics and questions from here on
+        return assign_ids(topics[:5])
+    
+    def extract_part(self, title, transcript):
+        """Extract topics and generate questions using LLM"""
         # Single prompt to extract topics and questions together
-        prompt = f"""
-You are an expert content analyzer. Given a YouTube video transcript, identify at most 5 most interesting topics discussed and generate at most 3 most thought-provoking questions for each topic.
-These questions don't need to be directly asked in the video. It's good to have clarification questions.
-
-VIDEO TITLE: {title}
-
-TRANSCRIPT:
-{transcript}
-
-Format your response in YAML:
-
-```yaml
-topics:
-  - title: |
-        First Topic Title
-    questions:
-      - |
-        Question 1 about first topic?
-      - |
-        Question 2 ...
-  - title: |
-        Second Topic Title
-    questions:
-        ...
-```
-        """
+        prompt = build_extraction_prompt(title, transcript)
         
         response = call_llm(prompt, task="analysis")
         
@@ -124,17 +615,7 @@ topics:
             raw_questions = topic.get("questions", [])
             
             # Create a complete topic with questions
-            result_topics.append({
-                "title": topic_title,
-                "questions": [
-                    {
-                        "original": q,
-                        "rephrased": "",
-                        "answer": ""
-                    }
-                    for q in raw_questions
-                ]
-            })
+            result_topics.append(Topic(None, topic_title, [Question(None, q) for q in raw_questions]))
         
         return result_topics
     
@@ -143,138 +624,354 @@ topics:
         shared["topics"] = exec_res
         
         # Count total questions
-        total_questions = sum(len(topic.get("questions", [])) for topic in exec_res)
+        total_questions = sum(len(topic.questions) for topic in exec_res)
         
         logger.info(f"Extracted {len(exec_res)} topics with {total_questions} questions")
+        if self.escalations:
+            record_escalations(shared, "analysis", *self.escalations)
+            if self.escalations[1]:
+                logger.info("Topic extraction escalated to the regular analysis model")
         return "default"
 
-class ProcessContent(BatchNode):
-    """Process each topic for rephrasing and answering"""
+class DedupeQuestions(Node):
+    """Find near-duplicate questions across topics so each is only answered once"""
     def prep(self, shared):
-        """Return list of topics for batch processing"""
-        topics = shared.get("topics", [])
+        """Get topics and any dedup overrides"""
+        return ensure_ids(shared.get("topics", [])), dedup_options(shared.get("dedup"))
+    
+    def exec(self, data):
+        """Cluster questions by shingle similarity; returns [(topic, position, question, representative)]"""
+        topics, options = data
+        if options["policy"] == "off":
+            return []
+        located = [(topic, position, q) for topic in topics for position, q in enumerate(topic.questions)]
+        representatives = find_duplicates([q.original for _, _, q in located], options["threshold"])
+        return [(topic, position, q, located[rep][2])
+                for (topic, position, q), rep in zip(located, representatives) if located[rep][2] is not q]
+    
+    def post(self, shared, prep_res, exec_res):
+        """Remove duplicates from the topics, remembering them for FanOutAnswers under the fanout policy"""
+        topics, options = prep_res
+        duplicates = {q.id for _, _, q, _ in exec_res}
+        for topic in topics:
+            topic.questions = [q for q in topic.questions if q.id not in duplicates]
+        if options["policy"] == "drop":
+            # Topics whose questions were all asked elsewhere go too
+            shared["topics"] = [topic for topic in topics if topic.questions]
+        else:
+            shared["topics"] = topics
+            shared["question_duplicates"] = exec_res
+        
+        total = sum(len(topic.questions) for topic in topics) + len(exec_res)
+        shared["dedup_report"] = {
+            "policy": options["policy"],
+            "questions": total,
+            "duplicates": len(exec_res),
+            "saved_output_tokens": len(exec_res) * ANSWER_OUTPUT_TOKENS,
+        }
+        if exec_res:
+            logger.info(f"Deduplicated questions: {len(exec_res)} of {total} are near-duplicates "
+                        f"({options['policy']}), saving about {len(exec_res) * ANSWER_OUTPUT_TOKENS} output tokens")
+        return "default"
+
+class FanOutAnswers(Node):
+    """Put deduplicated questions back, with the answer given to their cluster"""
+    def prep(self, shared):
+        """Get the duplicates DedupeQuestions set aside"""
+        return shared.get("question_duplicates", [])
+    
+    def post(self, shared, prep_res, exec_res):
+        """Reinsert each duplicate at its original position, answered"""
+        for topic, position, q, representative in prep_res:
+            q.rephrased = representative.rephrased or q.original
+            q.answer = representative.answer
+            topic.questions.insert(min(position, len(topic.questions)), q)
+        shared["question_duplicates"] = []
+        return "default"
+
+class ProcessContent(RetryBatchNode):
+    """
+    Process topics for rephrasing and answering.
+
+    Topics are packed several to a call, up to an expected output of
+    PROCESS_OUTPUT_TOKEN_BUDGET tokens (shared["process_output_budget"]
+    overrides it; 0 gives every topic its own call). A packed response that
+    comes back incomplete is split in half and retried. Topic and question IDs
+    travel through the prompts and back, and answers are merged by ID.
+    """
+    # LLM calls and pack splits in the current run
+    calls = 0
+    splits = 0
+    # Cascade options for the run (shared["cascade"] overrides), topics answered
+    # on the fast model first and how many of them were escalated
+    cascade = cascade_options()
+    cascaded = 0
+    escalated = 0
+    
+    def prep(self, shared):
+        """Return list of topic packs for batch processing"""
+        # Topics may arrive as dicts (e.g. from JSON); answers are merged into these objects
+        topics = shared["topics"] = ensure_ids(shared.get("topics", []))
         video_info = shared.get("video_info", {})
         transcript = video_info.get("transcript", "")
+        answerable = [topic for topic in topics if topic.questions]
+        if answerable:
+            # Fitted with every topic in one prompt, so each pack's prompt fits too
+            transcript, = fit_prompt_transcript(shared, "answering", "simplification",
+                                                lambda text: build_packed_processing_prompt(answerable, text),
+                                                transcript)
+        budget = shared.get("process_output_budget", PROCESS_OUTPUT_TOKEN_BUDGET)
+        self.calls = self.splits = 0
+        self.cascade = cascade_options(shared.get("cascade"))
+        self.cascaded = self.escalated = 0
         
         batch_items = []
-        for topic in topics:
-            batch_items.append({
-                "topic": topic,
-                "transcript": transcript
-            })
+        # Topics left without questions (e.g. all deduplicated) have nothing to answer
+        for pack in pack_topics(answerable, budget):
+            if len(pack) == 1:
+                batch_items.append({
+                    "topic": pack[0],
+                    "transcript": transcript
+                })
+            else:
+                batch_items.append({
+                    "topics": pack,
+                    "transcript": transcript
+                })
         
         return batch_items
     
     def exec(self, item):
-        """Process a topic using LLM"""
-        topic = item["topic"]
+        """Process a topic (or a pack of topics), on the fast model first when simplification cascades"""
+        topics = item["topics"] if "topics" in item else [item["topic"]]
         transcript = item["transcript"]
         
-        topic_title = topic["title"]
-        questions = [q["original"] for q in topic["questions"]]
+        if cascade_active("simplification", self.cascade):
+            # Only the topics whose answers fail validation go to the regular model
+            results, escalated = run_cascade(
+                "simplification", [Topic.coerce(topic) for topic in topics],
+                lambda pack: self.process_pack(pack, transcript), validate_answered_topic, self.cascade)
+            self.cascaded += len(topics)
+            self.escalated += escalated
+        else:
+            results = self.process_pack(topics, transcript)
         
-        prompt = f"""You are an expert content processor. Given a topic and questions from a YouTube video, rephrase the topic title and questions to be clearer and more engaging, and provide concise, informative answers.
-
-TOPIC: {topic_title}
-
-QUESTIONS:
-{chr(10).join([f"- {q}" for q in questions])}
-
-TRANSCRIPT EXCERPT:
-{transcript}
-
-For topic title and questions:
-1. Keep them engaging and clear, but concise
-2. Make them accessible to a general adult audience
-
-For your answers:
-1. Format them using HTML with <b> and <i> tags for highlighting. 
-2. Prefer lists with <ol> and <li> tags. Ideally, <li> followed by <b> for the key points.
-3. Define technical terms clearly but don't oversimplify (e.g., "<b>Quantum computing</b> uses quantum mechanical phenomena to process information exponentially faster than classical computers")
-4. Provide comprehensive yet concise explanations suitable for an educated audience
-5. Focus on clarity and accuracy rather than simplification
-
-Format your response in YAML:
-
-```yaml
-rephrased_title: |
-    Clear and engaging topic title
-questions:
-  - original: |
-        {questions[0] if len(questions) > 0 else ''}
-    rephrased: |
-        Clear, engaging question
-    answer: |
-        Comprehensive, well-structured answer with proper technical depth
-  - original: |
-        {questions[1] if len(questions) > 1 else ''}
-    ...
-```
-        """
+        return results if "topics" in item else results[0]
+    
+    def answer_topic(self, topic, transcript):
+        """Answer one topic's questions using LLM"""
+        topic = Topic.coerce(topic)
+        
+        prompt = build_processing_prompt(topic.title, topic.questions, transcript)
         
         response = call_llm(prompt, task="simplification")
+        self.calls += 1
         
         # Extract YAML content
         yaml_content = response.split("```yaml")[1].split("```")[0].strip() if "```yaml" in response else response
         
         parsed = yaml.safe_load(yaml_content)
-        rephrased_title = parsed.get("rephrased_title", topic_title)
-        processed_questions = parsed.get("questions", [])
+        rephrased_title = parsed.get("rephrased_title", topic.title)
+        processed_questions = [Question.from_dict(q) for q in parsed.get("questions") or [] if isinstance(q, dict)]
         
-        result = {
-            "title": topic_title,
-            "rephrased_title": rephrased_title,
-            "questions": processed_questions
-        }
+        return Topic(topic.id, topic.title, processed_questions, rephrased_title=rephrased_title)
+    
+    def process_pack(self, topics, transcript):
+        """Answer several topics in one call; returns one result per topic, in order"""
+        topics = [Topic.coerce(topic) for topic in topics]
+        if len(topics) == 1:
+            return [self.answer_topic(topics[0], transcript)]
+        
+        response = call_llm(build_packed_processing_prompt(topics, transcript), task="simplification")
+        self.calls += 1
+        
+        try:
+            yaml_content = response.split("```yaml")[1].split("```")[0].strip() if "```yaml" in response else response
+            entries = (yaml.safe_load(yaml_content) or {}).get("topics") or []
+            answered = {}
+            for position, entry in enumerate(entries):
+                # Topics are matched by ID, or by position if the LLM dropped the IDs
+                topic_id = entry.get("id")
+                if topic_id is None and position < len(topics):
+                    topic_id = topics[position].id
+                answered[str(topic_id)] = entry
+            missing = [topic.id for topic in topics if topic.id not in answered]
+            if missing:
+                raise ValueError(f"topics {', '.join(missing)} not answered")
+        except (yaml.YAMLError, AttributeError, ValueError) as e:
+            # Most likely the response ran past the output limit: ask for half at a time
+            logger.warning(f"Packed response for {len(topics)} topics unusable ({e}); splitting")
+            self.splits += 1
+            half = len(topics) // 2
+            return self.process_pack(topics[:half], transcript) + self.process_pack(topics[half:], transcript)
         
-        return result
+        return [
+            Topic(topic.id, topic.title,
+                  [Question.from_dict(q) for q in answered[topic.id].get("questions") or [] if isinstance(q, dict)],
+                  rephrased_title=answered[topic.id].get("rephrased_title", topic.title))
+            for topic in topics
+        ]
 
     
     def post(self, shared, prep_res, exec_res_list):
         """Update topics with processed content in shared"""
         topics = shared.get("topics", [])
+        # Packs return a list of results, single topics one result
+        results = [result for res in exec_res_list for result in (res if isinstance(res, list) else [res])]
         
-        # Map of original topic title to processed content
-        title_to_processed = {
-            result["title"]: result
-            for result in exec_res_list
-        }
+        # Everything is looked up by ID
+        topics_by_id = {topic.id: topic for topic in topics}
+        questions_by_id = {q.id: q for topic in topics for q in topic.questions}
         
-        # Update the topics with processed content
-        for topic in topics:
-            topic_title = topic["title"]
-            if topic_title in title_to_processed:
-                processed = title_to_processed[topic_title]
-                
-                # Update topic with rephrased title
-                topic["rephrased_title"] = processed["rephrased_title"]
-                
-                # Map of original question to processed question
-                orig_to_processed = {
-                    q["original"]: q
-                    for q in processed["questions"]
-                }
-                
-                # Update each question
-                for q in topic["questions"]:
-                    original = q["original"]
-                    if original in orig_to_processed:
-                        processed_q = orig_to_processed[original]
-                        q["rephrased"] = processed_q.get("rephrased", original)
-                        q["answer"] = processed_q.get("answer", "")
-        
-        # Update shared with modified topics
-        shared["topics"] = topics
-        
-        logger.info(f"Processed content for {len(exec_res_list)} topics")
+        for result in results:
+            topic = topics_by_id.get(result.id)
+            if topic is None:
+                continue
+            topic.rephrased_title = result.rephrased_title
+            by_text = None
+            for processed in result.questions:
+                q = questions_by_id.get(processed.id)
+                if q is None:
+                    # The response lost the ID: fall back to the question's wording
+                    if by_text is None:
+                        by_text = {q.original.strip(): q for q in topic.questions}
+                    q = by_text.get(processed.original.strip())
+                if q is not None:
+                    q.rephrased = processed.rephrased or q.original
+                    q.answer = processed.answer
+        
+        unanswered = [q.id for topic in topics for q in topic.questions if not q.answer]
+        if unanswered:
+            logger.warning(f"No answer came back for questions {', '.join(unanswered)}")
+        
+        shared["process_stats"] = {"topics": len(results), "calls": self.calls, "splits": self.splits}
+        
+        logger.info(f"Processed content for {len(results)} topics in {self.calls} calls"
+                    + (f" ({self.splits} packs split)" if self.splits else ""))
+        if self.cascaded:
+            stats = record_escalations(shared, "simplification", self.cascaded, self.escalated)
+            logger.info(f"Escalated {self.escalated} of {self.cascaded} topics to the regular simplification model "
+                        f"(run rate {stats['rate']:.0%})")
+        return "default"
+
+class SplitChapters(Node):
+    """Split the video into chapters from its markers or by topic shifts"""
+    def prep(self, shared):
+        """Get video info from shared"""
+        return shared.get("video_info", {})
+    
+    def exec(self, video_info):
+        """Find chapter boundaries and slice the transcript"""
+        chapters = build_chapters(video_info)
+        if not chapters:
+            raise ValueError("Transcript is empty")
+        return chapters
+    
+    def post(self, shared, prep_res, exec_res):
+        """Store chapters in shared"""
+        shared["chapters"] = exec_res
+        logger.info(f"Split video into {len(exec_res)} chapters")
+        return "default"
+
+class SummarizeChapters(AsyncParallelBatchNode, AsyncRetryNode):
+    """Summarize every chapter independently and in parallel"""
+    async def prep_async(self, shared):
+        """Return one item per chapter"""
+        self.semaphore = asyncio.Semaphore(CHAPTER_CONCURRENCY)
+        video_title = shared.get("video_info", {}).get("title", "")
+        items = []
+        for index, chapter in enumerate(shared.get("chapters", []), 1):
+            # A chapter is one section of the page, so it is trimmed (or routed, or fails) rather than split
+            build = lambda text, title=chapter["title"]: build_chapter_prompt(video_title, title, text)
+            transcript = fit_prompt_transcript(shared, f"chapter {index}", "simplification", build,
+                                               chapter["transcript"])[0]
+            items.append({"video_title": video_title, "chapter": {**chapter, "transcript": transcript},
+                          "index": index})
+        return items
+    
+    async def exec_async(self, item):
+        """Summarize one chapter using LLM"""
+        chapter = item["chapter"]
+        prompt = build_chapter_prompt(item["video_title"], chapter["title"], chapter["transcript"])
+        
+        async with self.semaphore:
+            response = await asyncio.to_thread(call_llm, prompt, task="simplification")
+        
+        # Extract YAML content
+        yaml_content = response.split("```yaml")[1].split("```")[0].strip() if "```yaml" in response else response
+        
+        parsed = yaml.safe_load(yaml_content)
+        fallback_title = chapter["title"] or f"Chapter at {format_timestamp(chapter['start'])}"
+        topic_id = f"c{item['index']}"
+        questions = [Question.from_dict({**q, "id": None}, f"{topic_id}q{i}")
+                     for i, q in enumerate(parsed.get("questions") or [], 1) if isinstance(q, dict)]
+        return Topic(topic_id, chapter["title"] or fallback_title, questions,
+                     rephrased_title=(parsed.get("rephrased_title") or fallback_title).strip(), start=chapter["start"])
+    
+    async def post_async(self, shared, prep_res, exec_res_list):
+        """Store one topic per chapter, in chapter order"""
+        shared["topics"] = list(exec_res_list)
+        logger.info(f"Summarized {len(exec_res_list)} chapters")
         return "default"
 
-class GenerateHTML(Node):
+def render_html(video_info, topics, provider=None):
+    """
+    The summary page for a video's answered topics.
+
+    provider is the name shown on the page (the current provider by default).
+    """
+    title = video_info.get("title", "YouTube Video Summary")
+    
+    # Prepare sections for HTML
+    sections = []
+    for topic in topics:
+        topic = Topic.coerce(topic)
+        # Skip topics without questions
+        if not topic.questions:
+            continue
+            
+        # Use rephrased_title if available, otherwise use original title
+        section_title = topic.rephrased_title if topic.rephrased_title is not None else topic.title
+        
+        # Chapters link to the point in the video where they start
+        if topic.start is not None:
+            stamp = f"[{format_timestamp(topic.start)}]"
+            video_id = video_info.get("video_id") or ""
+            if re.fullmatch(r"[0-9A-Za-z_-]{11}", video_id):
+                stamp = f'<a href="{timestamp_url(video_id, topic.start)}" class="text-blue-600">{stamp}</a>'
+            section_title = f"{stamp} {section_title}"
+        
+        # Prepare bullets for this section
+        bullets = []
+        for question in topic.questions:
+            # Use rephrased question if available, otherwise use original
+            q = question.rephrased or question.original
+            a = question.answer
+            
+            # Only add bullets if both question and answer have content
+            if q.strip() and a.strip():
+                bullets.append((q, a))
+        
+        # Only include section if it has bullets
+        if bullets:
+            sections.append({
+                "title": section_title,
+                "bullets": bullets
+            })
+    
+    return html_generator(title, sections, provider=provider or get_current_provider())
+
+def html_output_path(output_dir, video_info, provider=None):
+    """Where the summary page of a video is saved: <output_dir>/<title>_<provider>.html"""
+    safe_filename = sanitize_filename(video_info.get("title", "youtube_video"))
+    return os.path.join(output_dir, f"{safe_filename}_{provider or get_current_provider()}.html")
+
+class GenerateHTML(RetryNode):
     """Generate HTML output from processed content"""
     def prep(self, shared):
         """Get video info and topics from shared"""
         video_info = shared.get("video_info", {})
-        topics = shared.get("topics", [])
+        topics = [Topic.coerce(topic) for topic in shared.get("topics", [])]
         
         return {
             "video_info": video_info,
@@ -283,65 +980,18 @@ class GenerateHTML(Node):
     
     def exec(self, data):
         """Generate HTML using html_generator"""
-        video_info = data["video_info"]
-        topics = data["topics"]
-        
-        title = video_info.get("title", "YouTube Video Summary")
-        thumbnail_url = video_info.get("thumbnail_url", "")
-        
-        # Prepare sections for HTML
-        sections = []
-        for topic in topics:
-            # Skip topics without questions
-            if not topic.get("questions"):
-                continue
-                
-            # Use rephrased_title if available, otherwise use original title
-            section_title = topic.get("rephrased_title", topic.get("title", ""))
-            
-            # Prepare bullets for this section
-            bullets = []
-            for question in topic.get("questions", []):
-                # Use rephrased question if available, otherwise use original
-                q = question.get("rephrased", question.get("original", ""))
-                a = question.get("answer", "")
-                
-                # Only add bullets if both question and answer have content
-                if q.strip() and a.strip():
-                    bullets.append((q, a))
-            
-            # Only include section if it has bullets
-            if bullets:
-                sections.append({
-                    "title": section_title,
-                    "bullets": bullets
-                })
-        
-        # Get LLM provider for display
-        llm_provider = os.getenv("LLM_PROVIDER", "openai").lower()
-        
-        # Generate HTML
-        html_content = html_generator(title, sections, provider=llm_provider)
-        return html_content
+        return render_html(data["video_info"], data["topics"])
     
     def post(self, shared, prep_res, exec_res):
         """Store HTML output in shared"""
         shared["html_output"] = exec_res
         
         # Create output directory if it doesn't exist
-        output_dir = "output"
+        output_dir = shared.get("output_dir", "output")
         os.makedirs(output_dir, exist_ok=True)
         
-        # Get video title and sanitize it for filename
-        video_info = prep_res["video_info"]
-        video_title = video_info.get("title", "youtube_video")
-        safe_filename = sanitize_filename(video_title)
-        
-        # Get LLM provider for filename
-        llm_provider = os.getenv("LLM_PROVIDER", "openai").lower()
-        
-        # Create full file path with provider name
-        file_path = os.path.join(output_dir, f"{safe_filename}_{llm_provider}.html")
+        # File name from the video title and the LLM provider
+        file_path = html_output_path(output_dir, prep_res["video_info"])
         
         # Write HTML to file
         with open(file_path, "w", encoding="utf-8") as f:
@@ -353,19 +1003,96 @@ class GenerateHTML(Node):
         logger.info(f"Generated HTML output and saved to {file_path}")
         return "default"
 
+class _NodeTimer:
+    """
+    Adds each node's wall time, in seconds, to shared["timings"] by node name.
+
+    Timing uses the flow's own hooks: prep marks the start of the run, and the
+    flow asks get_next_node() right after each node finishes. Create one flow
+    per run, as the factories below do.
+    """
+    def _start_timing(self, shared):
+        self._timings = shared.setdefault("timings", {})
+        self._mark = time.perf_counter()
+
+    def get_next_node(self, curr, action):
+        now = time.perf_counter()
+        name = type(curr).__name__
+        self._timings[name] = round(self._timings.get(name, 0.0) + now - self._mark, 3)
+        self._mark = now
+        return super().get_next_node(curr, action)
+
+class TimedFlow(_NodeTimer, Flow):
+    """Flow that records node timings (see _NodeTimer)"""
+    def prep(self, shared):
+        self._start_timing(shared)
+        return super().prep(shared)
+
+class TimedAsyncFlow(_NodeTimer, AsyncFlow):
+    """AsyncFlow that records node timings (see _NodeTimer)"""
+    async def prep_async(self, shared):
+        self._start_timing(shared)
+        return await super().prep_async(shared)
+
 # Create the flow
-def create_youtube_processor_flow():
-    """Create and connect the nodes for the YouTube processor flow"""
+def create_youtube_processor_flow(source="youtube", render=True):
+    """
+    Create and connect the nodes for the YouTube processor flow.
+
+    source is "youtube" to fetch shared["url"], or "file" to read the local
+    caption file in shared["transcript_file"]. render=False ends the flow at
+    the answered shared["topics"], without generating or saving the HTML page.
+    """
     # Create nodes
-    process_url = ProcessYouTubeURL(max_retries=2, wait=10)
+    if source == "file":
+        # Reading a local file either works or it doesn't; no point retrying
+        process_url = LoadTranscriptFile()
+    else:
+        process_url = ProcessYouTubeURL(max_retries=2, wait=10)
+    normalize_transcript = NormalizeTranscript()
+    choose_strategy = ChooseStrategy()
+    summarize_in_one_call = SummarizeInOneCall(max_retries=2, wait=10)
     extract_topics_and_questions = ExtractTopicsAndQuestions(max_retries=2, wait=10)
+    dedupe_questions = DedupeQuestions()
     process_content = ProcessContent(max_retries=2, wait=10)
-    generate_html = GenerateHTML(max_retries=2, wait=10)
+    fan_out_answers = FanOutAnswers()
+    summarize_chunks = SummarizeChunks(max_retries=2, wait=10)
+    select_topics = SelectTopics(max_retries=2, wait=10)
     
-    # Connect nodes
-    process_url >> extract_topics_and_questions >> process_content >> generate_html
+    # Connect nodes: the strategy decides which LLM stages run
+    process_url >> normalize_transcript >> choose_strategy
+    choose_strategy - "single" >> summarize_in_one_call
+    choose_strategy - "two_stage" >> extract_topics_and_questions >> dedupe_questions >> process_content
+    process_content >> fan_out_answers
+    choose_strategy - "map_reduce" >> summarize_chunks >> select_topics
+    if render:
+        generate_html = GenerateHTML(max_retries=2, wait=10)
+        for last in (summarize_in_one_call, fan_out_answers, select_topics):
+            last >> generate_html
     
     # Create flow
-    flow = Flow(start=process_url)
+    flow = TimedFlow(start=process_url)
     
     return flow
+
+def create_chapter_flow(source="youtube", render=True):
+    """
+    Create the chapter-aware flow: each chapter is summarized in parallel
+    and the HTML links every section to its timestamp (render=False skips
+    the HTML, as in create_youtube_processor_flow).
+
+    Run it with asyncio.run(flow.run_async(shared)).
+    """
+    if source == "file":
+        process_url = LoadTranscriptFile()
+    else:
+        process_url = ProcessYouTubeURL(max_retries=2, wait=10)
+    normalize_transcript = NormalizeTranscript()
+    split_chapters = SplitChapters()
+    summarize_chapters = SummarizeChapters(max_retries=2, wait=10)
+    
+    process_url >> normalize_transcript >> split_chapters >> summarize_chapters
+    if render:
+        summarize_chapters >> GenerateHTML(max_retries=2, wait=10)
+    
+    return TimedAsyncFlow(start=process_url)
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import re
+import time
+from pocketflow import Flow
+from flow import ExtractTopicsAndQuestions, DedupeQuestions, ProcessContent, FanOutAnswers, GenerateHTML
+from utils.caption_files import load_transcript_file
+from utils.call_llm import use_provider
+from utils.deadline import Deadline, use_deadline, current_deadline
+from utils.files import write_json
+from utils.normalize import normalize_video_info
+from utils.topics import assign_ids, topics_to_dicts
+from utils.youtube_processor import get_video_info, extract_video_id
+
+logger = logging.getLogger(__name__)
+
+LIVE_WINDOW_SECONDS = float(os.getenv("LIVE_WINDOW_SECONDS", "300"))
+LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "60"))
+# Polls without new captions before the stream is considered over
+LIVE_IDLE_POLLS = int(os.getenv("LIVE_IDLE_POLLS", "5"))
+
+def _topic_key(title):
+    return re.sub(r"[^\w]+", " ", (title or "").casefold()).strip()
+
+def merge_topics(window_topics):
+    """
+    Merge the topics of successive windows into one list.
+
+    Topics with the same title (ignoring case and punctuation) are combined,
+    keeping the earliest window's wording and start time and appending
+    questions that haven't been asked yet.
+    """
+    merged, by_key = [], {}
+    for topics in window_topics:
+        for topic in topics:
+            key = _topic_key(topic.get("title"))
+            if key not in by_key:
+                by_key[key] = {**topic, "questions": list(topic.get("questions", []))}
+                merged.append(by_key[key])
+                continue
+            existing = by_key[key]
+            asked = {_topic_key(q.get("original")) for q in existing["questions"]}
+            existing["questions"].extend(q for q in topic.get("questions", [])
+                                         if _topic_key(q.get("original")) not in asked)
+    return merged
+
+class LiveSession:
+    """
+    Incrementally summarize a transcript that keeps growing.
+
+    The transcript is cut into fixed time windows. Each refresh runs extraction
+    and answering only on windows that completed since the last refresh, stores
+    each window's topics under state_dir, merges all windows' topics and
+    re-renders the HTML. Restarting with the same state_dir picks up where the
+    previous run stopped, so every refresh costs only the new content.
+
+    cascade and fit override the model cascade and prompt fitting options for
+    each window (see utils.cascade and utils.fitting); deadline is each
+    refresh's time budget in seconds (see utils.deadline).
+    """
+    def __init__(self, provider, output_dir="output", url=None, transcript_file=None,
+                 window_seconds=LIVE_WINDOW_SECONDS, normalize=None, cascade=None, fit=None, deadline=None):
+        if not url and not transcript_file:
+            raise ValueError("A URL or transcript file is required")
+        self.provider = provider
+        self.output_dir = output_dir
+        self.url = url
+        self.transcript_file = transcript_file
+        self.window_seconds = window_seconds
+        self.normalize = normalize
+        self.cascade = cascade
+        self.fit = fit
+        self.deadline = deadline
+        source_id = extract_video_id(url) if url else os.path.splitext(os.path.basename(transcript_file))[0]
+        self.state_dir = os.path.join(output_dir, "live", f"{source_id}-{provider}")
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.state = self._load_state()
+        # Caption segments seen by the last refresh
+        self.segment_count = 0
+
+    def _load_state(self):
+        path = os.path.join(self.state_dir, "state.json")
+        if not os.path.exists(path):
+            return {"window_seconds": self.window_seconds, "windows": [], "video_info": {}}
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state["window_seconds"] != self.window_seconds:
+            raise ValueError(f"{self.state_dir} was built with {state['window_seconds']}s windows, "
+                             f"not {self.window_seconds}s")
+        return state
+
+    def _fetch(self):
+        """Current video info, transcript normalized"""
+        if self.transcript_file:
+            video_info = load_transcript_file(self.transcript_file)
+        else:
+            video_info = get_video_info(self.url, use_cache=False)
+        if "error" in video_info:
+            raise ValueError(f"Error processing video: {video_info['error']}")
+        video_info, _ = normalize_video_info(video_info, self.normalize)
+        return video_info
+
+    def _process_window(self, index, video_info, window):
+        """Extract and answer topics for one window and persist them"""
+        start = index * self.window_seconds
+        shared = {"video_info": {"title": video_info.get("title", ""), "transcript": window.text}}
+        if self.cascade:
+            shared["cascade"] = self.cascade
+        if self.fit:
+            shared["fit"] = self.fit
+        extract = ExtractTopicsAndQuestions(max_retries=2, wait=10)
+        extract >> DedupeQuestions() >> ProcessContent(max_retries=2, wait=10) >> FanOutAnswers()
+        Flow(start=extract).run(shared)
+
+        # IDs are prefixed by window so they stay unique across the stream
+        topics = assign_ids(shared.get("topics", []), prefix=f"w{index}.")
+        for topic in topics:
+            topic.start = start
+        record = {"index": index, "start": start, "end": start + self.window_seconds,
+                  "file": f"window-{index:04d}.json"}
+        write_json(os.path.join(self.state_dir, record["file"]), {**record, "topics": topics_to_dicts(topics)})
+        self.state["windows"].append(record)
+        write_json(os.path.join(self.state_dir, "state.json"), self.state)
+        logger.info(f"Live window {index} ({start:.0f}s-{record['end']:.0f}s): {len(topics)} topics")
+
+    def topics(self):
+        """All windows' topics, merged"""
+        window_topics = []
+        for record in self.state["windows"]:
+            with open(os.path.join(self.state_dir, record["file"]), encoding="utf-8") as f:
+                window_topics.append(json.load(f)["topics"])
+        return merge_topics(window_topics)
+
+    def refresh(self, final=False):
+        """
+        Process windows that completed since the last refresh and re-render.
+
+        final also processes the trailing partial window. Returns the number of
+        windows processed, and the path of the HTML when anything changed.
+        """
+        # Every HTTP and LLM call of the refresh is bounded by the deadline
+        with use_deadline(Deadline(self.deadline, parent=current_deadline())):
+            return self._refresh(final)
+
+    def _refresh(self, final):
+        video_info = self._fetch()
+        segments = video_info["segments"]
+        self.segment_count = len(segments)
+        if not len(segments):
+            return 0, None
+        self.state["video_info"] = {k: video_info.get(k) for k in ("title", "video_id", "thumbnail_url")}
+        end_of_transcript = segments.starts[-1] + segments.durations[-1]
+        done = {record["index"] for record in self.state["windows"]}
+
+        processed = 0
+        index = 0
+        with use_provider(self.provider):
+            while index * self.window_seconds < end_of_transcript:
+                window_end = (index + 1) * self.window_seconds
+                # A window is complete once captions exist past its end
+                complete = segments.starts[-1] >= window_end
+                if index not in done and (complete or final):
+                    window = segments.slice_time(index * self.window_seconds, window_end)
+                    if len(window):
+                        self._process_window(index, video_info, window)
+                        processed += 1
+                index += 1
+            if not processed:
+                return 0, None
+            return processed, self.render()
+
+    def render(self):
+        """Write the HTML for everything processed so far"""
+        shared = {"video_info": self.state["video_info"], "topics": self.topics(), "output_dir": self.output_dir}
+        with use_provider(self.provider):
+            GenerateHTML(max_retries=2, wait=10).run(shared)
+        return shared["output_file"]
+
+def run_live(session, poll_interval=LIVE_POLL_SECONDS, idle_polls=LIVE_IDLE_POLLS, once=False):
+    """
+    Poll a live session until the transcript stops growing.
+
+    once processes what is available now and returns, for running from cron.
+    After idle_polls polls with no new captions the trailing partial window
+    is processed and the loop ends.
+    """
+    idle = 0
+    last_count = None
+    while True:
+        _, html_path = session.refresh()
+        if html_path:
+            logger.info(f"Updated {html_path}")
+        if once:
+            return html_path
+        idle = idle + 1 if session.segment_count == last_count else 0
+        last_count = session.segment_count
+        if idle >= idle_polls:
+            _, html_path = session.refresh(final=True)
+            logger.info("Transcript stopped growing; final window processed")
+            return html_path or (session.render() if session.state["windows"] else None)
+        time.sleep(poll_interval)
@@ -1,8 +1,21 @@
 import argparse
+import asyncio
 import logging
 import sys
 import os
-from flow import create_youtube_processor_flow
+from flow import create_youtube_processor_flow, create_chapter_flow
+from planner import plan_batch, format_plan
+from live import LiveSession, run_live, LIVE_WINDOW_SECONDS, LIVE_POLL_SECONDS
+from batch_api import BatchJob, run_batch_job, BATCH_POLL_SECONDS
+from utils.call_llm import get_current_provider, PROVIDERS
+from utils.fitting import POLICIES as FIT_POLICIES
+from utils.deadline import Deadline, use_deadline, parse_duration
+from utils.youtube_processor import set_transcript_cache_dir, get_cached_failure
+from utils.caption_files import find_transcript_files
+from utils.batch import (
+    read_url_list, parse_shard, select_shard, shard_key,
+    Manifest, manifest_path, merge_manifests, write_index
+)
 
 # Set up logging
 logging.basicConfig(
@@ -15,6 +28,158 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def process_video(url, providers, output_dir="output", transcript_file=None, normalize=None, chapters=False,
+                  strategy=None, cascade=None, fit=None, deadline=None):
+    """
+    Run the flow for one URL (or local caption file) with each provider in turn.
+
+    normalize overrides the transcript normalization options (see utils.normalize);
+    strategy overrides the summary strategy options (see utils.strategy);
+    cascade overrides the model cascade options (see utils.cascade);
+    fit overrides the prompt fitting options (see utils.fitting);
+    chapters runs the chapter-aware flow instead of the topic flow;
+    deadline is each provider's time budget in seconds (see utils.deadline).
+    Ctrl-C cancels the run's in-flight calls before it propagates.
+    Returns a list of (provider, shared, error) tuples; shared is None when the
+    provider failed.
+    """
+    results = []
+    for provider in providers:
+        logger.info(f"Processing with {provider.upper()} provider...")
+        
+        # Set the provider for this run
+        original_provider = os.environ.get("LLM_PROVIDER")
+        os.environ["LLM_PROVIDER"] = provider
+        run_deadline = Deadline(deadline)
+        
+        try:
+            # Create flow
+            source = "file" if transcript_file else "youtube"
+            flow = create_chapter_flow(source) if chapters else create_youtube_processor_flow(source=source)
+            
+            # Initialize shared memory
+            shared = {
+                "url": url,
+                "output_dir": output_dir
+            }
+            if transcript_file:
+                shared["transcript_file"] = transcript_file
+            if normalize:
+                shared["normalize"] = normalize
+            if strategy:
+                shared["strategy"] = strategy
+            if cascade:
+                shared["cascade"] = cascade
+            if fit:
+                shared["fit"] = fit
+            
+            # Run the flow; every HTTP and LLM call in it is bounded by the deadline
+            with use_deadline(run_deadline):
+                if chapters:
+                    asyncio.run(flow.run_async(shared))
+                else:
+                    flow.run(shared)
+            results.append((provider, shared, None))
+            
+            logger.info(f"✅ {provider.upper()} processing completed successfully!")
+            
+        except KeyboardInterrupt:
+            # Calls still running in other threads stop at their next check instead of running on
+            run_deadline.cancel("interrupted")
+            raise
+            
+        except Exception as e:
+            logger.error(f"❌ {provider.upper()} processing failed: {e}")
+            # Continue with next provider if one fails
+            results.append((provider, None, e))
+            continue
+            
+        finally:
+            # Restore original provider
+            if original_provider:
+                os.environ["LLM_PROVIDER"] = original_provider
+            elif "LLM_PROVIDER" in os.environ:
+                del os.environ["LLM_PROVIDER"]
+    return results
+
+def run_batch(urls, providers, output_dir="output", shard=(1, 1), normalize=None, chapters=False, strategy=None,
+              cascade=None, fit=None, deadline=None):
+    """
+    Process the URLs owned by one shard and record each result in its manifest.
+
+    Entries already completed in this shard's manifest are skipped, so an
+    interrupted run can be restarted with the same command. Videos in the
+    negative cache (no captions, private, ...) are recorded as unavailable
+    without being fetched and don't count as failures.
+    """
+    index, count = shard
+    selected = select_shard(urls, index, count)
+    manifest = Manifest(manifest_path(output_dir, index, count), shard=f"{index}/{count}")
+    completed = manifest.completed()
+    logger.info(f"Shard {index}/{count}: {len(selected)} of {len(urls)} URLs, manifest {manifest.path}")
+    
+    counts = {"done": 0, "failed": 0, "skipped": 0}
+    unavailable = []
+    for position, url in enumerate(selected, 1):
+        video_id = shard_key(url)
+        todo = [p for p in providers if (video_id, p) not in completed]
+        counts["skipped"] += len(providers) - len(todo)
+        if not todo:
+            continue
+        # Videos known to have no usable transcript are skipped without a request
+        failure = get_cached_failure(url)
+        if failure is not None:
+            for provider in todo:
+                manifest.record(url, provider, "unavailable", error=failure)
+            unavailable.append((video_id, failure))
+            continue
+        logger.info(f"[{position}/{len(selected)}] {url}")
+        for provider, shared, error in process_video(url, todo, output_dir, normalize=normalize, chapters=chapters,
+                                                     strategy=strategy, cascade=cascade, fit=fit, deadline=deadline):
+            if error is None:
+                manifest.record(url, provider, "done",
+                                output_file=shared.get("output_file"),
+                                title=shared.get("video_info", {}).get("title"))
+                counts["done"] += 1
+            else:
+                failure = get_cached_failure(url)
+                if failure is None:
+                    manifest.record(url, provider, "failed", error=str(error))
+                    counts["failed"] += 1
+                    continue
+                # Failed permanently just now; later runs skip it up front
+                manifest.record(url, provider, "unavailable", error=failure)
+                if (video_id, failure) not in unavailable:
+                    unavailable.append((video_id, failure))
+    
+    print("\n" + "=" * 50)
+    print(f"Shard {index}/{count} finished: {counts['done']} done, {counts['failed']} failed, "
+          f"{len(unavailable)} unavailable, {counts['skipped']} already complete")
+    if unavailable:
+        print("Unavailable (skipped until the negative cache expires):")
+        for video_id, error in unavailable:
+            print(f"  - {video_id}: {error.strip().splitlines()[0][:120]}")
+    print(f"Manifest: {os.path.abspath(manifest.path)}")
+    print("=" * 50 + "\n")
+    return 0 if counts["failed"] == 0 else 1
+
+def run_merge(output_dir, expected_urls=None, providers=None):
+    """Merge all shard manifests in output_dir into index.json/index.html and report gaps."""
+    merged = merge_manifests(output_dir, expected_urls=expected_urls, providers=providers)
+    json_path, html_path = write_index(output_dir, merged)
+    
+    print("\n" + "=" * 50)
+    print(f"Merged {len(merged['manifests'])} manifests: {len(merged['entries'])} entries")
+    print(f"Index: {os.path.abspath(html_path)}")
+    if merged["gaps"]:
+        print(f"❌ {len(merged['gaps'])} gaps:")
+        for gap in merged["gaps"]:
+            print(f"  - {gap['video_id']} ({gap['provider']}): {gap['status']}")
+    elif expected_urls is not None:
+        print("No gaps: every expected video has a summary.")
+    print("=" * 50 + "\n")
+    return 1 if merged["gaps"] else 0
+
 def main():
     """Main function to run the YouTube content processor."""
     
@@ -31,16 +196,146 @@ def main():
     parser.add_argument(
         "--provider",
         type=str,
-        choices=['openai', 'gemini'],
+        choices=list(PROVIDERS),
         help="LLM provider to use (overrides .env setting). If not specified, uses both providers.",
         required=False
     )
+    parser.add_argument(
+        "--transcript",
+        type=str,
+        help="Summarize a local .srt, .vtt or .json caption file (or every such file in a directory) instead of fetching from YouTube",
+        required=False
+    )
+    parser.add_argument(
+        "--no-normalize",
+        action="store_true",
+        help="Send the transcript to the LLM verbatim instead of stripping [Music], repeated caption fragments, etc."
+    )
+    parser.add_argument(
+        "--strip-fillers",
+        action="store_true",
+        help="Also remove filler words (um, uh, you know, ...) during normalization"
+    )
+    parser.add_argument(
+        "--chapters",
+        action="store_true",
+        help="Summarize each chapter in parallel (from chapter markers, or by topic shifts) with timestamp links"
+    )
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        choices=["auto", "single", "two_stage", "map_reduce"],
+        help="How to summarize: one combined call, extraction then one call per topic, or chunked map-reduce "
+             "(default: auto, chosen from the transcript size and the models' context limits)"
+    )
+    parser.add_argument(
+        "--cascade",
+        action="store_true",
+        help="Answer on each task's fast model first and escalate only outputs that fail validation "
+             "to the regular model (default: LLM_CASCADE)"
+    )
+    parser.add_argument(
+        "--fit-policy",
+        type=str,
+        choices=list(FIT_POLICIES),
+        help="What to do with a transcript too long for the model's context: route to the provider's "
+             "long-context model, trim, chunk, or fail without calling (default: PROMPT_FIT_POLICY, route)"
+    )
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        help="Time budget for each video and provider (each refresh in live mode), e.g. 180s or 3m; every "
+             "HTTP and LLM call is bounded by what is left, and retries that don't fit are skipped (default: none)"
+    )
+    parser.add_argument(
+        "--live",
+        action="store_true",
+        help="Follow a live stream or growing caption file, summarizing only new transcript windows as they arrive"
+    )
+    parser.add_argument(
+        "--batch-api",
+        action="store_true",
+        help="Submit extraction and answering as provider batch jobs (slower, cheaper, higher limits); "
+             "rerun the same command to resume"
+    )
+    parser.add_argument(
+        "--window-seconds",
+        type=float,
+        default=LIVE_WINDOW_SECONDS,
+        help="Live mode: length of the transcript windows processed at a time"
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        help=f"Live and batch API modes: seconds between checks for new captions or batch results "
+             f"(default {LIVE_POLL_SECONDS:g} live, {BATCH_POLL_SECONDS:g} batch API)"
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="Live and batch API modes: process what is available now and exit (for running from cron)"
+    )
+    parser.add_argument(
+        "--urls-file",
+        type=str,
+        help="Batch mode: process every URL in this file (one per line)",
+        required=False
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default="1/1",
+        help="Batch mode: only process shard i of N (e.g. 2/4), chosen by a stable hash of the video ID"
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Merge the shard manifests in --output-dir into a single index and report gaps"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        default="output",
+        help="Directory for HTML output and batch manifests"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        default=os.getenv("TRANSCRIPT_CACHE_DIR"),
+        help="Cache fetched transcripts here so later runs (e.g. after --plan) reuse them"
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Estimate calls, tokens, cost and wall time without calling any LLM"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Plan mode: number of videos processed at the same time"
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=float(os.getenv("LLM_RPM", "0")) or None,
+        help="Plan mode: requests-per-minute limit per API key (default: LLM_RPM)"
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=float(os.getenv("LLM_TPM", "0")) or None,
+        help="Plan mode: tokens-per-minute limit per API key (default: LLM_TPM)"
+    )
     args = parser.parse_args()
     
-    # Get YouTube URL from arguments or prompt user
-    url = args.url
-    if not url:
-        url = input("Enter YouTube URL to process: ")
+    try:
+        shard = parse_shard(args.shard)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.cache_dir:
+        set_transcript_cache_dir(args.cache_dir)
     
     # Determine which providers to use
     if args.provider:
@@ -50,47 +345,111 @@ def main():
         providers = ['openai', 'gemini']
         logger.info("No provider specified - using both OpenAI and Gemini")
     
-    logger.info(f"Starting YouTube content processor for URL: {url}")
+    normalize = {}
+    if args.no_normalize:
+        normalize["enabled"] = False
+    if args.strip_fillers:
+        normalize["strip_fillers"] = True
+    strategy = {"strategy": args.strategy} if args.strategy else None
+    cascade = {"enabled": True} if args.cascade else None
+    fit = {"policy": args.fit_policy} if args.fit_policy else None
+    deadline = args.deadline
+    
+    if args.merge:
+        expected_urls = read_url_list(args.urls_file) if args.urls_file else None
+        return run_merge(args.output_dir, expected_urls, providers if args.provider else None)
+    
+    if args.plan:
+        if args.urls_file:
+            urls = select_shard(read_url_list(args.urls_file), *shard)
+        else:
+            urls = [args.url or input("Enter YouTube URL to plan: ")]
+        plan = plan_batch(urls, providers, concurrency=args.concurrency, rpm=args.rpm, tpm=args.tpm,
+                          normalize=normalize, strategy=strategy)
+        print("\n" + "=" * 50)
+        print(format_plan(plan))
+        print("=" * 50 + "\n")
+        return 0
+    
+    if args.live and args.batch_api:
+        parser.error("--live and --batch-api can't be combined")
+    # Live windows always extract and answer; batch jobs run extraction and answering as
+    # provider batches, whose answers a cascade can't escalate, over the provider's completion window.
+    # Neither splits chapters, and the chapter flow summarizes each chapter in one call of its own
+    chapters = args.chapters or None
+    unsupported = {"--live": [("--strategy", strategy), ("--chapters", chapters)],
+                   "--batch-api": [("--strategy", strategy), ("--cascade", cascade), ("--deadline", deadline),
+                                   ("--chapters", chapters)],
+                   "--chapters": [("--strategy", strategy), ("--cascade", cascade)]}
+    for mode, options in unsupported.items():
+        if getattr(args, mode[2:].replace("-", "_")):
+            for option, value in options:
+                if value is not None:
+                    parser.error(f"{option} can't be used with {mode}")
+    
+    if args.live:
+        if not args.url and not args.transcript:
+            parser.error("--live needs --url or --transcript")
+        # One provider per live session; without --provider, the .env setting
+        provider = args.provider or get_current_provider()
+        session = LiveSession(provider, args.output_dir, url=args.url, transcript_file=args.transcript,
+                              window_seconds=args.window_seconds, normalize=normalize, cascade=cascade, fit=fit,
+                              deadline=deadline)
+        try:
+            html_path = run_live(session, poll_interval=LIVE_POLL_SECONDS if args.poll_interval is None else args.poll_interval, once=args.once)
+        except KeyboardInterrupt:
+            html_path = None
+            logger.info("Live mode stopped; progress is saved and resumes on the next run")
+        print(f"\n✅ Live summary: {html_path or 'no complete windows yet'}")
+        return 0
+    
+    if args.batch_api:
+        if args.urls_file:
+            urls = select_shard(read_url_list(args.urls_file), *shard)
+        else:
+            urls = [args.url or input("Enter YouTube URL to process: ")]
+        # One provider per batch job; without --provider, the .env setting
+        job = BatchJob(urls, args.provider or get_current_provider(), args.output_dir, normalize=normalize, fit=fit)
+        outputs = run_batch_job(job, poll_interval=BATCH_POLL_SECONDS if args.poll_interval is None else args.poll_interval, once=args.once)
+        if job.stage == "done":
+            print(f"\n✅ Batch job {job.name}: {len(outputs)} of {len(urls)} videos summarized")
+        else:
+            print(f"\n⏳ Batch job {job.name} is at the {job.stage} stage; run the same command again to continue")
+        return 0
+    
+    if args.urls_file:
+        urls = read_url_list(args.urls_file)
+        return run_batch(urls, providers, args.output_dir, shard, normalize=normalize, chapters=args.chapters,
+                         strategy=strategy, cascade=cascade, fit=fit, deadline=deadline)
+    
+    if args.transcript:
+        transcript_files = find_transcript_files(args.transcript)
+        if not transcript_files:
+            print(f"❌ No .srt, .vtt or .json files found in {args.transcript}")
+            return 1
+        results = []
+        for transcript_file in transcript_files:
+            logger.info(f"Starting YouTube content processor for transcript file: {transcript_file}")
+            results.extend(process_video(None, providers, args.output_dir, transcript_file=transcript_file,
+                                         normalize=normalize, chapters=args.chapters, strategy=strategy,
+                                         cascade=cascade, fit=fit, deadline=deadline))
+    else:
+        # Get YouTube URL from arguments or prompt user
+        url = args.url
+        if not url:
+            url = input("Enter YouTube URL to process: ")
+        
+        logger.info(f"Starting YouTube content processor for URL: {url}")
+        results = process_video(url, providers, args.output_dir, normalize=normalize, chapters=args.chapters,
+                                strategy=strategy, cascade=cascade, fit=fit, deadline=deadline)
     
     output_files = []
     
     # Process with each provider
-    for provider in providers:
-        logger.info(f"Processing with {provider.upper()} provider...")
-        
-        # Set the provider for this run
-        original_provider = os.environ.get("LLM_PROVIDER")
-        os.environ["LLM_PROVIDER"] = provider
-        
-        try:
-            # Create flow
-            flow = create_youtube_processor_flow()
-            
-            # Initialize shared memory
-            shared = {
-                "url": url
-            }
-            
-            # Run the flow
-            flow.run(shared)
-            
+    for provider, shared, error in results:
+        if error is None:
             # Get output file path
-            output_file = shared.get("output_file", "output.html")
-            output_files.append(output_file)
-            
-            logger.info(f"✅ {provider.upper()} processing completed successfully!")
-            
-        except Exception as e:
-            logger.error(f"❌ {provider.upper()} processing failed: {e}")
-            # Continue with next provider if one fails
-            continue
-            
-        finally:
-            # Restore original provider
-            if original_provider:
-                os.environ["LLM_PROVIDER"] = original_provider
-            elif "LLM_PROVIDER" in os.environ:
-                del os.environ["LLM_PROVIDER"]
+            output_files.append(shared.get("output_file", "output.html"))
     
     # Report success and output file locations
     print("\n" + "=" * 50)
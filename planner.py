@@ -0,0 +1,194 @@
+import logging
+import os
+from flow import (
+    build_extraction_prompt, build_processing_prompt, build_packed_processing_prompt,
+    build_combined_prompt, build_selection_prompt
+)
+from utils.call_llm import get_model_for_task
+from utils.model_catalog import estimate_cost
+from utils.key_pool import load_keys
+from utils.normalize import normalize_video_info
+from utils.strategy import (
+    plan_strategy, split_transcript, pack_topics, estimate_answer_tokens,
+    PROCESS_OUTPUT_TOKEN_BUDGET
+)
+from utils.tokens import estimate_tokens
+from utils.topics import Topic, Question, assign_ids
+from utils.youtube_processor import get_video_info
+
+logger = logging.getLogger(__name__)
+
+# What a typical run produces; the prompts ask for at most 5 topics x 3 questions
+EXPECTED_TOPICS = 5
+EXPECTED_QUESTIONS = 3
+SAMPLE_TOPIC = "An interesting topic discussed in the video"
+SAMPLE_QUESTION = "What is the main argument made here, and why does it matter for the audience?"
+EXTRACTION_OUTPUT_TOKENS = 450   # YAML with 5 titles and 15 questions
+CHUNK_TOPICS = 3                 # topics asked of each chunk in map_reduce
+SELECTION_OUTPUT_TOKENS = 40     # the list of selected topic numbers
+
+# Latency model for one call: fixed overhead + prompt processing + generation
+CALL_OVERHEAD_SECONDS = float(os.getenv("PLAN_CALL_OVERHEAD_SECONDS", "1.5"))
+INPUT_TOKENS_PER_SECOND = float(os.getenv("PLAN_INPUT_TOKENS_PER_SECOND", "5000"))
+OUTPUT_TOKENS_PER_SECOND = float(os.getenv("PLAN_OUTPUT_TOKENS_PER_SECOND", "60"))
+
+def estimate_call_seconds(input_tokens, output_tokens):
+    """Expected wall time of a single LLM call"""
+    return (CALL_OVERHEAD_SECONDS
+            + input_tokens / INPUT_TOKENS_PER_SECOND
+            + output_tokens / OUTPUT_TOKENS_PER_SECOND)
+
+def sample_topic():
+    """A representative extracted topic"""
+    return Topic(None, SAMPLE_TOPIC, [Question(None, SAMPLE_QUESTION) for _ in range(EXPECTED_QUESTIONS)])
+
+def plan_video(video_info, provider, normalize=None, strategy=None, output_budget=PROCESS_OUTPUT_TOKEN_BUDGET):
+    """
+    List the LLM calls the flow would make for one video with one provider.
+
+    The transcript is normalized with the same options the run would use, the
+    strategy is chosen as ChooseStrategy would choose it, and prompts are built
+    exactly as the flow builds them. Topics and questions aren't known before
+    extraction, so later prompts are built from the expected number of
+    representative topics and questions, packed into calls by output_budget
+    as ProcessContent packs them. Every call records the strategy.
+    """
+    video_info, _ = normalize_video_info(video_info, normalize)
+    title = video_info.get("title", "")
+    transcript = video_info.get("transcript", "")
+    analysis_model = get_model_for_task(provider, "analysis")
+    simplification_model = get_model_for_task(provider, "simplification")
+    plan = plan_strategy(transcript, provider, strategy)
+    answered_topic_tokens = estimate_answer_tokens(EXPECTED_QUESTIONS)
+
+    def call(task, model, prompt, output_tokens):
+        return {"task": task, "model": model, "strategy": plan["strategy"],
+                "input_tokens": estimate_tokens(prompt, model), "output_tokens": output_tokens}
+
+    if plan["strategy"] == "single":
+        return [call("analysis", analysis_model, build_combined_prompt(title, transcript),
+                     answered_topic_tokens * EXPECTED_TOPICS)]
+
+    if plan["strategy"] == "map_reduce":
+        chunks = split_transcript(transcript, plan["chunk_tokens"])
+        calls = [call("analysis", analysis_model,
+                      build_combined_prompt(title, chunk, max_topics=CHUNK_TOPICS, part=(i, len(chunks))),
+                      answered_topic_tokens * CHUNK_TOPICS)
+                 for i, chunk in enumerate(chunks, 1)]
+        if len(chunks) * CHUNK_TOPICS > EXPECTED_TOPICS:
+            sample = sample_topic()
+            calls.append(call("analysis", analysis_model,
+                              build_selection_prompt(title, [sample] * (len(chunks) * CHUNK_TOPICS)),
+                              SELECTION_OUTPUT_TOKENS))
+        return calls
+
+    calls = [call("analysis", analysis_model, build_extraction_prompt(title, transcript), EXTRACTION_OUTPUT_TOKENS)]
+    samples = assign_ids([sample_topic() for _ in range(EXPECTED_TOPICS)])
+    for pack in pack_topics(samples, output_budget):
+        if len(pack) == 1:
+            prompt = build_processing_prompt(pack[0].title, pack[0].questions, transcript)
+        else:
+            prompt = build_packed_processing_prompt(pack, transcript)
+        calls.append(call("simplification", simplification_model, prompt, answered_topic_tokens * len(pack)))
+    return calls
+
+def plan_batch(urls, providers, concurrency=1, rpm=None, tpm=None, normalize=None, strategy=None):
+    """
+    Project calls, tokens, cost and wall time for processing urls with providers.
+
+    Transcripts are fetched (or read from the transcript cache); no LLM is called.
+    rpm and tpm are per-key rate limits, so a provider with a pool of keys gets
+    them once per key; concurrency is the number of videos processed at the
+    same time.
+    """
+    per_provider = {p: {"calls": 0, "input_tokens": 0, "output_tokens": 0, "cost": 0.0,
+                        "unpriced_models": set(), "seconds": 0.0, "strategies": {},
+                        # The same videos with one ProcessContent call per topic, for comparison
+                        "per_topic": {"calls": 0, "cost": 0.0, "seconds": 0.0}} for p in providers}
+    videos, unavailable = [], []
+    for url in urls:
+        video_info = get_video_info(url)
+        if "error" in video_info:
+            unavailable.append({"url": url, "error": video_info["error"]})
+            continue
+        video = {"url": url, "title": video_info.get("title"), "transcript_chars": len(video_info.get("transcript", ""))}
+        for provider in providers:
+            calls = plan_video(video_info, provider, normalize, strategy)
+            totals = per_provider[provider]
+            chosen = calls[0]["strategy"]
+            totals["strategies"][chosen] = totals["strategies"].get(chosen, 0) + 1
+            for call in calls:
+                totals["calls"] += 1
+                totals["input_tokens"] += call["input_tokens"]
+                totals["output_tokens"] += call["output_tokens"]
+                cost = estimate_cost(call["model"], call["input_tokens"], call["output_tokens"])
+                if cost is None:
+                    totals["unpriced_models"].add(call["model"])
+                else:
+                    totals["cost"] += cost
+                # Calls within one video run one after another
+                totals["seconds"] += estimate_call_seconds(call["input_tokens"], call["output_tokens"])
+            video.setdefault("input_tokens", 0)
+            video["input_tokens"] += sum(c["input_tokens"] for c in calls)
+            per_topic = plan_video(video_info, provider, normalize, strategy, output_budget=0) if chosen == "two_stage" else calls
+            totals["per_topic"]["calls"] += len(per_topic)
+            for call in per_topic:
+                totals["per_topic"]["cost"] += estimate_cost(call["model"], call["input_tokens"], call["output_tokens"]) or 0.0
+                totals["per_topic"]["seconds"] += estimate_call_seconds(call["input_tokens"], call["output_tokens"])
+        videos.append(video)
+
+    # Wall time is bounded by latency spread over the concurrency, and by each provider's rate limits
+    latency_seconds = sum(t["seconds"] for t in per_provider.values()) / max(concurrency, 1)
+    bounds = {"latency": latency_seconds}
+    for provider, totals in per_provider.items():
+        keys = max(len(load_keys(provider)), 1)
+        if rpm:
+            bounds[f"{provider} RPM"] = totals["calls"] / (rpm * keys) * 60
+        if tpm:
+            bounds[f"{provider} TPM"] = (totals["input_tokens"] + totals["output_tokens"]) / (tpm * keys) * 60
+    binding = max(bounds, key=bounds.get)
+
+    for totals in per_provider.values():
+        totals["unpriced_models"] = sorted(totals["unpriced_models"])
+    return {
+        "videos": videos,
+        "unavailable": unavailable,
+        "providers": per_provider,
+        "total_calls": sum(t["calls"] for t in per_provider.values()),
+        "total_cost": sum(t["cost"] for t in per_provider.values()),
+        "wall_seconds": bounds[binding],
+        "binding_constraint": binding,
+        "bounds": bounds,
+        "concurrency": concurrency,
+    }
+
+def _format_duration(seconds):
+    hours, rest = divmod(int(round(seconds)), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}h {minutes:02d}m {secs:02d}s" if hours else f"{minutes}m {secs:02d}s"
+
+def format_plan(plan):
+    """Render a plan as a human-readable report"""
+    lines = [
+        f"Videos: {len(plan['videos'])} planned, {len(plan['unavailable'])} unavailable",
+    ]
+    for provider, totals in plan["providers"].items():
+        line = (f"{provider.upper()}: {totals['calls']} calls, "
+                f"{totals['input_tokens']:,} input + {totals['output_tokens']:,} output tokens, "
+                f"${totals['cost']:.2f}")
+        if totals["unpriced_models"]:
+            line += f" (no price for {', '.join(totals['unpriced_models'])})"
+        if totals["strategies"]:
+            line += "; strategies: " + ", ".join(f"{name} x{count}" for name, count in sorted(totals["strategies"].items()))
+        lines.append(line)
+        per_topic = totals["per_topic"]
+        if per_topic["calls"] != totals["calls"]:
+            lines.append(f"  vs one call per topic: {per_topic['calls']} calls, ${per_topic['cost']:.2f}, "
+                         f"{_format_duration(per_topic['seconds'])} of LLM time "
+                         f"(packed: {_format_duration(totals['seconds'])})")
+    lines.append(f"Total: {plan['total_calls']} calls, ${plan['total_cost']:.2f}")
+    lines.append(f"Estimated wall time: {_format_duration(plan['wall_seconds'])} "
+                 f"at concurrency {plan['concurrency']} (bound by {plan['binding_constraint']})")
+    for item in plan["unavailable"]:
+        lines.append(f"  unavailable: {item['url']} ({item['error']})")
+    return "\n".join(lines)
@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+from flow import create_youtube_processor_flow
+from utils.call_llm import use_provider, get_current_provider, PROVIDERS
+from utils.deadline import Deadline, use_deadline, parse_duration
+from utils.youtube_processor import extract_video_id
+from utils.topics import topics_to_dicts
+from utils.key_pool import key_usage
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("done", "failed")
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 429: "Too Many Requests", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+def run_flow(url, provider):
+    """Run the processor flow for one video and return the shared store"""
+    shared = {"url": url}
+    with use_provider(provider):
+        create_youtube_processor_flow().run(shared)
+    return shared
+
+def result_payload(shared):
+    """What a finished computation keeps of the flow's shared store: the page and the topics, not the transcript"""
+    video_info = shared.get("video_info", {})
+    return {
+        "html": shared.get("html_output", ""),
+        "output_file": shared.get("output_file"),
+        "title": video_info.get("title"),
+        "video_id": video_info.get("video_id"),
+        "thumbnail_url": video_info.get("thumbnail_url"),
+        "topics": topics_to_dicts(shared.get("topics", [])),
+    }
+
+class Computation:
+    """One in-flight run of the flow, shared by every job that asked for the same video and config"""
+    def __init__(self, key, url, provider):
+        self.key = key
+        self.url = url
+        self.provider = provider
+        self.status = "queued"
+        self.error = None
+        # result_payload() of the run once it is done
+        self.result = None
+        self.started_at = None
+        self.finished_at = None
+        # The run's Deadline once it starts
+        self.deadline = None
+        self._changed = asyncio.Event()
+
+    def set_status(self, status):
+        """Update the status and wake up anyone streaming it"""
+        self.status = status
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, timeout):
+        """Wait until the status changes (or the timeout elapses)"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+class SummaryService:
+    """
+    Job registry and executor for the HTTP API.
+
+    Requests for a (video_id, provider) pair that is already queued or running
+    attach to the existing Computation instead of starting a new one. New
+    computations go through a bounded queue; when it is full, submit() raises
+    QueueFull so the server can answer 429. Each run is bounded by deadline
+    seconds (see utils.deadline), and stop() cancels the runs in flight.
+    """
+    def __init__(self, concurrency=2, max_queue=100, max_jobs=10000, runner=run_flow, deadline=None):
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.max_jobs = max_jobs
+        self.runner = runner
+        self.max_queue = max_queue
+        # Created by start(), inside the running loop: on Python 3.9 a queue
+        # binds to the loop current when it is created, which asyncio.run()
+        # replaces with a new one
+        self.queue = None
+        self.jobs = OrderedDict()
+        self.inflight = {}
+        self.stats = {"submitted": 0, "coalesced": 0, "rejected": 0}
+        self._job_ids = itertools.count(1)
+        self._workers = []
+
+    @property
+    def ready(self):
+        """True when the executors are running and the queue has room"""
+        return any(not w.done() for w in self._workers) and not self.queue.full()
+
+    def start(self):
+        """Create the queue and start the executor tasks; call from inside the event loop"""
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        """Cancel the executor tasks and the runs in flight"""
+        for computation in self.inflight.values():
+            if computation.deadline is not None:
+                computation.deadline.cancel("cancelled: server stopping")
+        for w in self._workers:
+            w.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    def submit(self, url, provider=None):
+        """Create a job for url and return (job_id, coalesced); the service must be started"""
+        video_id = extract_video_id(url) if isinstance(url, str) else None
+        if not video_id:
+            raise ValueError("Invalid YouTube URL")
+        if provider is not None and (not isinstance(provider, str) or provider.lower() not in PROVIDERS):
+            raise ValueError(f"Unsupported provider: {provider}. Supported providers: {', '.join(PROVIDERS)}")
+        provider = (provider or get_current_provider()).lower()
+        key = (video_id, provider)
+
+        computation = self.inflight.get(key)
+        coalesced = computation is not None
+        if computation is None:
+            computation = Computation(key, url, provider)
+            self.queue.put_nowait(computation)  # raises asyncio.QueueFull
+            self.inflight[key] = computation
+        else:
+            self.stats["coalesced"] += 1
+        self.stats["submitted"] += 1
+
+        job_id = str(next(self._job_ids))
+        self.jobs[job_id] = {"computation": computation, "created_at": time.time()}
+        # Forget the oldest finished jobs once the registry is full; jobs still
+        # queued or running are skipped, not waited for
+        excess = len(self.jobs) - self.max_jobs
+        if excess > 0:
+            finished = [old_id for old_id, old in self.jobs.items()
+                        if old["computation"].status in TERMINAL_STATES]
+            for old_id in finished[:excess]:
+                del self.jobs[old_id]
+        return job_id, coalesced
+
+    def describe(self, job_id):
+        """Return the public status of a job"""
+        job = self.jobs[job_id]
+        computation = job["computation"]
+        video_id, provider = computation.key
+        status = {
+            "job_id": job_id,
+            "status": computation.status,
+            "url": computation.url,
+            "video_id": video_id,
+            "provider": provider,
+        }
+        if computation.error:
+            status["error"] = computation.error
+        if computation.status == "done":
+            status["output_file"] = computation.result["output_file"]
+        return status
+
+    async def _work(self):
+        while True:
+            computation = await self.queue.get()
+            computation.started_at = time.time()
+            computation.set_status("running")
+            computation.deadline = Deadline(self.deadline)
+            try:
+                # to_thread copies the context, so use_provider() and the deadline apply inside the flow
+                with use_deadline(computation.deadline):
+                    shared = await asyncio.to_thread(self.runner, computation.url, computation.provider)
+                computation.result = result_payload(shared)
+                computation.set_status("done")
+            except Exception as e:
+                logger.error(f"❌ Processing {computation.url} failed: {e}")
+                computation.error = str(e)
+                computation.set_status("failed")
+            finally:
+                computation.finished_at = time.time()
+                self.inflight.pop(computation.key, None)
+                self.queue.task_done()
+
+class HTTPError(Exception):
+    """An error that maps directly onto an HTTP response"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+async def read_request(reader, max_body=65536):
+    """Parse an HTTP/1.1 request into (method, path, headers, body)"""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0") or 0)
+    except ValueError:
+        raise HTTPError(400, "Malformed Content-Length")
+    if length < 0:
+        raise HTTPError(400, "Malformed Content-Length")
+    if length > max_body:
+        raise HTTPError(413, "Request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), urlsplit(target).path, headers, body
+
+def write_response(writer, status, body, content_type="application/json"):
+    """Write a complete response and mark the connection for closing"""
+    if not isinstance(body, (bytes, str)):
+        body = json.dumps(body)
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        f"Content-Type: {content_type}; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+class SummaryServer:
+    """
+    Minimal asyncio HTTP front end for SummaryService.
+
+    POST /jobs                 {"url": ..., "provider": ...} -> 202 {"job_id": ...}
+    GET  /jobs/<id>            job status
+    GET  /jobs/<id>/events     server-sent events until the job finishes
+    GET  /jobs/<id>/html       rendered HTML
+    GET  /jobs/<id>/json       topics and questions as JSON
+    GET  /healthz, /readyz     liveness and readiness probes (readyz includes per-key usage)
+    """
+    def __init__(self, service, host="127.0.0.1", port=8000):
+        self.service = service
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        """Start the executors and begin listening"""
+        self.service.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        """Stop listening and cancel the executors"""
+        self._server.close()
+        await self._server.wait_closed()
+        await self.service.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _handle(self, reader, writer):
+        try:
+            request = await read_request(reader)
+            if request is not None:
+                await self._dispatch(writer, *request)
+        except HTTPError as e:
+            write_response(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logger.exception(f"Unhandled error: {e}")
+            write_response(writer, 500, {"error": "Internal server error"})
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def _dispatch(self, writer, method, path, headers, body):
+        parts = [p for p in path.split("/") if p]
+        if parts == ["healthz"]:
+            write_response(writer, 200, {"status": "ok"})
+        elif parts == ["readyz"]:
+            ready = self.service.ready
+            write_response(writer, 200 if ready else 503, {
+                "ready": ready,
+                "queued": self.service.queue.qsize(),
+                "inflight": len(self.service.inflight),
+                "keys": key_usage(),
+            })
+        elif parts == ["jobs"]:
+            if method != "POST":
+                raise HTTPError(405, "Use POST to submit a job")
+            self._submit(writer, body)
+        elif len(parts) in (2, 3) and parts[0] == "jobs":
+            if method != "GET":
+                raise HTTPError(405, "Use GET to read a job")
+            job_id = parts[1]
+            if job_id not in self.service.jobs:
+                raise HTTPError(404, f"Unknown job {job_id}")
+            view = parts[2] if len(parts) == 3 else None
+            if view is None:
+                write_response(writer, 200, self.service.describe(job_id))
+            elif view == "events":
+                await self._stream_events(writer, job_id)
+            elif view in ("html", "json"):
+                self._write_result(writer, job_id, view)
+            else:
+                raise HTTPError(404, f"Unknown view {view}")
+        else:
+            raise HTTPError(404, f"No route for {path}")
+
+    def _submit(self, writer, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        url = payload.get("url")
+        if not url:
+            raise HTTPError(400, "Missing 'url'")
+        try:
+            job_id, coalesced = self.service.submit(url, payload.get("provider"))
+        except asyncio.QueueFull:
+            self.service.stats["rejected"] += 1
+            raise HTTPError(429, "Queue is full, retry later")
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        status = self.service.describe(job_id)
+        status["coalesced"] = coalesced
+        write_response(writer, 202, status)
+
+    def _write_result(self, writer, job_id, view):
+        computation = self.service.jobs[job_id]["computation"]
+        if computation.status != "done":
+            raise HTTPError(409, f"Job is {computation.status}")
+        result = computation.result
+        if view == "html":
+            write_response(writer, 200, result["html"], content_type="text/html")
+        else:
+            write_response(writer, 200, {key: result[key] for key in ("title", "video_id", "thumbnail_url", "topics")})
+
+    async def _stream_events(self, writer, job_id):
+        computation = self.service.jobs[job_id]["computation"]
+        writer.write((
+            "HTTP/1.1 200 OK\r\n"
+            "Content-Type: text/event-stream\r\n"
+            "Cache-Control: no-cache\r\n"
+            "Connection: close\r\n\r\n"
+        ).encode("latin-1"))
+        while True:
+            status = computation.status
+            writer.write(f"event: status\ndata: {json.dumps(self.service.describe(job_id))}\n\n".encode("utf-8"))
+            await writer.drain()
+            if status in TERMINAL_STATES:
+                return
+            await computation.wait_for_change(timeout=15)
+
+def main():
+    """Command line entry point for the HTTP API server."""
+    parser = argparse.ArgumentParser(description="Serve YouTube summarization over a local HTTP API.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface to bind")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--concurrency", type=int, default=2, help="Videos processed at the same time")
+    parser.add_argument("--max-queue", type=int, default=100,
+                        help="Queued videos before new submissions are rejected with 429")
+    parser.add_argument("--deadline", type=parse_duration,
+                        help="Time budget for each video's run, e.g. 180s or 3m (default: none)")
+    args = parser.parse_args()
+
+    service = SummaryService(concurrency=args.concurrency, max_queue=args.max_queue, deadline=args.deadline)
+    try:
+        asyncio.run(SummaryServer(service, args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Server stopped")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
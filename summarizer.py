@@ -0,0 +1,215 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flow import create_youtube_processor_flow, create_chapter_flow, render_html, html_output_path
+from utils.call_llm import use_provider, get_current_provider, PROVIDERS
+from utils.dedup import dedup_options
+from utils.deadline import Deadline, use_deadline, current_deadline
+from utils.topics import Topic, topics_to_dicts
+from utils.usage import track_usage
+
+logger = logging.getLogger(__name__)
+
+# Shared store keys reported under SummaryResult.usage
+USAGE_KEYS = ("strategy_plan", "prompt_fit", "dedup_report", "process_stats", "cascade_stats")
+
+class SummaryConfig:
+    """
+    How to summarize a video.
+
+    provider is the LLM provider (the current one, LLM_PROVIDER, by default).
+    normalize, strategy, dedup, cascade and fit override those options for
+    the run (see utils.normalize, utils.strategy, utils.dedup, utils.cascade
+    and utils.fitting), e.g. dedup={"policy": "drop"};
+    chapters runs the chapter-aware flow; deadline is each video's time
+    budget in seconds (see utils.deadline). sinks are called with each
+    finished SummaryResult, e.g. HTMLFileSink() to save the page as the
+    command line does; without sinks nothing is written anywhere.
+    """
+    def __init__(self, provider=None, normalize=None, strategy=None, dedup=None, cascade=None, fit=None,
+                 chapters=False, deadline=None, sinks=()):
+        if provider is not None and provider.lower() not in PROVIDERS:
+            raise ValueError(f"Unsupported provider: {provider}. Supported providers: {', '.join(PROVIDERS)}")
+        self.provider = provider.lower() if provider else None
+        self.normalize = normalize
+        self.strategy = strategy
+        # An unknown dedup policy fails here rather than after the video is fetched
+        dedup_options(dedup)
+        self.dedup = dedup
+        self.cascade = cascade
+        self.fit = fit
+        self.chapters = chapters
+        self.deadline = deadline
+        self.sinks = list(sinks)
+
+class SummaryResult:
+    """
+    One video's summary: its topics with their answered questions, plus how
+    the run went.
+
+    timings holds seconds per flow node and in total; usage holds the LLM
+    calls and tokens ("llm") and the flow's own reports (USAGE_KEYS). error
+    is set instead of topics when summarize_many could not summarize the
+    video. outputs lists what the sinks saved.
+    """
+    __slots__ = ("url", "provider", "title", "video_id", "thumbnail_url", "topics", "timings", "usage",
+                 "error", "outputs")
+
+    def __init__(self, url, provider, title=None, video_id=None, thumbnail_url=None, topics=None,
+                 timings=None, usage=None, error=None):
+        self.url = url
+        self.provider = provider
+        self.title = title
+        self.video_id = video_id
+        self.thumbnail_url = thumbnail_url
+        self.topics = topics if topics is not None else []
+        self.timings = timings if timings is not None else {}
+        self.usage = usage if usage is not None else {}
+        self.error = error
+        self.outputs = []
+
+    def __repr__(self):
+        state = f"error={self.error!r}" if self.error is not None else f"{len(self.topics)} topics"
+        return f"SummaryResult({self.url!r}, {self.provider!r}, {state})"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def answers(self):
+        """(topic, question) pairs for every answered question"""
+        return [(topic, question) for topic in self.topics for question in topic.questions if question.answer]
+
+    def video_info(self):
+        """The video fields render_html() reads"""
+        return {"title": self.title, "video_id": self.video_id, "thumbnail_url": self.thumbnail_url}
+
+    def to_dict(self):
+        return {"url": self.url, "provider": self.provider, "title": self.title, "video_id": self.video_id,
+                "thumbnail_url": self.thumbnail_url, "topics": topics_to_dicts(self.topics),
+                "timings": self.timings, "usage": self.usage,
+                "error": str(self.error) if self.error is not None else None, "outputs": self.outputs}
+
+class HTMLFileSink:
+    """Save each summary page to <output_dir>/<title>_<provider>.html, as the command line does"""
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+
+    def __call__(self, result):
+        if not result.ok:
+            return
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = html_output_path(self.output_dir, result.video_info(), result.provider)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_html(result.video_info(), result.topics, provider=result.provider))
+        result.outputs.append(path)
+        logger.info(f"Saved summary page to {path}")
+
+class JSONFileSink:
+    """Save each result, failures included, to <output_dir>/<title or video id>_<provider>.json"""
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+
+    def __call__(self, result):
+        os.makedirs(self.output_dir, exist_ok=True)
+        info = {"title": result.title or result.video_id or "youtube_video"}
+        path = os.path.splitext(html_output_path(self.output_dir, info, result.provider))[0] + ".json"
+        result.outputs.append(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f, indent=2)
+
+def _shared_for(url, config, transcript_file):
+    shared = {"url": url}
+    if transcript_file:
+        shared["transcript_file"] = transcript_file
+    for key in ("normalize", "strategy", "dedup", "cascade", "fit"):
+        if getattr(config, key):
+            shared[key] = getattr(config, key)
+    return shared
+
+def summarize(url, config=None, transcript_file=None):
+    """
+    Summarize one video and return its SummaryResult.
+
+    transcript_file reads a local caption file instead of fetching url. The
+    provider and deadline apply to this call only: the process environment
+    is left alone and nothing is written unless config has sinks. Raises
+    the flow's error (DeadlineExceeded, PromptTooLargeError, ...) if the
+    video cannot be summarized.
+    """
+    config = config or SummaryConfig()
+    provider = config.provider or get_current_provider()
+    source = "file" if transcript_file else "youtube"
+    shared = _shared_for(url, config, transcript_file)
+
+    started = time.perf_counter()
+    # A deadline inside an enclosing one (a server request's) never outlasts it
+    deadline = Deadline(config.deadline, parent=current_deadline())
+    with use_provider(provider), use_deadline(deadline), track_usage() as meter:
+        if config.chapters:
+            asyncio.run(create_chapter_flow(source, render=False).run_async(shared))
+        else:
+            create_youtube_processor_flow(source, render=False).run(shared)
+
+    video_info = shared.get("video_info", {})
+    usage = {"llm": meter.to_dict()}
+    usage.update({key: shared[key] for key in USAGE_KEYS if key in shared})
+    result = SummaryResult(
+        url, provider,
+        title=video_info.get("title"),
+        video_id=video_info.get("video_id"),
+        thumbnail_url=video_info.get("thumbnail_url"),
+        topics=[Topic.coerce(topic) for topic in shared.get("topics", [])],
+        timings={**shared.get("timings", {}), "total": round(time.perf_counter() - started, 3)},
+        usage=usage,
+    )
+    for sink in config.sinks:
+        sink(result)
+    return result
+
+def _summarize_or_fail(url, config):
+    """summarize(), with a failure returned as a SummaryResult carrying the error"""
+    config = config or SummaryConfig()
+    try:
+        return summarize(url, config)
+    except Exception as e:
+        logger.error(f"❌ {url} failed: {e}")
+        result = SummaryResult(url, config.provider or get_current_provider(), error=e)
+        for sink in config.sinks:
+            sink(result)
+        return result
+
+def summarize_many(urls, config=None, concurrency=4):
+    """
+    Summarize urls, concurrency at a time, and return their SummaryResults in
+    the same order. A video that fails gets a result with error set instead
+    of stopping the others.
+    """
+    urls = list(urls)
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    with ThreadPoolExecutor(max_workers=min(concurrency, max(len(urls), 1))) as pool:
+        # Each video runs in a copy of the caller's context, so its provider and deadline carry over
+        futures = [pool.submit(contextvars.copy_context().run, _summarize_or_fail, url, config) for url in urls]
+        return [future.result() for future in futures]
+
+async def summarize_async(url, config=None, transcript_file=None):
+    """summarize() without blocking the event loop"""
+    # to_thread copies the context, so use_provider() and deadlines apply inside
+    return await asyncio.to_thread(summarize, url, config, transcript_file)
+
+async def summarize_many_async(urls, config=None, concurrency=4):
+    """summarize_many() without blocking the event loop"""
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    slots = asyncio.Semaphore(concurrency)
+
+    async def run(url):
+        async with slots:
+            return await asyncio.to_thread(_summarize_or_fail, url, config)
+
+    return list(await asyncio.gather(*(run(url) for url in urls)))
@@ -0,0 +1,152 @@
+"""Tests for batch mode: sharding, manifests and merging."""
+
+import json
+import os
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import main
+from utils.batch import (
+    parse_shard, shard_for, select_shard, Manifest, manifest_path, merge_manifests, write_index
+)
+
+URLS = [f"https://www.youtube.com/watch?v=video{i:06d}" for i in range(40)]
+
+
+class TestSharding:
+    """Test deterministic assignment of URLs to shards."""
+
+    def test_parse_shard(self):
+        """Test shard spec parsing and validation."""
+        assert parse_shard("2/4") == (2, 4)
+        assert parse_shard("1/1") == (1, 1)
+        for bad in ["0/4", "5/4", "a/b", "3"]:
+            with pytest.raises(ValueError):
+                parse_shard(bad)
+
+    def test_shards_partition_the_list(self):
+        """Test that every URL lands in exactly one shard."""
+        shards = [select_shard(URLS, i, 4) for i in range(1, 5)]
+
+        assert sorted(url for shard in shards for url in shard) == sorted(URLS)
+        assert all(shard for shard in shards)
+
+    def test_assignment_depends_only_on_video_id(self):
+        """Test that URL variants of the same video map to the same shard."""
+        assert shard_for("https://www.youtube.com/watch?v=video000001", 8) == \
+            shard_for("https://youtu.be/video000001?t=30", 8)
+
+    def test_duplicate_videos_processed_once(self):
+        """Test that the same video listed twice is only selected once."""
+        urls = ["https://youtu.be/video000001", "https://www.youtube.com/watch?v=video000001"]
+        assert len(select_shard(urls, 1, 1)) == 1
+
+
+class TestManifestAndMerge:
+    """Test manifest recording, resuming and merging."""
+
+    def test_completed_entries(self, tmp_path):
+        """Test that only successful entries count as completed."""
+        manifest = Manifest(manifest_path(str(tmp_path), 1, 2), shard="1/2")
+        manifest.record(URLS[0], "openai", "done", output_file="a.html")
+        manifest.record(URLS[1], "openai", "failed", error="boom")
+
+        assert manifest.completed() == {("video000000", "openai")}
+
+    def test_merge_reports_gaps_and_latest_entry_wins(self, tmp_path):
+        """Test merging several shard manifests against the expected URL list."""
+        output_dir = str(tmp_path)
+        first = Manifest(manifest_path(output_dir, 1, 2))
+        second = Manifest(manifest_path(output_dir, 2, 2))
+        first.record(URLS[0], "openai", "failed", error="timeout")
+        first.record(URLS[0], "openai", "done", output_file=os.path.join(output_dir, "a.html"), title="A")
+        second.record(URLS[1], "openai", "failed", error="boom")
+
+        merged = merge_manifests(output_dir, expected_urls=URLS[:3])
+
+        assert len(merged["manifests"]) == 2
+        assert [e["status"] for e in merged["entries"]] == ["done", "failed"]
+        assert [(g["video_id"], g["status"]) for g in merged["gaps"]] == [
+            ("video000001", "failed"), ("video000002", "missing")
+        ]
+
+        json_path, html_path = write_index(output_dir, merged)
+        with open(json_path) as f:
+            assert len(json.load(f)["entries"]) == 2
+        with open(html_path) as f:
+            assert '<a href="a.html">A</a>' in f.read()
+
+
+class TestBatchCLI:
+    """Test batch and merge modes through main."""
+
+    def test_batch_run_skips_completed_entries(self, tmp_path):
+        """Test that re-running a shard only retries what didn't finish."""
+        urls_file = tmp_path / "urls.txt"
+        urls_file.write_text("# backlog\n" + "\n".join(URLS[:4]) + "\n")
+        output_dir = str(tmp_path / "out")
+
+        def fake_run(shared):
+            shared["video_info"] = {"title": shared["url"][-11:]}
+            shared["output_file"] = os.path.join(shared["output_dir"], "x.html")
+
+        with patch('main.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow = MagicMock()
+            mock_flow.run.side_effect = fake_run
+            mock_flow_factory.return_value = mock_flow
+
+            argv = ['main.py', '--urls-file', str(urls_file), '--provider', 'openai',
+                    '--output-dir', output_dir, '--shard', '1/1']
+            with patch('sys.argv', argv):
+                assert main.main() == 0
+            assert mock_flow.run.call_count == 4
+
+            with patch('sys.argv', argv):
+                assert main.main() == 0
+            assert mock_flow.run.call_count == 4
+
+        with patch('sys.argv', ['main.py', '--merge', '--urls-file', str(urls_file),
+                                '--provider', 'openai', '--output-dir', output_dir]):
+            assert main.main() == 0
+
+    def test_batch_run_skips_known_unavailable_videos(self, tmp_path, capsys):
+        """Test that negatively cached videos are skipped and reported, not failed."""
+        urls_file = tmp_path / "urls.txt"
+        urls_file.write_text("\n".join(URLS[:3]) + "\n")
+        output_dir = str(tmp_path / "out")
+        no_captions = URLS[1][-11:]
+
+        def cached_failure(url):
+            return "Subtitles are disabled for this video" if url.endswith(no_captions) else None
+
+        with patch('main.create_youtube_processor_flow') as mock_flow_factory, \
+             patch('main.get_cached_failure', side_effect=cached_failure):
+            mock_flow = MagicMock()
+            mock_flow_factory.return_value = mock_flow
+            with patch('sys.argv', ['main.py', '--urls-file', str(urls_file), '--provider', 'openai',
+                                    '--output-dir', output_dir]):
+                assert main.main() == 0
+
+        assert mock_flow.run.call_count == 2
+        summary = capsys.readouterr().out
+        assert "1 unavailable" in summary
+        assert f"{no_captions}: Subtitles are disabled" in summary
+        entries = Manifest(manifest_path(output_dir)).entries()
+        assert [e["status"] for e in entries if e["video_id"] == no_captions] == ["unavailable"]
+
+    def test_merge_exit_code_flags_gaps(self, tmp_path):
+        """Test that missing videos make the merge command fail."""
+        urls_file = tmp_path / "urls.txt"
+        urls_file.write_text(URLS[0] + "\n")
+
+        with patch('sys.argv', ['main.py', '--merge', '--urls-file', str(urls_file),
+                                '--output-dir', str(tmp_path)]):
+            assert main.main() == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,176 @@
+"""Tests for provider batch API mode against a local stand-in for the files and batches endpoints."""
+
+import os
+import re
+import sys
+import json
+import threading
+import pytest
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from batch_api import BatchJob, run_batch_job, parse_batch_output
+from utils.call_llm import reset_clients
+
+
+def respond(prompt):
+    """What a model would answer: extraction YAML, or answers for every "- [id] question" in the prompt"""
+    if "expert content analyzer" in prompt:
+        title = re.search(r"VIDEO TITLE: (.*)", prompt).group(1)
+        return (f"```yaml\ntopics:\n  - title: {title} basics\n    questions:\n      - What is {title}?\n"
+                f"  - title: {title} history\n    questions:\n      - Where did {title} come from?\n```")
+    blocks = re.findall(r"TOPIC \[(\w+)\]: (.*)\nQUESTIONS:\n((?:- \[.*\n?)+)", prompt)
+    lines = ["topics:"]
+    for topic_id, title, questions in blocks:
+        lines += [f"  - id: {topic_id}", f"    rephrased_title: Better {title}", "    questions:"]
+        for qid, question in re.findall(r"- \[(\w+)\] (.*)", questions):
+            lines += [f"      - id: {qid}", f"        original: {question}",
+                      f"        rephrased: {question}", f"        answer: Answer to {question}"]
+    return "```yaml\n" + "\n".join(lines) + "\n```"
+
+
+def completion(body):
+    return {"id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": respond(body["messages"][0]["content"])}}]}
+
+
+class BatchStandIn(BaseHTTPRequestHandler):
+    """Mimics the files and batches lifecycle: upload, create, in_progress, completed, download."""
+    protocol_version = "HTTP/1.1"
+
+    def reply(self, payload, raw=None):
+        data = raw if raw is not None else json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream" if raw is not None else "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        state = self.server
+        if self.path == "/v1/files":
+            message = BytesParser().parsebytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body)
+            content = next(part.get_payload(decode=True) for part in message.get_payload()
+                           if part.get_param("name", header="content-disposition") == "file")
+            file_id = f"file-{len(state.files) + 1}"
+            state.files[file_id] = content
+            self.reply({"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                        "filename": "input.jsonl", "purpose": "batch", "status": "processed"})
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = f"batch-{len(state.batches) + 1}"
+            state.batches[batch_id] = {"id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                                       "input_file_id": request["input_file_id"], "created_at": 0,
+                                       "completion_window": request["completion_window"], "status": "validating"}
+            self.reply(state.batches[batch_id])
+        elif self.path == "/v1/chat/completions":
+            state.live_calls += 1
+            self.reply(completion(json.loads(body)))
+
+    def do_GET(self):
+        state = self.server
+        parts = self.path.strip("/").split("/")
+        if parts[1] == "batches":
+            batch = state.batches[parts[2]]
+            # First look: still running. Second: done, with an output file
+            if batch["status"] == "validating":
+                batch["status"] = "in_progress"
+            elif batch["status"] == "in_progress":
+                output = []
+                for line in state.files[batch["input_file_id"]].decode().splitlines():
+                    request = json.loads(line)
+                    output.append(json.dumps({"custom_id": request["custom_id"], "error": None,
+                                              "response": {"status_code": 200, "body": completion(request["body"])}}))
+                output_id = f"file-{len(state.files) + 1}"
+                state.files[output_id] = "\n".join(output).encode()
+                batch.update(status="completed", output_file_id=output_id)
+            self.reply(batch)
+        elif parts[1] == "files" and parts[3:] == ["content"]:
+            self.reply(None, raw=state.files[parts[2]])
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchStandIn)
+    server.files, server.batches, server.live_calls = {}, {}, 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    reset_clients()
+    with patch.dict(os.environ, {"LLM_PROVIDER": "compatible", "COMPATIBLE_MODEL": "local-model",
+                                 "COMPATIBLE_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1"}):
+        yield server
+    server.shutdown()
+    server.server_close()
+    reset_clients()
+
+
+def fake_video_info(url, use_cache=True):
+    video_id = url[-11:]
+    return {"title": f"Topic{video_id[0]}", "video_id": video_id, "thumbnail_url": "",
+            "transcript": f"Transcript of {video_id}."}
+
+
+URLS = ["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb"]
+
+
+class TestBatchJob:
+    """Test the batch job lifecycle end to end."""
+
+    def test_lifecycle_resumes_across_restarts(self, stand_in, tmp_path):
+        """Test extract and answer batches, with a fresh BatchJob (a restart) between every step."""
+        def job():
+            return BatchJob(URLS, "compatible", str(tmp_path), normalize={"enabled": False})
+
+        with patch('batch_api.get_video_info', side_effect=fake_video_info):
+            assert job().step() == "extract"
+            assert len(stand_in.batches) == 1
+            assert job().step() == "extract"      # in progress
+            assert job().step() == "answer"       # extract done, answer submitted
+            assert job().step() == "answer"
+            assert job().step() == "done"
+            outputs = job().state["outputs"]
+
+        assert len(stand_in.batches) == 2
+        assert stand_in.live_calls == 0
+        assert sorted(outputs) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+        html = open(outputs["aaaaaaaaaaa"], encoding="utf-8").read()
+        assert "Better ToPica basics".lower() in html.lower()
+        assert "Answer to What is Topica?" in html
+        # Both videos' topics were packed into one answering request each
+        answer_input = (tmp_path / "batch-api" / job().name / "answer-input.jsonl").read_text().splitlines()
+        assert len(answer_input) == 2
+
+    def test_run_once_returns_early(self, stand_in, tmp_path):
+        """Test that once submits and returns without waiting for the batch."""
+        with patch('batch_api.get_video_info', side_effect=fake_video_info):
+            job = BatchJob(URLS[:1], "compatible", str(tmp_path), normalize={"enabled": False})
+            assert run_batch_job(job, once=True) == {}
+            assert job.stage == "extract"
+            assert run_batch_job(job, poll_interval=0) == {"aaaaaaaaaaa": job.state["outputs"]["aaaaaaaaaaa"]}
+
+    def test_requires_batch_provider(self, tmp_path):
+        """Test that providers without a batch API are refused."""
+        with pytest.raises(ValueError, match="batch API"):
+            BatchJob(URLS, "gemini", str(tmp_path))
+
+
+def test_parse_batch_output_skips_failures():
+    """Test that failed lines are left out, so their prompts become ordinary calls."""
+    text = "\n".join([
+        json.dumps({"custom_id": "a", "error": None,
+                    "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "ok"}}]}}}),
+        json.dumps({"custom_id": "b", "error": {"code": "server_error"}, "response": None}),
+    ])
+    assert parse_batch_output(text) == {"a": "ok"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
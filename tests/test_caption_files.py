@@ -0,0 +1,147 @@
+"""Tests for reading local SRT, WebVTT and JSON caption files."""
+
+import json
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import main
+from flow import LoadTranscriptFile
+from utils.caption_files import iter_cues, load_transcript_file, find_transcript_files
+
+SRT = """1
+00:00:01,000 --> 00:00:04,500
+Hello and welcome
+
+2
+00:00:04,500 --> 00:00:07,000
+to the <i>show</i> &amp; tell
+
+3
+01:00:00,000 --> 01:00:02,000
+Late line
+"""
+
+VTT = """WEBVTT
+Kind: captions
+Language: en
+
+NOTE this is a comment
+
+intro
+00:01.000 --> 00:04.500 align:start position:0%
+Hello<00:00:02.000><c> and</c><c> welcome</c>
+
+00:04.500 --> 00:07.000
+<v Host>to the show</v>
+"""
+
+
+class TestParsers:
+    """Test the streaming cue parser and file loading."""
+
+    def test_srt_cues(self):
+        """Test SRT timings, markup and entities."""
+        cues = list(iter_cues(SRT.splitlines()))
+        assert cues[0] == {"text": "Hello and welcome", "start": 1.0, "duration": 3.5}
+        assert cues[1]["text"] == "to the show & tell"
+        assert cues[2]["start"] == 3600.0
+
+    def test_vtt_cues(self):
+        """Test WebVTT header, notes, cue IDs and inline timestamps."""
+        cues = list(iter_cues(VTT.splitlines()))
+        assert [c["text"] for c in cues] == ["Hello and welcome", "to the show"]
+        assert cues[0]["start"] == 1.0
+        assert cues[1]["duration"] == pytest.approx(2.5)
+
+    def test_load_file_matches_video_info_shape(self, tmp_path):
+        """Test that a file becomes video_info with timestamps, named like yt-dlp output."""
+        path = tmp_path / "Great Talk [aaaaaaaaaaa].en.vtt"
+        path.write_text(VTT, encoding="utf-8")
+
+        info = load_transcript_file(str(path))
+
+        assert info["title"] == "Great Talk"
+        assert info["video_id"] == "aaaaaaaaaaa"
+        assert info["transcript"] == "Hello and welcome to the show"
+        assert info["segments"].segment(1) == (4.5, 2.5, "to the show")
+        assert info["thumbnail_url"].endswith("/aaaaaaaaaaa/maxresdefault.jpg")
+
+    def test_load_json_formats(self, tmp_path):
+        """Test youtube-transcript-api lists, exports with metadata, and YouTube json3."""
+        raw = tmp_path / "raw.json"
+        raw.write_text(json.dumps([{"text": "one", "start": 0, "duration": 1},
+                                   {"text": "two", "start": 1, "duration": 1}]))
+        export = tmp_path / "export.json"
+        export.write_text(json.dumps({"title": "Exported", "video_id": "bbbbbbbbbbb",
+                                      "segments": [{"text": "three", "start": 5, "duration": 2}]}))
+        json3 = tmp_path / "talk.en.json"
+        json3.write_text(json.dumps({"events": [{"tStartMs": 1500, "dDurationMs": 1000,
+                                                 "segs": [{"utf8": "four "}, {"utf8": "five"}]},
+                                                {"tStartMs": 2500, "segs": [{"utf8": "\n"}]}]}))
+
+        assert load_transcript_file(str(raw))["transcript"] == "one two"
+        assert load_transcript_file(str(raw))["title"] == "raw"
+        exported = load_transcript_file(str(export))
+        assert (exported["title"], exported["video_id"]) == ("Exported", "bbbbbbbbbbb")
+        assert load_transcript_file(str(json3))["segments"].segment(0) == (1.5, 1.0, "four five")
+
+    def test_bad_files_are_errors(self, tmp_path):
+        """Test unsupported, empty and unreadable files."""
+        empty = tmp_path / "empty.srt"
+        empty.write_text("")
+        assert "No captions" in load_transcript_file(str(empty))["error"]
+        assert "Unsupported" in load_transcript_file(str(tmp_path / "notes.txt"))["error"]
+        assert "Could not read" in load_transcript_file(str(tmp_path / "missing.srt"))["error"]
+
+    def test_find_files_in_directory(self, tmp_path):
+        """Test that directories are searched recursively for caption files."""
+        (tmp_path / "sub").mkdir()
+        for name in ("b.srt", "sub/a.vtt", "notes.txt"):
+            (tmp_path / name).write_text(SRT)
+        found = find_transcript_files(str(tmp_path))
+        assert [os.path.relpath(p, tmp_path) for p in found] == ["b.srt", os.path.join("sub", "a.vtt")]
+
+
+class TestLocalTranscriptCLI:
+    """Test the node and the --transcript option."""
+
+    def test_node_loads_file_without_network(self, tmp_path):
+        """Test that LoadTranscriptFile fills video_info and never calls YouTube."""
+        path = tmp_path / "talk.srt"
+        path.write_text(SRT)
+        shared = {"transcript_file": str(path)}
+
+        with patch('flow.get_video_info') as mock_get_video_info:
+            LoadTranscriptFile().run(shared)
+
+        mock_get_video_info.assert_not_called()
+        assert shared["video_info"]["title"] == "talk"
+        assert len(shared["video_info"]["segments"]) == 3
+
+    def test_cli_processes_each_file(self, tmp_path):
+        """Test that --transcript with a directory runs the file flow per caption file."""
+        for name in ("one.srt", "two.vtt"):
+            (tmp_path / name).write_text(SRT)
+        seen = []
+
+        def fake_run(shared):
+            seen.append(shared["transcript_file"])
+            shared["output_file"] = "x.html"
+
+        with patch('main.create_youtube_processor_flow') as mock_flow_factory, \
+             patch('sys.argv', ['main.py', '--transcript', str(tmp_path), '--provider', 'openai',
+                                '--output-dir', str(tmp_path / "out")]):
+            mock_flow_factory.return_value.run.side_effect = fake_run
+            assert main.main() == 0
+
+        assert [os.path.basename(p) for p in seen] == ["one.srt", "two.vtt"]
+        mock_flow_factory.assert_called_with(source="file")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,139 @@
+"""Tests for the fast-model-first cascade and its local validation."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flow import ProcessContent, ExtractTopicsAndQuestions
+from utils.call_llm import get_model_for_task, _tier_override
+from utils.cascade import check_html, validate_answered_topic, cascade_options, cascade_active
+from utils.topics import Topic, Question
+
+GOOD_ANSWER = "<ol><li><b>Entanglement</b> links the states of two particles, however far apart.</li></ol>"
+
+MODELS = {
+    "LLM_PROVIDER": "openai",
+    "OPENAI_API_KEY": "sk-test",
+    "OPENAI_ANALYSIS_MODEL": "gpt-4o",
+    "OPENAI_SIMPLIFICATION_MODEL": "gpt-4o",
+    "OPENAI_FAST_MODEL": "gpt-4o-mini",
+}
+
+
+def answered(topic_id, answer):
+    return Topic(topic_id, "Title", [Question(f"{topic_id}q1", "What?", "What, clearly?", answer)], "Better title")
+
+
+def answer_prompt(prompt, good):
+    """A single-topic YAML response for the question in prompt"""
+    qid, question = prompt.split("QUESTIONS:\n")[1].splitlines()[0][3:].split("] ", 1)
+    answer = GOOD_ANSWER if good else "Yes."
+    return (f"```yaml\nrephrased_title: Better\nquestions:\n  - id: {qid}\n    original: {question}\n"
+            f"    rephrased: {question}\n    answer: \"{answer}\"\n```")
+
+
+class TestValidation:
+    """Test the local checks that decide escalation."""
+
+    def test_check_html(self):
+        """Test that prompt tags pass and stray or unbalanced tags don't."""
+        assert check_html(GOOD_ANSWER) == []
+        assert check_html("Line<br>break") == []
+        assert check_html("<b>open") == ["unclosed <b>"]
+        assert check_html("<script>x</script>") == ["unexpected <script>"]
+        assert check_html("text</i>") == ["stray </i>"]
+
+    def test_validate_answered_topic(self):
+        """Test coverage, completeness and length checks."""
+        options = cascade_options()
+        topic = Topic("t1", "Title", [Question("t1q1", "What?"), Question("t1q2", "Why?")])
+        result = answered("t1", GOOD_ANSWER)
+        problems = validate_answered_topic(topic, result, options)
+        assert problems == ["questions t1q2 not answered"]
+        single = Topic("t1", "Title", [Question("t1q1", "What?")])
+        assert "too short" in validate_answered_topic(single, answered("t1", "Yes."), options)[0]
+
+    def test_unknown_task(self):
+        """Test that a typo in the task list is an error."""
+        with pytest.raises(ValueError):
+            cascade_options({"tasks": ["summary"]})
+
+
+class TestFastModels:
+    """Test fast-tier model selection."""
+
+    def test_fast_model_for_task(self):
+        """Test the per-task fast model, the provider fast model, then the default."""
+        with patch.dict(os.environ, {"OPENAI_FAST_MODEL": "gpt-4.1-mini",
+                                     "OPENAI_FAST_ANALYSIS_MODEL": "o4-mini"}):
+            assert get_model_for_task("openai", "analysis", "fast") == "o4-mini"
+            assert get_model_for_task("openai", "simplification", "fast") == "gpt-4.1-mini"
+        with patch.dict(os.environ, {}, clear=True):
+            assert get_model_for_task("openai", "simplification", "fast") == "gpt-4o-mini"
+
+    def test_inactive_when_fast_model_is_the_regular_one(self):
+        """Test that the cascade is skipped when there is nothing cheaper to try."""
+        with patch.dict(os.environ, {**MODELS, "OPENAI_FAST_MODEL": "gpt-4o"}):
+            assert not cascade_active("simplification", cascade_options({"enabled": True}))
+        with patch.dict(os.environ, MODELS):
+            assert cascade_active("simplification", cascade_options({"enabled": True}))
+            assert not cascade_active("simplification", cascade_options({"enabled": False}))
+
+
+class TestCascadeFlow:
+    """Test escalation of failing items in the flow nodes."""
+
+    def test_only_failing_topics_escalate(self):
+        """Test that the fast model answers everything and only the bad answer is redone."""
+        shared = {
+            "video_info": {"transcript": "Transcript"},
+            "topics": [{"title": "A", "questions": ["What is A?"]}, {"title": "B", "questions": ["What is B?"]}],
+            "process_output_budget": 0,
+            "cascade": {"enabled": True},
+        }
+        tiers = []
+
+        def fake_llm(prompt, task=None):
+            tiers.append(_tier_override.get())
+            # The fast model stumbles on topic B
+            return answer_prompt(prompt, good=_tier_override.get() is None or "What is A?" in prompt)
+
+        with patch.dict(os.environ, MODELS), patch('flow.call_llm', side_effect=fake_llm):
+            ProcessContent().run(shared)
+
+        assert tiers == ["fast", "fast", None]
+        assert [t.questions[0].answer for t in shared["topics"]] == [GOOD_ANSWER, GOOD_ANSWER]
+        assert shared["cascade_stats"]["simplification"] == {"items": 2, "escalated": 1, "rate": 0.5}
+
+    def test_extraction_escalates_empty_topics(self):
+        """Test that an extraction without usable topics is redone on the regular model."""
+        good = "```yaml\ntopics:\n  - title: Qubits\n    questions:\n      - What is a qubit?\n```"
+
+        def fake_llm(prompt, task=None):
+            return "```yaml\ntopics: []\n```" if _tier_override.get() == "fast" else good
+
+        shared = {"video_info": {"transcript": "Transcript", "title": "Video"}, "cascade": {"enabled": True}}
+        with patch.dict(os.environ, MODELS), patch('flow.call_llm', side_effect=fake_llm) as mock_call_llm:
+            ExtractTopicsAndQuestions().run(shared)
+
+        assert mock_call_llm.call_count == 2
+        assert shared["topics"][0].title == "Qubits"
+        assert shared["cascade_stats"]["analysis"]["escalated"] == 1
+
+    def test_disabled_by_default(self):
+        """Test that without the cascade each call uses the regular model."""
+        shared = {"video_info": {"transcript": "Transcript"},
+                  "topics": [{"title": "A", "questions": ["What is A?"]}]}
+        with patch.dict(os.environ, MODELS), \
+                patch('flow.call_llm', side_effect=lambda p, task=None: answer_prompt(p, False)) as mock_call_llm:
+            ProcessContent().run(shared)
+        assert mock_call_llm.call_count == 1
+        assert "cascade_stats" not in shared
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
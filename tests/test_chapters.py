@@ -0,0 +1,138 @@
+"""Tests for chapter detection and the parallel chapter flow."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flow import create_chapter_flow
+from utils.chapters import (
+    parse_chapter_markers, segment_by_topic, build_chapters, format_timestamp, timestamp_url
+)
+from utils.transcript import Transcript
+
+DESCRIPTION = """Great talk about compilers.
+
+0:00 Intro
+2:30 - Lexing
+1:05:00 Parsing and ASTs
+"""
+
+
+def topical_transcript(topics, seconds_per_topic, seconds_per_segment=10):
+    """A transcript that talks about each topic's words for seconds_per_topic."""
+    entries = []
+    start = 0.0
+    for words in topics:
+        for i in range(int(seconds_per_topic / seconds_per_segment)):
+            entries.append({"text": f"{words} {words.split()[i % 3]}", "start": start, "duration": seconds_per_segment})
+            start += seconds_per_segment
+    return Transcript.from_entries(entries)
+
+
+TOPICS = [
+    "gardening tomatoes compost soil watering",
+    "football goalkeeper penalty league stadium",
+    "quantum entanglement photon measurement qubits",
+]
+
+
+class TestChapterDetection:
+    """Test markers, segmentation and chapter slicing."""
+
+    def test_parse_description_markers(self):
+        """Test YouTube-style chapter lists in descriptions."""
+        assert parse_chapter_markers(DESCRIPTION) == [(0, "Intro"), (150, "Lexing"), (3900, "Parsing and ASTs")]
+        assert parse_chapter_markers("1:00 Not from zero\n2:00 b\n3:00 c") == []
+        assert parse_chapter_markers("0:00 Too\n1:00 few") == []
+
+    def test_topic_shifts_become_chapter_boundaries(self):
+        """Test that cuts land where the vocabulary changes."""
+        transcript = topical_transcript(TOPICS, 600)
+        starts = segment_by_topic(transcript, target_seconds=600, min_seconds=180, max_seconds=1200)
+        assert starts == [0.0, 600.0, 1200.0]
+
+    def test_chapters_respect_maximum_length(self):
+        """Test that a long single-topic video is still split."""
+        transcript = topical_transcript(TOPICS[:1], 3000)
+        starts = segment_by_topic(transcript, target_seconds=600, min_seconds=180, max_seconds=1200)
+        gaps = [b - a for a, b in zip(starts, starts[1:] + [3000])]
+        assert max(gaps) <= 1200
+        assert min(gaps) >= 180
+
+    def test_build_chapters_prefers_markers(self):
+        """Test explicit chapters, description markers and segmentation, in that order."""
+        segments = topical_transcript(TOPICS, 600)
+        info = {"transcript": segments.text, "segments": segments}
+
+        explicit = build_chapters({**info, "chapters": [{"start_time": 0, "title": "A"},
+                                                         {"start_time": 900, "title": "B"}]})
+        assert [(c["title"], c["start"]) for c in explicit] == [("A", 0.0), ("B", 900.0)]
+        assert explicit[1]["end"] == 1800
+        assert explicit[0]["transcript"].split()[0] == "gardening"
+
+        from_description = build_chapters({**info, "description": "0:00 a\n5:00 b\n10:00 c"})
+        assert [c["title"] for c in from_description] == ["a", "b", "c"]
+
+        segmented = build_chapters(info)
+        assert [c["title"] for c in segmented] == [None, None, None]
+        assert "football" in segmented[1]["transcript"]
+
+    def test_timestamps(self):
+        """Test timestamp formatting and links."""
+        assert format_timestamp(75) == "1:15"
+        assert format_timestamp(3905) == "1:05:05"
+        assert timestamp_url("aaaaaaaaaaa", 75.6) == "https://www.youtube.com/watch?v=aaaaaaaaaaa&t=75s"
+
+
+class TestChapterFlow:
+    """Test the parallel chapter flow end to end with a fake LLM."""
+
+    def test_chapters_are_summarized_in_parallel(self, tmp_path):
+        """Test that chapter calls overlap and the HTML links to each chapter."""
+        segments = topical_transcript(TOPICS, 600)
+        video_info = {"title": "Mixed Bag", "video_id": "aaaaaaaaaaa", "transcript": segments.text,
+                      "segments": segments, "thumbnail_url": ""}
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fake_llm(prompt, task=None):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.2)
+            with lock:
+                active[0] -= 1
+            topic = next(words.split()[0] for words in TOPICS if words.split()[0] in prompt)
+            return f"""```yaml
+rephrased_title: |
+    All about {topic}
+questions:
+  - original: |
+        What about {topic}?
+    rephrased: |
+        Why {topic}?
+    answer: |
+        Because {topic}.
+```"""
+
+        shared = {"url": "https://youtu.be/aaaaaaaaaaa", "output_dir": str(tmp_path),
+                  "normalize": {"enabled": False}}
+        with patch('flow.get_video_info', return_value=video_info), \
+             patch('flow.call_llm', side_effect=fake_llm):
+            asyncio.run(create_chapter_flow().run_async(shared))
+
+        assert peak[0] == 3
+        assert [t["rephrased_title"] for t in shared["topics"]] == [
+            "All about gardening", "All about football", "All about quantum"]
+        assert "watch?v=aaaaaaaaaaa&t=600s" in shared["html_output"]
+        assert "[10:00]" in shared["html_output"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,39 @@
+"""Tests that the code runs on the oldest supported Python (requires-python >= 3.9)."""
+
+import os
+import ast
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# Calls added after Python 3.9: name -> version that added it
+NEWER_ATTRIBUTES = {"bit_count": "3.10", "pairwise": "3.10", "batched": "3.12"}
+NEWER_BUILTINS = {"aiter": "3.10", "anext": "3.10"}
+
+
+def source_files():
+    for directory in (ROOT, os.path.join(ROOT, "utils")):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                yield os.path.join(directory, name)
+
+
+@pytest.mark.parametrize("path", list(source_files()), ids=os.path.basename)
+def test_python39_compatible(path):
+    """Test that a module parses as Python 3.9 and calls nothing newer."""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path, feature_version=(3, 9))
+    problems = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute) and node.attr in NEWER_ATTRIBUTES:
+            problems.append(f"line {node.lineno}: .{node.attr} needs Python {NEWER_ATTRIBUTES[node.attr]}")
+        elif isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in NEWER_BUILTINS:
+                problems.append(f"line {node.lineno}: {node.func.id}() needs Python {NEWER_BUILTINS[node.func.id]}")
+            if any(keyword.arg == "strict" for keyword in node.keywords) and getattr(node.func, "id", None) == "zip":
+                problems.append(f"line {node.lineno}: zip(strict=) needs Python 3.10")
+    assert not problems, "\n".join(problems)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
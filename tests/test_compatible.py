@@ -0,0 +1,134 @@
+"""Tests for the OpenAI-compatible endpoint provider against a local stand-in server."""
+
+import os
+import sys
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import utils.call_llm as call_llm_module
+from utils.call_llm import call_llm, get_model_for_task, validate_provider_config, reset_clients
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions like an OpenAI-compatible server, over keep-alive HTTP/1.1."""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        server.requests.append((self.path, body["model"], self.client_address))
+        if server.delay:
+            # Not time.sleep, which the retry tests patch out
+            threading.Event().wait(server.delay)
+        payload = json.dumps({
+            "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"echo: {body['messages'][0]['content']}"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 3, "total_tokens": 6},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that timed out have hung up; that's expected
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = StandInServer(("127.0.0.1", 0), StandInHandler)
+    server.requests = []
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    reset_clients()
+    yield server
+    server.shutdown()
+    server.server_close()
+    reset_clients()
+
+
+def environment(server, **extra):
+    return {"LLM_PROVIDER": "compatible",
+            "COMPATIBLE_BASE_URL": f"http://127.0.0.1:{server.server_address[1]}/v1",
+            "COMPATIBLE_MODEL": "local-model", **extra}
+
+
+class TestCompatibleConfig:
+    """Test configuration and model mapping."""
+
+    def test_requires_base_url(self):
+        """Test that the endpoint URL is required but an API key is not."""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ValueError, match="COMPATIBLE_BASE_URL"):
+                validate_provider_config("compatible")
+        with patch.dict(os.environ, {"COMPATIBLE_BASE_URL": "http://localhost:8000/v1"}, clear=True):
+            validate_provider_config("compatible")
+
+    def test_task_models(self):
+        """Test per-task models falling back to COMPATIBLE_MODEL."""
+        with patch.dict(os.environ, {"COMPATIBLE_MODEL": "qwen2.5-7b",
+                                     "COMPATIBLE_ANALYSIS_MODEL": "qwen2.5-32b"}, clear=True):
+            assert get_model_for_task("compatible", "analysis") == "qwen2.5-32b"
+            assert get_model_for_task("compatible", "simplification") == "qwen2.5-7b"
+            # No cheaper model is known, so the cascade's fast tier is the same model
+            assert get_model_for_task("compatible", "simplification", "fast") == "qwen2.5-7b"
+
+
+class TestCompatibleCalls:
+    """Test calls against the stand-in server."""
+
+    def test_calls_reuse_one_connection(self, stand_in):
+        """Test that calls reach the endpoint with the task's model over a kept-alive connection."""
+        with patch.dict(os.environ, environment(stand_in, COMPATIBLE_SIMPLIFICATION_MODEL="small-model")):
+            assert call_llm("hello", task="simplification") == "echo: hello"
+            call_llm("again", task="simplification")
+            call_llm("analysis", task="analysis")
+
+        assert [(path, model) for path, model, _ in stand_in.requests] == [
+            ("/v1/chat/completions", "small-model"),
+            ("/v1/chat/completions", "small-model"),
+            ("/v1/chat/completions", "local-model"),
+        ]
+        assert len({address for _, _, address in stand_in.requests}) == 1
+
+    def test_task_routing(self, stand_in):
+        """Test that SIMPLIFICATION_PROVIDER sends only simplification to the endpoint."""
+        env = environment(stand_in, LLM_PROVIDER="openai", OPENAI_API_KEY="sk-test-key-1234",
+                          SIMPLIFICATION_PROVIDER="compatible")
+        with patch.dict(os.environ, env), \
+                patch('utils.call_llm.call_llm_openai', return_value="from openai") as mock_openai:
+            assert call_llm("simplify", task="simplification") == "echo: simplify"
+            assert call_llm("analyze", task="analysis") == "from openai"
+        assert mock_openai.call_count == 1
+        assert len(stand_in.requests) == 1
+
+    def test_read_timeout(self, stand_in):
+        """Test that a stalled endpoint fails after the read timeout instead of hanging."""
+        stand_in.delay = 1.0
+        with patch.dict(os.environ, environment(stand_in)), \
+                patch.object(call_llm_module, "COMPATIBLE_READ_TIMEOUT", 0.2), \
+                patch('utils.deadline.time.sleep'):
+            started = time.monotonic()
+            with pytest.raises(Exception):
+                call_llm("slow")
+            assert time.monotonic() - started < 3
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
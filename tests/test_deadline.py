@@ -0,0 +1,171 @@
+"""Tests for run deadlines: bounded timeouts, budgeted retries and cancellation."""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.deadline import (
+    Deadline, DeadlineExceeded, use_deadline, current_deadline, parse_duration, bounded_timeout,
+    DEADLINE_MIN_ATTEMPT_SECONDS
+)
+from utils.http_session import TimeoutSession
+from utils.call_llm import call_llm, call_llm_openai, reset_clients
+from pocketflow import AsyncParallelBatchNode
+from flow import RetryNode, AsyncRetryNode
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingNode(RetryNode):
+    def exec(self, prep_res):
+        self.attempts = getattr(self, "attempts", 0) + 1
+        raise RuntimeError("provider down")
+
+
+class TestDeadline:
+    """Test the Deadline itself."""
+
+    def test_parse_duration(self):
+        """Test seconds, minutes, hours and bare numbers."""
+        assert parse_duration("180s") == 180
+        assert parse_duration("3m") == 180
+        assert parse_duration("1.5h") == 5400
+        assert parse_duration("90") == 90
+        with pytest.raises(ValueError):
+            parse_duration("soon")
+
+    def test_timeouts_are_bounded(self):
+        """Test that timeouts shrink to the time left, and run out with it."""
+        clock = FakeClock()
+        deadline = Deadline(60, clock=clock)
+        assert deadline.timeout(30) == 30
+        assert deadline.timeout((5, 300)) == (5, 60)
+        assert deadline.timeout() == 60
+        assert deadline.allows(10)
+        clock.now += 55
+        assert not deadline.allows(10)
+        clock.now += 5
+        with pytest.raises(DeadlineExceeded, match="60s"):
+            deadline.timeout(30)
+        # No time limit: nothing is bounded
+        assert Deadline().timeout() is None
+
+    def test_nested_deadlines(self):
+        """Test that an inner deadline never outlasts the outer one and is cancelled with it."""
+        with use_deadline(10) as outer:
+            with use_deadline(60) as inner:
+                assert current_deadline() is inner
+                assert inner.remaining() <= 10
+                outer.cancel("interrupted")
+                with pytest.raises(DeadlineExceeded, match="interrupted"):
+                    bounded_timeout(5)
+        assert current_deadline() is None
+
+    def test_cancel_wakes_up_waits(self):
+        """Test that cancelling a run ends a retry wait at once."""
+        deadline = Deadline(60)
+        threading.Timer(0.1, deadline.cancel, args=("interrupted",)).start()
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            deadline.sleep(10)
+        assert time.monotonic() - started < 2
+
+
+class TestBoundedCalls:
+    """Test that HTTP and LLM calls stay inside the deadline."""
+
+    def test_http_timeouts(self):
+        """Test that the session cuts explicit and default timeouts to the time left."""
+        session = TimeoutSession(timeout=(5, 30))
+        with patch('requests.Session.request', return_value=MagicMock(status_code=200)) as mock_request:
+            session.request("GET", "http://example.com/a")
+            with use_deadline(2):
+                session.request("GET", "http://example.com/b", timeout=10)
+        assert mock_request.call_args_list[0].kwargs["timeout"] == (5, 30)
+        assert mock_request.call_args_list[1].kwargs["timeout"] <= 2
+
+    def test_call_llm_stops_after_deadline(self):
+        """Test that no provider call is made once the run is out of time."""
+        clock = FakeClock()
+        deadline = Deadline(1, clock=clock)
+        clock.now += 2
+        with patch('utils.call_llm.call_llm_openai') as mock_call, use_deadline(deadline):
+            with pytest.raises(DeadlineExceeded):
+                call_llm("prompt")
+        mock_call.assert_not_called()
+
+    def test_retries_need_budget(self):
+        """Test that requests get the time left as their timeout and a retry that wouldn't fit is skipped."""
+        client = MagicMock()
+        client.chat.completions.create.side_effect = RuntimeError("server error")
+        reset_clients()
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test-key-1234"}, clear=True), \
+                patch('utils.call_llm.OpenAI', return_value=client), patch('utils.deadline.time.sleep') as mock_sleep:
+            with use_deadline(DEADLINE_MIN_ATTEMPT_SECONDS):
+                with pytest.raises(RuntimeError, match="server error"):
+                    call_llm_openai("prompt", model="gpt-4o")
+            # Without a deadline the usual three attempts are made
+            with pytest.raises(RuntimeError):
+                call_llm_openai("prompt", model="gpt-4o")
+        reset_clients()
+        first = client.chat.completions.create.call_args_list[0].kwargs
+        assert 0 < first["timeout"] <= DEADLINE_MIN_ATTEMPT_SECONDS
+        assert client.chat.completions.create.call_count == 1 + 3
+        assert "timeout" not in client.chat.completions.create.call_args_list[-1].kwargs
+        assert mock_sleep.call_count == 2
+
+
+class TestRetryNode:
+    """Test node retries under a deadline."""
+
+    def test_no_retry_without_budget(self):
+        """Test that a node doesn't wait 10s for a retry when the deadline is closer than that."""
+        node = FailingNode(max_retries=3, wait=10)
+        started = time.monotonic()
+        with use_deadline(8), pytest.raises(RuntimeError):
+            node.run({})
+        assert node.attempts == 1
+        assert time.monotonic() - started < 2
+
+    def test_retries_without_deadline(self):
+        """Test that retries are unchanged outside a deadline."""
+        node = FailingNode(max_retries=3, wait=0)
+        with pytest.raises(RuntimeError):
+            node.run({})
+        assert node.attempts == 3
+
+    def test_parallel_items_retry_independently(self):
+        """Test that concurrent batch items each get every attempt on one node."""
+        attempts = {0: 0, 1: 0}
+
+        class FlakyItems(AsyncParallelBatchNode, AsyncRetryNode):
+            async def prep_async(self, shared):
+                return [0, 1]
+
+            async def exec_async(self, item):
+                attempts[item] += 1
+                # Item 1 gets ahead to its last attempt while item 0 is still on its first
+                await asyncio.sleep(0.05 if item == 0 else 0)
+                if attempts[item] < 2:
+                    raise RuntimeError("flaky")
+                return item
+
+        asyncio.run(FlakyItems(max_retries=2).run_async({}))
+        assert attempts == {0: 2, 1: 2}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,111 @@
+"""Tests for near-duplicate question detection and answer fan-out."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from pocketflow import Flow
+from flow import DedupeQuestions, ProcessContent, FanOutAnswers
+from utils.dedup import find_duplicates, signature, similarity, dedup_options
+
+
+def topic(title, *questions):
+    return {"title": title, "questions": [{"original": q, "rephrased": "", "answer": ""} for q in questions]}
+
+
+def shared_with_overlap():
+    return {
+        "video_info": {"transcript": "Transcript"},
+        "topics": [
+            topic("Physics", "What is quantum entanglement?", "How are qubits measured?"),
+            topic("Computing", "What exactly is quantum entanglement?", "Why do qubits lose coherence?"),
+            topic("Recap", "what is quantum entanglement"),
+        ],
+        "process_output_budget": 0,
+    }
+
+
+def answer_everything(prompt, task=None):
+    """Answer every "- [id] question" listed in a single-topic processing prompt."""
+    lines = prompt.split("QUESTIONS:\n")[1].split("\n\n")[0].splitlines()
+    questions = [line[3:].split("] ", 1) for line in lines]
+    return "```yaml\nrephrased_title: Title\nquestions:\n" + "".join(
+        f"  - id: {qid}\n    original: {q}\n    rephrased: {q} (clear)\n    answer: Answer to {q}\n"
+        for qid, q in questions) + "```"
+
+
+class TestFindDuplicates:
+    """Test shingle signatures and clustering."""
+
+    def test_similarity(self):
+        """Test that rewordings score high and unrelated questions low."""
+        close = similarity(signature("What is quantum entanglement?"), signature("What exactly is quantum entanglement?"))
+        far = similarity(signature("Why did the team lose?"), signature("How do qubits stay coherent?"))
+        assert close >= 0.7
+        assert far < 0.2
+        assert similarity(signature("Hello, World!"), signature("hello world")) == 1.0
+
+    def test_clusters_point_at_first_member(self):
+        """Test transitive clusters represented by their earliest question."""
+        texts = ["How does compost improve soil?", "Who won the match?",
+                 "How does compost improve the soil?", "how does compost improve the soil"]
+        assert find_duplicates(texts) == [0, 1, 0, 0]
+        assert find_duplicates([]) == []
+
+    def test_unknown_policy(self):
+        """Test that a typo in the policy is an error, not a silent default."""
+        with pytest.raises(ValueError):
+            dedup_options({"policy": "merge"})
+
+
+class TestDedupFlow:
+    """Test the dedup stage around ProcessContent."""
+
+    def run(self, shared):
+        dedupe = DedupeQuestions()
+        dedupe >> ProcessContent() >> FanOutAnswers()
+        with patch('flow.call_llm', side_effect=answer_everything) as mock_call_llm:
+            Flow(start=dedupe).run(shared)
+        return mock_call_llm
+
+    def test_fanout_answers_clusters_once(self):
+        """Test that duplicates are not sent to the LLM but still get the cluster's answer."""
+        shared = shared_with_overlap()
+        mock_call_llm = self.run(shared)
+
+        prompts = "".join(call.args[0] for call in mock_call_llm.call_args_list)
+        assert "What exactly is quantum entanglement?" not in prompts
+        assert "what is quantum entanglement\n" not in prompts
+        # The Recap topic has nothing left to ask
+        assert mock_call_llm.call_count == 2
+        assert shared["dedup_report"]["duplicates"] == 2
+        assert shared["dedup_report"]["saved_output_tokens"] > 0
+        computing = shared["topics"][1]["questions"]
+        assert [q["original"] for q in computing] == ["What exactly is quantum entanglement?",
+                                                      "Why do qubits lose coherence?"]
+        assert computing[0]["answer"] == "Answer to What is quantum entanglement?"
+        assert shared["topics"][2]["questions"][0]["answer"] == "Answer to What is quantum entanglement?"
+
+    def test_drop_policy_removes_duplicates(self):
+        """Test that drop removes duplicate questions and topics left empty."""
+        shared = shared_with_overlap()
+        shared["dedup"] = {"policy": "drop"}
+        self.run(shared)
+        assert [t["title"] for t in shared["topics"]] == ["Physics", "Computing"]
+        assert [q["original"] for q in shared["topics"][1]["questions"]] == ["Why do qubits lose coherence?"]
+
+    def test_off_policy_keeps_everything(self):
+        """Test that off leaves the topics untouched."""
+        shared = shared_with_overlap()
+        shared["dedup"] = {"policy": "off"}
+        mock_call_llm = self.run(shared)
+        assert mock_call_llm.call_count == 3
+        assert shared["dedup_report"]["duplicates"] == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
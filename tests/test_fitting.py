@@ -0,0 +1,202 @@
+"""Tests for model capabilities, prompt fitting and failing fast on oversized prompts."""
+
+import os
+import sys
+import json
+import asyncio
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.model_catalog import get_context_window, get_max_output_tokens, get_model_capabilities
+from utils.fitting import (
+    PromptTooLargeError, prompt_budget, check_prompt, fit_transcript, trim_text, split_text,
+    is_context_length_error, fit_options
+)
+from utils.call_llm import call_llm, call_llm_openai, reset_clients
+from flow import (
+    ExtractTopicsAndQuestions, SummarizeChunks, SummarizeChapters, build_extraction_prompt, build_combined_prompt
+)
+
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    """A compatible endpoint serving a model with a 2,000-token context"""
+    path = tmp_path / "capabilities.json"
+    path.write_text(json.dumps({"tiny-model": {"context_tokens": 2000, "max_output_tokens": 500}}))
+    with patch.dict(os.environ, {"MODEL_CAPABILITIES_FILE": str(path), "LLM_PROVIDER": "compatible",
+                                 "COMPATIBLE_BASE_URL": "http://localhost:8000/v1",
+                                 "COMPATIBLE_MODEL": "tiny-model"}):
+        yield "tiny-model"
+
+
+def sentences(count):
+    return " ".join(f"Sentence number {i} says something about the topic." for i in range(count))
+
+
+class TestCapabilities:
+    """Test the model capability table."""
+
+    def test_known_and_default_models(self):
+        """Test listed models, dated snapshots and unknown models."""
+        assert get_model_capabilities("gpt-4o-2024-08-06") == {"context_tokens": 128_000, "max_output_tokens": 16_384}
+        assert get_max_output_tokens("gemini-1.5-flash") == 8_192
+        assert get_max_output_tokens("some-local-model") == 4096
+
+    def test_capabilities_file(self, tiny_model):
+        """Test that MODEL_CAPABILITIES_FILE adds models."""
+        assert get_context_window(tiny_model) == 2000
+        assert get_max_output_tokens(tiny_model) == 500
+        # Room for the response and the estimation margin comes off the context
+        assert prompt_budget(tiny_model) == int((2000 - 500) * 0.95)
+
+    def test_capabilities_file_is_read_once(self, tiny_model):
+        """Test that lookups reuse the parsed file until it changes."""
+        path = os.environ["MODEL_CAPABILITIES_FILE"]
+        get_context_window(tiny_model)
+        with patch('builtins.open', side_effect=AssertionError("file reopened")):
+            for _ in range(3):
+                assert get_context_window(tiny_model) == 2000
+                assert get_max_output_tokens(tiny_model) == 500
+        with open(path, "w") as f:
+            json.dump({"tiny-model": {"context_tokens": 3000, "max_output_tokens": 500, "note": "edited"}}, f)
+        assert get_context_window(tiny_model) == 3000
+
+
+class TestCheckPrompt:
+    """Test the check call_llm makes before sending a prompt."""
+
+    def test_fits_routes_or_fails(self):
+        """Test that an oversized prompt goes to the long-context model, or fails without one."""
+        prompt = "word " * 600_000
+        assert check_prompt("short prompt", "openai", "gpt-4o") == "gpt-4o"
+        assert check_prompt(prompt, "openai", "gpt-4o") == "gpt-4.1"
+        with patch.dict(os.environ, {"OPENAI_LONG_CONTEXT_MODEL": ""}):
+            with pytest.raises(PromptTooLargeError, match="gpt-4o"):
+                check_prompt(prompt, "openai", "gpt-4o")
+
+    def test_call_llm_fails_before_any_request(self, tiny_model):
+        """Test that call_llm raises for a prompt over the context instead of sending it."""
+        with patch('utils.call_llm.call_llm_compatible') as mock_call:
+            with pytest.raises(PromptTooLargeError):
+                call_llm(sentences(400), task="analysis")
+        mock_call.assert_not_called()
+
+    def test_call_llm_routes(self):
+        """Test that call_llm sends an oversized prompt to the long-context model."""
+        with patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test-key-1234",
+                                     "OPENAI_MODEL": "gpt-4o"}), \
+                patch('utils.call_llm.call_llm_openai', return_value="ok") as mock_call:
+            assert call_llm("word " * 600_000) == "ok"
+        assert mock_call.call_args.kwargs["model"] == "gpt-4.1"
+
+    def test_context_errors_are_not_retried(self):
+        """Test that a provider's context length rejection fails on the first attempt."""
+        error = Exception("This model's maximum context length is 128000 tokens.")
+        error.code = "context_length_exceeded"
+        client = MagicMock()
+        client.chat.completions.create.side_effect = error
+        assert is_context_length_error(error)
+        assert not is_context_length_error(Exception("Rate limit reached"))
+
+        reset_clients()
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "sk-test-key-1234"}, clear=True), \
+                patch('utils.call_llm.OpenAI', return_value=client), patch('utils.deadline.time.sleep') as mock_sleep:
+            with pytest.raises(PromptTooLargeError):
+                call_llm_openai("prompt", model="gpt-4o")
+        reset_clients()
+        assert client.chat.completions.create.call_count == 1
+        mock_sleep.assert_not_called()
+
+
+class TestFitTranscript:
+    """Test the trim, chunk, route and fail policies."""
+
+    def test_trim_and_split(self):
+        """Test that trimming keeps whole sentences and splitting keeps all the text."""
+        text = sentences(100)
+        head = trim_text(text, 100)
+        assert head.endswith(".") and len(head) <= 400
+        pieces = split_text(text, 100)
+        assert len(pieces) > 1
+        assert " ".join(pieces) == text
+
+    def test_policies(self, tiny_model):
+        """Test each policy on a transcript too long for the model."""
+        transcript = sentences(400)
+        build = lambda text: build_extraction_prompt("Title", text)
+        fits = fit_transcript(build, "Short transcript.", "compatible", tiny_model)
+        assert fits["action"] == "fits"
+
+        trimmed = fit_transcript(build, transcript, "compatible", tiny_model, {"policy": "trim"})
+        assert trimmed["action"] == "trim"
+        assert transcript.startswith(trimmed["transcripts"][0])
+        assert check_prompt(build(trimmed["transcripts"][0]), "compatible", tiny_model) == tiny_model
+
+        # No long-context model for a compatible endpoint, so route falls back to trimming
+        assert fit_transcript(build, transcript, "compatible", tiny_model)["action"] == "trim"
+
+        chunked = fit_transcript(build, transcript, "compatible", tiny_model, {"policy": "chunk"}, chunkable=True)
+        assert chunked["action"] == "chunk"
+        assert " ".join(chunked["transcripts"]) == transcript
+        assert fit_transcript(build, transcript, "compatible", tiny_model, {"policy": "chunk"})["action"] == "trim"
+
+        with pytest.raises(PromptTooLargeError):
+            fit_transcript(build, transcript, "compatible", tiny_model, {"policy": "fail"})
+        with pytest.raises(ValueError, match="fit policy"):
+            fit_options({"policy": "shrink"})
+
+
+class TestExtractionFitting:
+    """Test topic extraction on a transcript too long for the model."""
+
+    def test_chunked_extraction(self, tiny_model):
+        """Test that the chunk policy extracts each part and takes topics from every part."""
+        def respond(prompt, task=None):
+            part = respond.calls = respond.calls + 1
+            return (f"```yaml\ntopics:\n  - title: Part {part} first\n    questions:\n      - Q?\n"
+                    f"  - title: Part {part} second\n    questions:\n      - Q?\n```")
+        respond.calls = 0
+
+        shared = {"video_info": {"title": "Title", "transcript": sentences(400)}, "fit": {"policy": "chunk"}}
+        with patch('flow.call_llm', side_effect=respond):
+            ExtractTopicsAndQuestions().run(shared)
+
+        assert respond.calls == shared["prompt_fit"]["extraction"]["parts"] > 2
+        titles = [topic.title for topic in shared["topics"]]
+        assert titles[:3] == ["Part 1 first", "Part 2 first", "Part 3 first"]
+        assert [topic.id for topic in shared["topics"]] == ["t1", "t2", "t3", "t4", "t5"]
+
+    def test_oversized_chunks_and_chapters_are_fitted(self, tiny_model):
+        """Test that map-reduce chunks are split further and chapters trimmed to fit the model."""
+        transcript = sentences(400)
+        shared = {"video_info": {"title": "Title", "transcript": transcript}, "fit": {"policy": "chunk"},
+                  "strategy_plan": {"chunk_tokens": 100_000}}
+        items = SummarizeChunks().prep(shared)
+        assert len(items) > 2 and items[-1]["part"] == (len(items), len(items))
+        assert " ".join(item["transcript"] for item in items) == transcript
+        assert shared["prompt_fit"]["chunk 1"]["action"] == "chunk"
+        for item in items:
+            prompt = build_combined_prompt("Title", item["transcript"], max_topics=3, part=item["part"])
+            assert check_prompt(prompt, "compatible", tiny_model) == tiny_model
+
+        shared = {"video_info": {"title": "Title"}, "fit": {"policy": "chunk"},
+                  "chapters": [{"title": "Intro", "start": 0, "transcript": transcript}]}
+        items = asyncio.run(SummarizeChapters().prep_async(shared))
+        assert len(items) == 1 and transcript.startswith(items[0]["chapter"]["transcript"])
+        assert shared["prompt_fit"]["chapter 1"]["action"] == "trim"
+        assert shared["chapters"][0]["transcript"] == transcript
+
+    def test_fail_policy_makes_no_calls(self, tiny_model):
+        """Test that the fail policy stops in prep, before the node's retries."""
+        shared = {"video_info": {"title": "Title", "transcript": sentences(400)}, "fit": {"policy": "fail"}}
+        with patch('flow.call_llm') as mock_call:
+            with pytest.raises(PromptTooLargeError):
+                ExtractTopicsAndQuestions(max_retries=3, wait=10).run(shared)
+        mock_call.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
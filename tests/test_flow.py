@@ -10,6 +10,7 @@ import yaml
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 from flow import (
+    ProcessYouTubeURL,
     ExtractTopicsAndQuestions,
     ProcessContent,
     create_youtube_processor_flow
@@ -217,6 +218,69 @@ questions:
             assert len(simplification_calls) >= 1
 
 
+class TestTopicPacking:
+    """Test that ProcessContent packs several topics into one call."""
+    
+    @staticmethod
+    def packed_response(titles):
+        """A packed YAML response answering each title's single question."""
+        return "```yaml\ntopics:\n" + "".join(f"""  - topic: {i}
+    rephrased_title: Better {title}
+    questions:
+      - original: What is {title}?
+        rephrased: So, {title}?
+        answer: {title} explained.
+""" for i, title in enumerate(titles, 1)) + "```"
+    
+    @staticmethod
+    def shared_with_topics(count):
+        return {
+            "video_info": {"transcript": "Long transcript " * 100},
+            "topics": [{"title": f"T{i}", "questions": [{"original": f"What is T{i}?", "rephrased": "", "answer": ""}]}
+                       for i in range(count)],
+        }
+    
+    def test_topics_share_a_call_within_budget(self):
+        """Test that five small topics are answered in one call and merged back."""
+        shared = self.shared_with_topics(5)
+        shared["process_output_budget"] = 4000
+        with patch('flow.call_llm', return_value=self.packed_response([f"T{i}" for i in range(5)])) as mock_call_llm:
+            ProcessContent().run(shared)
+        
+        assert mock_call_llm.call_count == 1
+        assert mock_call_llm.call_args[1]["task"] == "simplification"
+        assert shared["process_stats"] == {"topics": 5, "calls": 1, "splits": 0}
+        assert [t["rephrased_title"] for t in shared["topics"]] == [f"Better T{i}" for i in range(5)]
+        assert shared["topics"][3]["questions"][0]["answer"] == "T3 explained."
+    
+    def test_budget_limits_pack_size(self):
+        """Test that the output budget decides how many topics go in a call, and 0 means one each."""
+        shared = self.shared_with_topics(4)
+        shared["process_output_budget"] = 600  # two topics of one answer (280 tokens each)
+        assert [len(item["topics"]) for item in ProcessContent().prep(shared)] == [2, 2]
+        shared["process_output_budget"] = 0
+        assert all("topic" in item for item in ProcessContent().prep(shared))
+    
+    def test_incomplete_response_is_split(self):
+        """Test that a truncated packed response is retried as smaller packs."""
+        shared = self.shared_with_topics(4)
+        shared["process_output_budget"] = 4000
+        
+        def llm(prompt, task=None):
+            titles = [t for t in ("T0", "T1", "T2", "T3") if f"What is {t}?" in prompt]
+            if len(titles) == 4:
+                # Cut off after the first topic
+                return self.packed_response(titles[:1])
+            return self.packed_response(titles)
+        
+        with patch('flow.call_llm', side_effect=llm) as mock_call_llm:
+            ProcessContent().run(shared)
+        
+        assert mock_call_llm.call_count == 3
+        assert shared["process_stats"]["splits"] == 1
+        assert all(t["questions"][0]["answer"] == f"{t['title']} explained." for t in shared["topics"])
+
+
 class TestNodeErrorHandling:
     """Test error handling in nodes with task-specific calls."""
     
@@ -245,6 +309,21 @@ class TestNodeErrorHandling:
             args, kwargs = mock_call_llm.call_args
             assert kwargs.get('task') == 'analysis'
     
+    def test_permanent_video_errors_are_not_retried(self):
+        """Test that ProcessYouTubeURL fails immediately for videos without captions."""
+        node = ProcessYouTubeURL(max_retries=3, wait=0)
+        failure = {"error": "Subtitles are disabled for this video", "permanent": True}
+
+        with patch('flow.get_video_info', return_value=failure) as mock_get_video_info:
+            with pytest.raises(ValueError, match="Subtitles are disabled"):
+                node.run({"url": "https://youtu.be/aaaaaaaaaaa"})
+        assert mock_get_video_info.call_count == 1
+
+        with patch('flow.get_video_info', return_value={"error": "timeout", "permanent": False}) as mock_get_video_info:
+            with pytest.raises(ValueError, match="timeout"):
+                node.run({"url": "https://youtu.be/aaaaaaaaaaa"})
+        assert mock_get_video_info.call_count == 3
+    
     def test_process_content_handles_yaml_parsing_error(self):
         """Test ProcessContent handles invalid YAML responses."""
         node = ProcessContent()
@@ -0,0 +1,236 @@
+"""Tests for the SQLite-backed job queue."""
+
+import os
+import sys
+import time
+import threading
+import pytest
+
+# Add the parent directory to Python path so we can import from utils
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """Create a queue in a temporary database."""
+    return JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=60)
+
+
+class TestLeasing:
+    """Test leasing order and exclusivity."""
+
+    def test_lease_returns_none_when_empty(self, queue):
+        """Test that leasing from an empty queue returns None."""
+        assert queue.lease("w1") is None
+
+    def test_higher_priority_leased_first(self, queue):
+        """Test that jobs are leased by priority, then FIFO."""
+        low = queue.enqueue("https://youtu.be/aaaaaaaaaaa", priority=0)
+        high = queue.enqueue("https://youtu.be/bbbbbbbbbbb", priority=5)
+
+        assert queue.lease("w1")["id"] == high
+        assert queue.lease("w1")["id"] == low
+
+    def test_leased_job_is_invisible(self, queue):
+        """Test that a leased job is not handed to a second worker."""
+        queue.enqueue("https://youtu.be/aaaaaaaaaaa", provider="gemini")
+        job = queue.lease("w1")
+
+        assert job["status"] == "leased"
+        assert job["provider"] == "gemini"
+        assert job["attempts"] == 1
+        assert queue.lease("w2") is None
+
+    def test_expired_lease_is_released(self, queue):
+        """Test that a job becomes visible again after its visibility timeout."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa")
+        queue.lease("w1", visibility_timeout=0.01)
+        time.sleep(0.05)
+
+        job = queue.lease("w2")
+        assert job["id"] == job_id
+        assert job["lease_owner"] == "w2"
+        assert job["attempts"] == 2
+
+        # The original worker can no longer complete it
+        assert queue.complete(job_id, "w1") is False
+        assert queue.complete(job_id, "w2", result={"title": "ok"}) is True
+
+    def test_expired_lease_without_attempts_left_fails(self, queue):
+        """Test that a job that keeps timing out is eventually failed."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa", max_attempts=1)
+        queue.lease("w1", visibility_timeout=0.01)
+        time.sleep(0.05)
+
+        assert queue.lease("w2") is None
+        assert queue.get(job_id)["status"] == "failed"
+
+    def test_concurrent_workers_never_share_a_job(self, tmp_path):
+        """Test that parallel workers with their own connections lease disjoint jobs."""
+        path = str(tmp_path / "jobs.db")
+        setup = JobQueue(path)
+        for i in range(20):
+            setup.enqueue(f"https://youtu.be/{i:011d}")
+
+        leased = []
+        lock = threading.Lock()
+
+        def drain(worker_id):
+            q = JobQueue(path)
+            while True:
+                job = q.lease(worker_id)
+                if job is None:
+                    break
+                with lock:
+                    leased.append(job["id"])
+            q.close()
+
+        threads = [threading.Thread(target=drain, args=(f"w{i}",)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(leased) == list(range(1, 21))
+
+
+class TestLanesAndDeadlines:
+    """Test priority lanes, deadlines and shortest-transcript-first ordering."""
+
+    def test_interactive_lane_leased_before_bulk(self, queue):
+        """Test that interactive jobs jump ahead of an existing bulk backlog."""
+        for i in range(5):
+            queue.enqueue(f"https://youtu.be/{i:011d}", lane="bulk", priority=10)
+        interactive = queue.enqueue("https://youtu.be/interactive", lane="interactive")
+
+        assert queue.lease("w1")["id"] == interactive
+
+    def test_lane_filter(self, queue):
+        """Test that a reserved slot only sees its own lane."""
+        queue.enqueue("https://youtu.be/aaaaaaaaaaa", lane="bulk")
+
+        assert queue.lease("w1", lanes=("interactive",)) is None
+        assert queue.lease("w1", lanes=("bulk",)) is not None
+
+    def test_unknown_lane_rejected(self, queue):
+        """Test that only known lanes are accepted."""
+        with pytest.raises(ValueError, match="Unknown lane"):
+            queue.enqueue("https://youtu.be/aaaaaaaaaaa", lane="urgent")
+
+    def test_shortest_transcript_first_within_bulk(self, queue):
+        """Test that known transcript lengths order the bulk lane."""
+        long_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa")
+        short_id = queue.enqueue("https://youtu.be/bbbbbbbbbbb")
+        unknown_id = queue.enqueue("https://youtu.be/ccccccccccc")
+        queue.set_transcript_chars(long_id, 90000)
+        queue.set_transcript_chars(short_id, 1200)
+
+        assert queue.claim_unprobed("p1")["id"] == unknown_id
+        assert queue.count_pending("bulk", probed=True) == 2
+        assert [queue.lease("w1")["id"] for _ in range(3)] == [short_id, long_id, unknown_id]
+
+    def test_probe_claims_and_failures(self, queue):
+        """Test that a probe is claimed by one prober and a failed probe counts as unknown, not short."""
+        failed_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa")
+        long_id = queue.enqueue("https://youtu.be/bbbbbbbbbbb")
+
+        assert queue.claim_unprobed("p1")["id"] == failed_id
+        assert queue.claim_unprobed("p2")["id"] == long_id
+        assert queue.claim_unprobed("p3") is None
+        # An abandoned claim can be taken over once it times out
+        assert queue.claim_unprobed("p3", claim_timeout=-1) is None
+        queue.set_probe_failed(failed_id, "Video unavailable")
+        queue._connect().execute("UPDATE jobs SET probe_expires = 0 WHERE id = ?", (long_id,))
+        assert queue.claim_unprobed("p3")["id"] == long_id
+        queue.set_transcript_chars(long_id, 90000)
+
+        assert queue.claim_unprobed("p3") is None
+        assert queue.count_pending("bulk", probed=True) == 2
+        assert queue.get(failed_id)["probe_error"] == "Video unavailable"
+        assert [queue.lease("w1")["id"] for _ in range(2)] == [long_id, failed_id]
+
+    def test_earliest_deadline_first(self, queue):
+        """Test that deadlines order jobs within a lane."""
+        later = queue.enqueue("https://youtu.be/aaaaaaaaaaa", deadline=time.time() + 600)
+        sooner = queue.enqueue("https://youtu.be/bbbbbbbbbbb", deadline=time.time() + 60)
+
+        assert queue.lease("w1")["id"] == sooner
+        assert queue.lease("w1")["id"] == later
+
+    def test_missed_deadline_expires_job(self, queue):
+        """Test that jobs past their deadline are not started."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa", deadline=time.time() - 1)
+
+        assert queue.lease("w1") is None
+        assert queue.get(job_id)["status"] == "expired"
+
+    def test_existing_database_is_migrated(self, tmp_path):
+        """Test that databases created before lanes existed gain the new columns."""
+        import sqlite3
+        path = str(tmp_path / "old.db")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, provider TEXT, "
+            "priority INTEGER NOT NULL DEFAULT 0, status TEXT NOT NULL DEFAULT 'pending', "
+            "attempts INTEGER NOT NULL DEFAULT 0, max_attempts INTEGER NOT NULL DEFAULT 3, "
+            "lease_owner TEXT, lease_expires REAL, available_at REAL NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, output_file TEXT, result TEXT, error TEXT)"
+        )
+        conn.execute("INSERT INTO jobs (url, available_at, created_at, updated_at) VALUES ('u', 0, 0, 0)")
+        conn.commit()
+        conn.close()
+
+        job = JobQueue(path).lease("w1")
+        assert job["lane"] == "bulk"
+        assert job["transcript_chars"] is None
+
+
+class TestCompletionAndRetry:
+    """Test completing and failing jobs."""
+
+    def test_complete_stores_result(self, queue):
+        """Test that results and artifacts are recorded."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa")
+        queue.lease("w1")
+
+        assert queue.complete(job_id, "w1", result={"topics": [1, 2]}, output_file="output/x.html")
+        job = queue.get(job_id)
+        assert job["status"] == "done"
+        assert job["result"] == {"topics": [1, 2]}
+        assert job["output_file"] == "output/x.html"
+        assert queue.counts() == {"done": 1}
+
+    def test_fail_requeues_with_backoff(self, queue):
+        """Test that a failed attempt is retried later."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa", max_attempts=3)
+        queue.lease("w1")
+
+        assert queue.fail(job_id, "w1", "boom", retry_delay=60) == "pending"
+        job = queue.get(job_id)
+        assert job["error"] == "boom"
+        assert job["available_at"] > time.time() + 30
+
+        # Not ready until the backoff has elapsed
+        assert queue.lease("w1") is None
+
+    def test_fail_after_last_attempt(self, queue):
+        """Test that a job is failed once it runs out of attempts."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa", max_attempts=1)
+        queue.lease("w1")
+
+        assert queue.fail(job_id, "w1", "boom") == "failed"
+        assert queue.get(job_id)["status"] == "failed"
+
+    def test_heartbeat_requires_lease(self, queue):
+        """Test that only the lease owner can extend a lease."""
+        job_id = queue.enqueue("https://youtu.be/aaaaaaaaaaa")
+        queue.lease("w1")
+
+        assert queue.heartbeat(job_id, "w1") is True
+        assert queue.heartbeat(job_id, "w2") is False
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,158 @@
+"""Tests for API key pools: rotation, ejection and per-key usage."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.key_pool import KeyPool, load_keys, classify_error, get_key_pool, KEY_QUOTA_EJECT_SECONDS
+from utils.call_llm import call_llm_openai, call_llm_gemini, reset_clients, validate_provider_config
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StatusError(Exception):
+    def __init__(self, status_code, message="error"):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class TestLoadKeys:
+    """Test reading key pools from the environment."""
+
+    def test_pool_and_single_key(self):
+        """Test that the pool and the single key are merged without duplicates or placeholders."""
+        with patch.dict(os.environ, {"OPENAI_API_KEYS": "sk-a, sk-b,,your_openai_api_key_here",
+                                     "OPENAI_API_KEY": "sk-b"}, clear=True):
+            assert load_keys("openai") == ["sk-a", "sk-b"]
+            validate_provider_config("openai")
+        with patch.dict(os.environ, {"GEMINI_API_KEY": "your_gemini_api_key_here"}, clear=True):
+            assert load_keys("gemini") == []
+            with pytest.raises(ValueError, match="Gemini API key is required"):
+                validate_provider_config("gemini")
+
+    def test_classify_error(self):
+        """Test auth, quota and other errors."""
+        assert classify_error(StatusError(401)) == "auth"
+        assert classify_error(StatusError(429)) == "quota"
+        assert classify_error(Exception("429 Resource exhausted: quota")) == "quota"
+        assert classify_error(StatusError(500)) is None
+
+
+class TestKeyPool:
+    """Test load-aware rotation and ejection."""
+
+    def test_spreads_load(self):
+        """Test that concurrent and recent requests go to different keys."""
+        pool = KeyPool("openai", ["sk-test-aaaa", "sk-test-bbbb"], clock=FakeClock())
+        with pool.acquire() as first, pool.acquire() as second:
+            assert {first, second} == {"sk-test-aaaa", "sk-test-bbbb"}
+        used = []
+        for _ in range(4):
+            with pool.acquire() as key:
+                used.append(key)
+        assert sorted(used) == ["sk-test-aaaa", "sk-test-aaaa", "sk-test-bbbb", "sk-test-bbbb"]
+
+    def test_ejection_and_return(self):
+        """Test that a rate-limited key sits out, strikes double it, and success forgives them."""
+        clock = FakeClock()
+        pool = KeyPool("openai", ["sk-test-aaaa", "sk-test-bbbb"], clock=clock)
+        assert pool.report_error("sk-test-aaaa", StatusError(429)) == KEY_QUOTA_EJECT_SECONDS
+        assert pool.report_error("sk-test-aaaa", StatusError(429)) == KEY_QUOTA_EJECT_SECONDS * 2
+        for _ in range(3):
+            with pool.acquire() as key:
+                assert key == "sk-test-bbbb"
+        clock.now += KEY_QUOTA_EJECT_SECONDS * 2
+        with pool.acquire() as key:
+            assert key == "sk-test-aaaa"
+        pool.report_ok("sk-test-aaaa", tokens=120)
+        assert pool.report_error("sk-test-aaaa", StatusError(429)) == KEY_QUOTA_EJECT_SECONDS
+        assert pool.report_error("sk-test-bbbb", StatusError(500)) == 0.0
+
+        usage = pool.usage()
+        assert usage["sk-...aaaa"] == {"requests": 1, "errors": 3, "ejections": 3, "tokens": 120, "in_flight": 0,
+                                 "ejected_seconds": KEY_QUOTA_EJECT_SECONDS}
+        assert usage["sk-...bbbb"]["errors"] == 1
+
+    def test_all_ejected_uses_first_back(self):
+        """Test that a fully ejected pool still hands out the key due back first."""
+        pool = KeyPool("openai", ["sk-test-aaaa", "sk-test-bbbb"], clock=FakeClock())
+        pool.report_error("sk-test-aaaa", StatusError(401))
+        pool.report_error("sk-test-bbbb", StatusError(429))
+        with pool.acquire() as key:
+            assert key == "sk-test-bbbb"
+
+
+class TestPooledCalls:
+    """Test call_llm_openai with a pool of keys."""
+
+    def test_retry_moves_to_another_key(self):
+        """Test that a quota error on one key is retried on the other, each with its own cached client."""
+        clients = {}
+
+        def make_client(api_key):
+            client = MagicMock()
+            if api_key == "sk-limited-aaaa":
+                client.chat.completions.create.side_effect = StatusError(429, "Rate limit reached")
+            else:
+                response = MagicMock()
+                response.choices[0].message.content = "ok"
+                response.usage.total_tokens = 42
+                client.chat.completions.create.return_value = response
+            clients[api_key] = client
+            return client
+
+        reset_clients()
+        with patch.dict(os.environ, {"OPENAI_API_KEYS": "sk-limited-aaaa,sk-working-bbbb"}, clear=True), \
+                patch('utils.call_llm.OpenAI', side_effect=make_client), patch('utils.deadline.time.sleep'):
+            assert call_llm_openai("prompt", model="gpt-4o") == "ok"
+            assert call_llm_openai("prompt", model="gpt-4o") == "ok"
+            usage = get_key_pool("openai").usage()
+        reset_clients()
+
+        assert sorted(clients) == ["sk-limited-aaaa", "sk-working-bbbb"]
+        assert clients["sk-limited-aaaa"].chat.completions.create.call_count == 1
+        assert usage["sk-...aaaa"]["ejections"] == 1
+        assert usage["sk-...bbbb"]["tokens"] == 84
+
+    def test_gemini_keys_get_their_own_service_client(self):
+        """Test that pooled Gemini keys each use a service client, without touching the SDK's global configuration."""
+        clients = {}
+
+        def make_client(client_options):
+            client = MagicMock()
+            candidate = MagicMock(finish_reason=1)
+            candidate.content.parts = [MagicMock(text="ok")]
+            response = MagicMock(candidates=[candidate])
+            response.usage_metadata.total_token_count = 7
+            del response.text
+            client.generate_content.return_value = response
+            clients[client_options["api_key"]] = client
+            return client
+
+        reset_clients()
+        with patch.dict(os.environ, {"GEMINI_API_KEYS": "gem-key-aaaa,gem-key-bbbb"}, clear=True), \
+                patch('google.ai.generativelanguage.GenerativeServiceClient', side_effect=make_client), \
+                patch('utils.call_llm.genai') as mock_genai, patch('utils.call_llm._load_genai'):
+            assert call_llm_gemini("prompt", model="gemini-1.5-flash") == "ok"
+            assert call_llm_gemini("prompt", model="gemini-1.5-flash") == "ok"
+        reset_clients()
+
+        assert sorted(clients) == ["gem-key-aaaa", "gem-key-bbbb"]
+        request = clients["gem-key-aaaa"].generate_content.call_args.kwargs["request"]
+        assert request.model == "models/gemini-1.5-flash" and request.contents[0].parts[0].text == "prompt"
+        mock_genai.configure.assert_not_called()
+        mock_genai.GenerativeModel.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,180 @@
+"""Tests for incremental (live) processing of growing transcripts."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from live import LiveSession, merge_topics, run_live
+from main import main
+from utils.deadline import current_deadline
+
+
+def write_captions(path, words_by_minute):
+    """Write a WebVTT file with one cue every 10 seconds, talking about words_by_minute[minute]."""
+    lines = ["WEBVTT", ""]
+    for minute, words in enumerate(words_by_minute):
+        for second in range(0, 60, 10):
+            start = minute * 60 + second
+            lines += [f"{start // 60:02d}:{start % 60:02d}.000 --> {(start + 10) // 60:02d}:{(start + 10) % 60:02d}.000",
+                      f"{words} at {start}", ""]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+
+def fake_llm(prompt, task=None):
+    """One topic named after whatever the transcript talks about."""
+    subject = "Football" if "football" in prompt else "Gardening"
+    if task == "analysis":
+        return f"""```yaml
+topics:
+  - title: |
+        {subject}
+    questions:
+      - |
+        What about {subject.lower()}?
+```"""
+    return f"""```yaml
+rephrased_title: |
+    All about {subject.lower()}
+questions:
+  - original: What about {subject.lower()}?
+    rephrased: Why {subject.lower()}?
+    answer: Because.
+```"""
+
+
+class TestMergeTopics:
+    """Test merging topics across windows."""
+
+    def test_same_title_is_merged(self):
+        """Test that repeated topics combine and keep their first start time."""
+        first = [{"title": "Gardening", "start": 0, "questions": [{"original": "Soil?"}]}]
+        second = [{"title": "gardening!", "start": 300, "questions": [{"original": "soil?"}, {"original": "Water?"}]},
+                  {"title": "Football", "start": 300, "questions": []}]
+        merged = merge_topics([first, second])
+        assert [t["title"] for t in merged] == ["Gardening", "Football"]
+        assert merged[0]["start"] == 0
+        assert [q["original"] for q in merged[0]["questions"]] == ["Soil?", "Water?"]
+        # Inputs are left untouched
+        assert len(first[0]["questions"]) == 1
+
+
+class TestLiveSession:
+    """Test that refreshes only process new windows."""
+
+    def test_only_new_windows_are_processed(self, tmp_path):
+        """Test incremental refreshes, resuming from saved state and the final partial window."""
+        captions = tmp_path / "stream.vtt"
+        output_dir = str(tmp_path / "out")
+        prompts = []
+
+        def recording_llm(prompt, task=None):
+            if task == "analysis":
+                prompts.append(prompt)
+            return fake_llm(prompt, task)
+
+        with patch('flow.call_llm', side_effect=recording_llm):
+            write_captions(captions, ["gardening"] * 10)
+            session = LiveSession("openai", output_dir, transcript_file=str(captions), window_seconds=300,
+                                  normalize={"enabled": False})
+            processed, html_path = session.refresh()
+            # 0-300s is complete; 300-600s may still grow
+            assert processed == 1
+            assert "gardening at 290" in prompts[0] and "gardening at 300" not in prompts[0]
+
+            assert session.refresh() == (0, None)
+
+            write_captions(captions, ["gardening"] * 10 + ["football"] * 4)
+            processed, _ = session.refresh()
+            assert processed == 1
+            assert "gardening at 300" in prompts[1] and "gardening at 0 " not in prompts[1]
+
+            # A restart picks up the saved windows and only adds the tail
+            resumed = LiveSession("openai", output_dir, transcript_file=str(captions), window_seconds=300,
+                                  normalize={"enabled": False})
+            processed, html_path = resumed.refresh(final=True)
+            assert processed == 1
+            assert "football at 600" in prompts[2] and len(prompts) == 3
+
+        topics = resumed.topics()
+        assert [t["rephrased_title"].strip() for t in topics] == ["All about gardening", "All about football"]
+        assert [t["start"] for t in topics] == [0, 600]
+        with open(html_path, encoding="utf-8") as f:
+            assert "All about football" in f.read()
+
+    def test_window_size_must_match_saved_state(self, tmp_path):
+        """Test that resuming with different windows is refused."""
+        captions = tmp_path / "stream.vtt"
+        write_captions(captions, ["gardening"] * 6)
+        with patch('flow.call_llm', side_effect=fake_llm):
+            LiveSession("openai", str(tmp_path), transcript_file=str(captions), window_seconds=120).refresh()
+        with pytest.raises(ValueError):
+            LiveSession("openai", str(tmp_path), transcript_file=str(captions), window_seconds=300)
+
+    def test_run_live_stops_when_transcript_stops_growing(self, tmp_path):
+        """Test that idle polls end the run after processing the final window."""
+        captions = tmp_path / "stream.vtt"
+        write_captions(captions, ["gardening"] * 3)
+        session = LiveSession("openai", str(tmp_path), transcript_file=str(captions), window_seconds=120)
+        with patch('flow.call_llm', side_effect=fake_llm), patch('live.time.sleep') as sleep:
+            html_path = run_live(session, poll_interval=1, idle_polls=2)
+        assert os.path.exists(html_path)
+        assert [w["index"] for w in session.state["windows"]] == [0, 1]
+        assert sleep.call_count == 2
+
+    def test_options_and_deadline_reach_each_window(self, tmp_path):
+        """Test that fit and cascade options apply to the windows and each refresh runs under the deadline."""
+        captions = tmp_path / "stream.vtt"
+        write_captions(captions, ["gardening"] * 6)
+        seen = []
+
+        def checking_llm(prompt, task=None):
+            seen.append(current_deadline())
+            return fake_llm(prompt, task)
+
+        session = LiveSession("openai", str(tmp_path), transcript_file=str(captions), window_seconds=120,
+                              fit={"policy": "trim"}, cascade={"enabled": False}, deadline=60)
+        with patch('flow.call_llm', side_effect=checking_llm), \
+                patch('live.Flow.run', autospec=True, side_effect=lambda flow, shared: seen.append(dict(shared))):
+            session.refresh()
+        windows = [entry for entry in seen if isinstance(entry, dict)]
+        assert windows and all(w["fit"] == {"policy": "trim"} and w["cascade"] == {"enabled": False} for w in windows)
+
+        seen.clear()
+        with patch('flow.call_llm', side_effect=checking_llm):
+            session.refresh(final=True)
+        assert seen and all(deadline is not None and deadline.seconds == 60 for deadline in seen)
+        assert current_deadline() is None
+
+
+class TestLiveCommandLine:
+    """Test which options live, batch API and chapter modes accept."""
+
+    @pytest.mark.parametrize("argv", [
+        ["--live", "--url", "https://youtu.be/aaaaaaaaaaa", "--strategy", "single"],
+        ["--batch-api", "--url", "https://youtu.be/aaaaaaaaaaa", "--deadline", "3m"],
+        ["--batch-api", "--url", "https://youtu.be/aaaaaaaaaaa", "--cascade"],
+        ["--live", "--batch-api", "--url", "https://youtu.be/aaaaaaaaaaa"],
+        ["--live", "--chapters", "--url", "https://youtu.be/aaaaaaaaaaa"],
+        ["--batch-api", "--chapters", "--url", "https://youtu.be/aaaaaaaaaaa"],
+        ["--chapters", "--url", "https://youtu.be/aaaaaaaaaaa", "--strategy", "two_stage"],
+        ["--chapters", "--url", "https://youtu.be/aaaaaaaaaaa", "--cascade"],
+    ])
+    def test_unsupported_combinations_are_rejected(self, argv, capsys):
+        """Test that options a mode would ignore are refused instead."""
+        with patch('sys.argv', ["main.py", *argv]), patch('main.run_live') as mock_live, \
+                patch('main.run_batch_job') as mock_batch, patch('main.process_video') as mock_run, \
+                pytest.raises(SystemExit):
+            main()
+        assert "can't" in capsys.readouterr().err
+        mock_live.assert_not_called()
+        mock_batch.assert_not_called()
+        mock_run.assert_not_called()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,113 @@
+"""Tests for transcript normalization before extraction."""
+
+import os
+import sys
+import pytest
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flow import NormalizeTranscript
+from utils.normalize import normalize_transcript, normalize_video_info, normalization_options
+from utils.transcript import Transcript
+
+# What yt-dlp's auto-caption VTT looks like: each cue repeats the tail of the previous one
+ROLLING = [
+    {"text": "[Music]", "start": 0.0, "duration": 3.0},
+    {"text": "so today we're going", "start": 3.0, "duration": 2.0},
+    {"text": "so today we're going to talk about", "start": 5.0, "duration": 2.0},
+    {"text": "to talk about um compilers", "start": 7.0, "duration": 2.0},
+    {"text": "to talk about um compilers", "start": 9.0, "duration": 0.5},
+    {"text": "and the the parser [Applause]", "start": 9.5, "duration": 2.0},
+]
+PUNCTUATED = [
+    {"text": "Welcome back. Today we", "start": 0.0, "duration": 4.0},
+    {"text": "look at parsers.", "start": 4.0, "duration": 2.0},
+    {"text": "Ready?", "start": 6.0, "duration": 1.0},
+]
+
+
+class TestNormalizeTranscript:
+    """Test the individual cleanup steps."""
+
+    def test_removes_rolling_duplicates_and_annotations(self):
+        """Test that repeated fragments and [Music] are dropped but real repeats stay."""
+        result = normalize_transcript(Transcript.from_entries(ROLLING))
+        assert result.text == "so today we're going to talk about um compilers and the the parser"
+        assert result.segment(0)[0] == 3.0
+
+    def test_strip_fillers_is_optional(self):
+        """Test that fillers are only removed when asked."""
+        result = normalize_transcript(Transcript.from_entries(ROLLING), strip_fillers=True)
+        assert "um" not in result.text.split()
+        assert "compilers" in result.text
+
+    def test_resegments_into_sentences(self):
+        """Test that fragments are regrouped into sentences with interpolated times."""
+        result = normalize_transcript(Transcript.from_entries(PUNCTUATED))
+        assert [result.segment(i)[2] for i in range(len(result))] == [
+            "Welcome back.", "Today we look at parsers.", "Ready?"]
+        start, duration, _ = result.segment(1)
+        assert 0.0 < start < 4.0
+        assert start + duration == pytest.approx(6.0)
+
+    def test_closing_quotes_stay_with_their_sentence(self):
+        """Test that quotes and brackets after the full stop are not split off or dropped."""
+        entries = [{"text": 'He said "stop." Then (he left.) Why?\' she asked.', "start": 0, "duration": 4}]
+        result = normalize_transcript(Transcript.from_entries(entries))
+        assert [result.segment(i)[2] for i in range(len(result))] == [
+            'He said "stop."', "Then (he left.)", "Why?'", "she asked."]
+
+    def test_single_word_repeats_are_speech(self):
+        """Test that a one-word cue repeating the last word is kept."""
+        entries = [{"text": "no.", "start": 0, "duration": 1}, {"text": "no.", "start": 1, "duration": 1}]
+        assert normalize_transcript(Transcript.from_entries(entries)).text == "no. no."
+
+    def test_unpunctuated_captions_keep_their_segments(self):
+        """Test that resegmenting doesn't merge unpunctuated captions into one block."""
+        entries = [{"text": "no punctuation here", "start": 0, "duration": 1},
+                   {"text": "or here either", "start": 1, "duration": 1}]
+        assert len(normalize_transcript(Transcript.from_entries(entries))) == 2
+
+
+class TestNormalizeVideoInfo:
+    """Test the stage as the flow uses it."""
+
+    def test_reports_token_reduction(self):
+        """Test that the report shows fewer tokens after normalization."""
+        segments = Transcript.from_entries(ROLLING * 20)
+        info = {"title": "T", "transcript": segments.text, "segments": segments}
+
+        normalized, report = normalize_video_info(info)
+
+        assert report["tokens_after"] < report["tokens_before"]
+        assert report["reduction"] > 0.3
+        assert normalized["transcript"] == normalized["segments"].text
+        assert info["transcript"] == segments.text  # input left untouched
+
+    def test_can_be_disabled(self):
+        """Test that a disabled stage passes the transcript through verbatim."""
+        info = {"transcript": "[Music] hello"}
+        normalized, report = normalize_video_info(info, {"enabled": False})
+        assert normalized is info
+        assert report["reduction"] == 0.0
+
+    def test_video_info_without_segments(self):
+        """Test that plain-text transcripts are normalized too."""
+        normalized, _ = normalize_video_info({"transcript": "[Music] hello there"})
+        assert normalized["transcript"] == "hello there"
+
+    def test_options_ignore_unset_overrides(self):
+        """Test that None overrides keep the defaults."""
+        assert normalization_options({"strip_fillers": None}) == normalization_options()
+
+    def test_node_stores_report(self):
+        """Test that the node replaces the transcript and records the report."""
+        shared = {"video_info": {"title": "T", "transcript": "[Music] hello"}, "normalize": {"resegment": False}}
+        NormalizeTranscript().run(shared)
+        assert shared["video_info"]["transcript"] == "hello"
+        assert shared["normalization"]["enabled"] is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,120 @@
+"""Tests for the dry-run planner and its token, price and cache helpers."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import planner
+from flow import build_extraction_prompt
+from utils.model_catalog import get_model_price, estimate_cost
+from utils.normalize import normalize_video_info
+from utils.tokens import estimate_tokens
+from utils.transcript_cache import TranscriptCache
+from utils import youtube_processor
+
+VIDEO_INFO = {
+    "title": "Test Video",
+    "transcript": "word " * 8000,
+    "thumbnail_url": "",
+    "video_id": "aaaaaaaaaaa",
+}
+ENV = {
+    'OPENAI_ANALYSIS_MODEL': 'gpt-4o',
+    'OPENAI_SIMPLIFICATION_MODEL': 'gpt-4o-mini',
+}
+
+
+class TestHelpers:
+    """Test token estimation, pricing and the transcript cache."""
+
+    def test_estimate_tokens(self):
+        """Test that the estimate scales with text length."""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd" * 100, "gemini-1.5-flash") == 100
+
+    def test_model_prices_match_dated_snapshots(self):
+        """Test exact and prefix price lookups."""
+        assert get_model_price("gpt-4o") == (2.50, 10.00)
+        assert get_model_price("gpt-4o-mini-2024-07-18") == (0.15, 0.60)
+        assert get_model_price("o3-2025-04-16") == get_model_price("o3")
+        assert get_model_price("my-local-model") is None
+        assert estimate_cost("gpt-4o", 1_000_000, 100_000) == pytest.approx(3.5)
+
+    def test_transcript_cache_round_trip(self, tmp_path):
+        """Test that video info survives a round trip through the disk cache."""
+        cache = TranscriptCache(str(tmp_path))
+        assert cache.get("aaaaaaaaaaa") is None
+        cache.put("aaaaaaaaaaa", VIDEO_INFO)
+        assert cache.get("aaaaaaaaaaa") == VIDEO_INFO
+
+    def test_disk_cache_avoids_refetch(self, tmp_path):
+        """Test that get_video_info reads from the disk cache before fetching."""
+        youtube_processor.set_transcript_cache_dir(str(tmp_path))
+        youtube_processor.clear_video_info_cache()
+        try:
+            with patch('utils.youtube_processor._fetch_video_info', return_value=dict(VIDEO_INFO)) as mock_fetch:
+                youtube_processor.get_video_info("https://youtu.be/aaaaaaaaaaa")
+                youtube_processor.clear_video_info_cache()
+                info = youtube_processor.get_video_info("https://youtu.be/aaaaaaaaaaa")
+            assert mock_fetch.call_count == 1
+            assert info["title"] == "Test Video"
+        finally:
+            youtube_processor.set_transcript_cache_dir(None)
+            youtube_processor.clear_video_info_cache()
+
+
+class TestPlanner:
+    """Test projections from the planner."""
+
+    def test_plan_video_counts_real_extraction_prompt(self):
+        """Test that the analysis call is sized from the actual extraction prompt."""
+        with patch.dict(os.environ, ENV):
+            calls = planner.plan_video(VIDEO_INFO, "openai", output_budget=0)
+            packed = planner.plan_video(VIDEO_INFO, "openai", output_budget=4000)
+
+        assert len(calls) == 1 + planner.EXPECTED_TOPICS
+        # Five topics of three answers fit one packed call
+        assert len(packed) == 2
+        assert calls[0]["model"] == "gpt-4o"
+        normalized, _ = normalize_video_info(VIDEO_INFO)
+        assert calls[0]["input_tokens"] == estimate_tokens(
+            build_extraction_prompt(VIDEO_INFO["title"], normalized["transcript"]), "gpt-4o")
+        assert all(c["model"] == "gpt-4o-mini" for c in calls[1:])
+
+    def test_plan_batch_makes_no_llm_calls(self):
+        """Test that planning fetches transcripts but never calls a provider."""
+        with patch.dict(os.environ, ENV), \
+             patch('planner.get_video_info', side_effect=[dict(VIDEO_INFO), {"error": "Transcripts disabled"}]), \
+             patch('utils.call_llm.call_llm_openai') as mock_openai, \
+             patch('utils.call_llm.call_llm_gemini') as mock_gemini:
+            plan = planner.plan_batch(["https://youtu.be/aaaaaaaaaaa", "https://youtu.be/bbbbbbbbbbb"],
+                                      ["openai"])
+
+        mock_openai.assert_not_called()
+        mock_gemini.assert_not_called()
+        assert len(plan["videos"]) == 1
+        assert plan["unavailable"][0]["error"] == "Transcripts disabled"
+        assert plan["total_calls"] == 2
+        assert plan["providers"]["openai"]["per_topic"]["calls"] == 6
+        assert plan["total_cost"] > 0
+        assert "1 unavailable" in planner.format_plan(plan)
+
+    def test_rate_limits_bound_wall_time(self):
+        """Test that a tight RPM limit becomes the binding constraint."""
+        with patch.dict(os.environ, ENV), \
+             patch('planner.get_video_info', return_value=dict(VIDEO_INFO)):
+            unlimited = planner.plan_batch(["https://youtu.be/aaaaaaaaaaa"] * 10, ["openai"], concurrency=10)
+            limited = planner.plan_batch(["https://youtu.be/aaaaaaaaaaa"] * 10, ["openai"], concurrency=10, rpm=1)
+
+        assert unlimited["binding_constraint"] == "latency"
+        assert limited["binding_constraint"] == "openai RPM"
+        # 10 videos x (1 extraction + 1 packed processing call) at one call a minute
+        assert limited["wall_seconds"] == pytest.approx(20 * 60)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,211 @@
+"""Tests for the local HTTP API server and request coalescing."""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import pytest
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from server import SummaryServer, SummaryService
+
+URL = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+
+
+class BlockingRunner:
+    """Stand-in for the flow that blocks until released and counts its calls."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, url, provider):
+        self.calls.append((url, provider))
+        self.release.wait(5)
+        return {
+            "video_info": {"title": "Test Video", "video_id": "aaaaaaaaaaa"},
+            "topics": [{"title": "Topic", "questions": []}],
+            "html_output": "<html>summary</html>",
+            "output_file": "output/Test Video_openai.html",
+        }
+
+
+async def request(port, method, path, payload=None):
+    """Send one HTTP request and return (status, body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, content = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    return status, content.decode()
+
+
+def run_with_server(service, scenario):
+    """Start a server on a free port, run the scenario against it, then shut down."""
+    async def main():
+        server = SummaryServer(service, port=0)
+        await server.start()
+        try:
+            return await scenario(server.port)
+        finally:
+            await server.stop()
+    return asyncio.run(main())
+
+
+class TestCoalescing:
+    """Test that concurrent requests for the same video share one computation."""
+
+    def test_same_video_and_provider_coalesce(self):
+        """Test that duplicate submissions run the flow only once."""
+        runner = BlockingRunner()
+        service = SummaryService(concurrency=2, runner=runner)
+
+        async def scenario(port):
+            responses = await asyncio.gather(*[
+                request(port, "POST", "/jobs", {"url": URL, "provider": "openai"}) for _ in range(5)
+            ])
+            assert all(status == 202 for status, _ in responses)
+            job_ids = {json.loads(body)["job_id"] for _, body in responses}
+            assert len(job_ids) == 5
+            assert sum(json.loads(body)["coalesced"] for _, body in responses) == 4
+
+            runner.release.set()
+            status, body = await request(port, "GET", f"/jobs/{job_ids.pop()}/events")
+            assert status == 200
+            assert '"status": "done"' in body
+
+            for job_id in job_ids:
+                status, body = await request(port, "GET", f"/jobs/{job_id}/html")
+                assert status == 200
+                assert body == "<html>summary</html>"
+
+        run_with_server(service, scenario)
+        assert len(runner.calls) == 1
+        assert service.stats["coalesced"] == 4
+
+    def test_different_providers_do_not_coalesce(self):
+        """Test that the provider is part of the coalescing key."""
+        runner = BlockingRunner()
+        runner.release.set()
+        service = SummaryService(concurrency=1, runner=runner)
+
+        async def scenario(port):
+            await request(port, "POST", "/jobs", {"url": URL, "provider": "openai"})
+            await request(port, "POST", "/jobs", {"url": URL, "provider": "gemini"})
+            await service.queue.join()
+
+        run_with_server(service, scenario)
+        assert sorted(p for _, p in runner.calls) == ["gemini", "openai"]
+
+
+class TestJobRegistry:
+    """Test that the job registry stays bounded."""
+
+    def test_eviction_skips_unfinished_jobs(self):
+        """Test that a job stuck at the head doesn't stop finished jobs behind it from being forgotten."""
+        runner = BlockingRunner()
+        runner.release.set()
+        service = SummaryService(concurrency=1, max_jobs=2, runner=runner)
+
+        async def scenario():
+            service.start()
+            stuck_id, _ = service.submit("https://youtu.be/aaaaaaaaaaa")
+            for video_id in ("bbbbbbbbbbb", "ccccccccccc", "ddddddddddd", "eeeeeeeeeee"):
+                service.submit(f"https://youtu.be/{video_id}")
+                await service.queue.join()
+                # Keep the first job unfinished, as if it were stuck
+                service.jobs[stuck_id]["computation"].status = "running"
+            await service.stop()
+
+        asyncio.run(scenario())
+        assert len(service.jobs) == 2
+        assert "1" in service.jobs
+        finished = service.jobs["5"]["computation"]
+        assert finished.result["title"] == "Test Video"
+        assert "video_info" not in finished.result
+
+
+class TestLifecycle:
+    """Test the service across event loops, as main() runs it."""
+
+    def test_service_built_outside_the_loop(self):
+        """Test that a service created before asyncio.run() processes jobs, also after a restart."""
+        runner = BlockingRunner()
+        runner.release.set()
+        service = SummaryService(concurrency=1, runner=runner)
+
+        async def scenario(port):
+            status, body = await request(port, "POST", "/jobs", {"url": URL, "provider": "openai"})
+            assert status == 202
+            job_id = json.loads(body)["job_id"]
+            for _ in range(100):
+                status, body = await request(port, "GET", f"/jobs/{job_id}")
+                if json.loads(body)["status"] == "done":
+                    break
+                await asyncio.sleep(0.02)
+            status, body = await request(port, "GET", f"/jobs/{job_id}/json")
+            assert status == 200 and json.loads(body)["title"] == "Test Video"
+
+        # Each asyncio.run() has its own loop; a queue left from the first would be bound to it
+        run_with_server(service, scenario)
+        run_with_server(service, scenario)
+        assert len(runner.calls) == 2
+
+
+class TestBackpressureAndProbes:
+    """Test queue limits and health endpoints."""
+
+    def test_full_queue_returns_429(self):
+        """Test that new work is rejected once the queue is full."""
+        runner = BlockingRunner()
+        service = SummaryService(concurrency=1, max_queue=1, runner=runner)
+
+        async def scenario(port):
+            await request(port, "POST", "/jobs", {"url": "https://youtu.be/aaaaaaaaaaa"})
+            await asyncio.sleep(0.05)  # let the executor pick it up
+            status, _ = await request(port, "POST", "/jobs", {"url": "https://youtu.be/bbbbbbbbbbb"})
+            assert status == 202
+            status, _ = await request(port, "POST", "/jobs", {"url": "https://youtu.be/ccccccccccc"})
+            assert status == 429
+            # Coalesced requests don't need a queue slot
+            status, _ = await request(port, "POST", "/jobs", {"url": "https://youtu.be/bbbbbbbbbbb"})
+            assert status == 202
+
+            status, _ = await request(port, "GET", "/readyz")
+            assert status == 503
+            runner.release.set()
+
+        run_with_server(service, scenario)
+
+    def test_health_and_errors(self):
+        """Test health probe, bad input and unknown jobs."""
+        service = SummaryService(runner=BlockingRunner())
+
+        async def scenario(port):
+            assert (await request(port, "GET", "/healthz"))[0] == 200
+            assert (await request(port, "GET", "/readyz"))[0] == 200
+            assert (await request(port, "POST", "/jobs", {"url": "not a video"}))[0] == 400
+            assert (await request(port, "POST", "/jobs", {"url": 42}))[0] == 400
+            assert (await request(port, "POST", "/jobs", [URL]))[0] == 400
+            assert (await request(port, "POST", "/jobs", {"url": URL, "provider": 1}))[0] == 400
+            assert (await request(port, "POST", "/jobs", {"url": URL, "provider": "claude"}))[0] == 400
+            assert not service.jobs
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /jobs HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+            assert (await reader.read()).startswith(b"HTTP/1.1 400 ")
+            writer.close()
+            assert (await request(port, "GET", "/jobs/999"))[0] == 404
+
+        run_with_server(service, scenario)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
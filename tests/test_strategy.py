@@ -0,0 +1,141 @@
+"""Tests for choosing a summary strategy from the transcript size."""
+
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import planner
+from flow import create_youtube_processor_flow, ChooseStrategy
+from utils.call_llm import use_provider
+from utils.model_catalog import get_context_window
+from utils.strategy import choose_strategy, plan_strategy, split_transcript
+
+ENV = {
+    'OPENAI_ANALYSIS_MODEL': 'gpt-4o',
+    'OPENAI_SIMPLIFICATION_MODEL': 'gpt-4o-mini',
+}
+ANSWERED = """```yaml
+topics:
+  - title: |
+        Topic from {part}
+    questions:
+      - original: |
+            What about {part}?
+        rephrased: |
+            Why {part}?
+        answer: |
+            <b>Because</b> of {part}.
+```"""
+
+
+class TestChooseStrategy:
+    """Test thresholds, forcing and chunking."""
+
+    def test_thresholds(self):
+        """Test that size picks single, two_stage or map_reduce."""
+        options = {"single_max_tokens": 1000, "map_reduce_min_tokens": 50_000, "context_fraction": 0.5}
+        assert choose_strategy(800, 128_000, options)[0] == "single"
+        assert choose_strategy(20_000, 128_000, options)[0] == "two_stage"
+        assert choose_strategy(60_000, 128_000, options)[0] == "map_reduce"
+        # A small context window lowers the map_reduce threshold
+        assert choose_strategy(20_000, 16_000, options)[0] == "map_reduce"
+
+    def test_forced_strategy(self):
+        """Test that a forced strategy wins and unknown names are rejected."""
+        assert choose_strategy(100, 128_000, {"strategy": "two_stage"}) == ("two_stage", "forced")
+        with pytest.raises(ValueError):
+            choose_strategy(100, 128_000, {"strategy": "fastest"})
+
+    def test_plan_uses_model_context(self):
+        """Test that the smaller of the two models' context windows is used."""
+        with patch.dict(os.environ, {'OPENAI_ANALYSIS_MODEL': 'gpt-4.1', 'OPENAI_SIMPLIFICATION_MODEL': 'gpt-3.5-turbo'}):
+            plan = plan_strategy("word " * 40_000, "openai", {"map_reduce_min_tokens": 10**9})
+        assert plan["context_tokens"] == get_context_window("gpt-3.5-turbo") == 16_385
+        assert plan["strategy"] == "map_reduce"
+        assert plan["chunk_tokens"] == 8192
+
+    def test_plan_follows_task_routing(self):
+        """Test that a task routed to another provider is planned against that provider's model."""
+        with patch.dict(os.environ, {'GEMINI_ANALYSIS_MODEL': 'gemini-1.5-pro', 'GEMINI_SIMPLIFICATION_MODEL': 'gemini-1.5-pro',
+                                     'SIMPLIFICATION_PROVIDER': 'openai', 'OPENAI_SIMPLIFICATION_MODEL': 'gpt-3.5-turbo'}):
+            plan = plan_strategy("word " * 10, "gemini")
+            shared = {"video_info": {"transcript": "word " * 10}}
+            with use_provider("gemini"):
+                ChooseStrategy().run(shared)
+        assert plan["context_tokens"] == get_context_window("gpt-3.5-turbo")
+        assert shared["strategy_plan"]["context_tokens"] == plan["context_tokens"]
+
+    def test_split_transcript(self):
+        """Test that chunks respect the size, prefer sentence breaks and keep every word."""
+        text = " ".join(f"Sentence number {i} is here." for i in range(200))
+        chunks = split_transcript(text, 100)
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 400 for chunk in chunks)
+        assert all(chunk.endswith(".") for chunk in chunks)
+        assert " ".join(chunks).split() == text.split()
+        assert split_transcript("short", 100) == ["short"]
+        assert split_transcript("", 100) == []
+
+
+class TestStrategyFlow:
+    """Test that the flow runs the stages of the chosen strategy."""
+
+    def run_flow(self, tmp_path, transcript, strategy, llm):
+        video_info = {"title": "Test", "transcript": transcript, "thumbnail_url": "", "video_id": "aaaaaaaaaaa"}
+        shared = {"url": "https://youtu.be/aaaaaaaaaaa", "output_dir": str(tmp_path),
+                  "normalize": {"enabled": False}, "strategy": strategy}
+        with patch.dict(os.environ, ENV), \
+             patch('flow.get_video_info', return_value=video_info), \
+             patch('flow.call_llm', side_effect=llm) as mock_llm:
+            create_youtube_processor_flow().run(shared)
+        return shared, mock_llm
+
+    def test_short_video_takes_one_call(self, tmp_path):
+        """Test that a short transcript is extracted and answered in a single call."""
+        shared, mock_llm = self.run_flow(tmp_path, "A short talk about bees.", None,
+                                         lambda prompt, task=None: ANSWERED.format(part="bees"))
+        assert mock_llm.call_count == 1
+        assert shared["strategy_plan"]["strategy"] == "single"
+        assert shared["topics"][0]["questions"][0]["answer"].strip() == "<b>Because</b> of bees."
+        assert "Why bees?" in shared["html_output"]
+
+    def test_map_reduce_chunks_then_selects(self, tmp_path):
+        """Test that each chunk is summarized and the best topics are selected."""
+        transcript = " ".join(f"Part {i} talks about thing{i}." for i in range(40))
+
+        def llm(prompt, task=None):
+            if "TOPICS:" in prompt:
+                return "```yaml\nselected:\n  - 7\n  - 2\n```"
+            part = prompt.split("part ")[1].split(" of")[0]
+            return ANSWERED.format(part=f"chunk {part}")
+
+        shared, mock_llm = self.run_flow(tmp_path, transcript, {"strategy": "map_reduce", "chunk_tokens": 40}, llm)
+        chunks = mock_llm.call_count - 1
+        assert chunks > 5
+        assert len(shared["candidate_topics"]) == chunks
+        # Selected topics keep the video's order
+        assert [t["title"] for t in shared["topics"]] == ["Topic from chunk 2", "Topic from chunk 7"]
+
+
+class TestStrategyPlan:
+    """Test that --plan counts the calls of the chosen strategy."""
+
+    def test_plan_follows_strategy(self):
+        """Test call counts for single and map_reduce."""
+        video_info = {"title": "Test", "transcript": "word " * 100, "thumbnail_url": "", "video_id": "aaaaaaaaaaa"}
+        with patch.dict(os.environ, ENV):
+            single = planner.plan_video(video_info, "openai", {"enabled": False})
+            chunked = planner.plan_video(video_info, "openai", {"enabled": False},
+                                         {"strategy": "map_reduce", "chunk_tokens": 50})
+        assert [c["strategy"] for c in single] == ["single"]
+        # 500 characters in chunks of about 50 tokens, plus the selection call
+        assert len(chunked) == 3 + 1
+        assert all(c["model"] == "gpt-4o" for c in chunked)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
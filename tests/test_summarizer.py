@@ -0,0 +1,163 @@
+"""Tests for the library API: typed results, no side effects, sinks and concurrency."""
+
+import os
+import sys
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from summarizer import (
+    SummaryConfig, SummaryResult, HTMLFileSink, JSONFileSink,
+    summarize, summarize_many, summarize_async, summarize_many_async
+)
+from utils.call_llm import call_llm, get_current_provider, reset_clients
+from utils.deadline import current_deadline
+from utils.usage import track_usage
+
+RESPONSE = """```yaml
+topics:
+  - title: Rockets
+    questions:
+      - original: Why reuse rockets?
+        rephrased: Why land rockets?
+        answer: <b>Cost</b> drops.
+```"""
+
+
+def video_info(url):
+    if "missing" in url:
+        return {"error": "Video unavailable", "permanent": True}
+    return {"title": f"Video {url[-1]}", "video_id": f"abcdefghij{url[-1]}", "thumbnail_url": "",
+            "transcript": "We talk about reusable rockets and why landing them matters."}
+
+
+@pytest.fixture
+def fake_run():
+    """Fetch and LLM calls answered locally; records the provider each call saw"""
+    providers = []
+
+    def respond(prompt, task=None):
+        providers.append(get_current_provider())
+        return RESPONSE
+
+    with patch('flow.get_video_info', side_effect=video_info), patch('flow.call_llm', side_effect=respond):
+        yield providers
+
+
+class TestSummarize:
+    """Test a single summarize() call."""
+
+    def test_structured_result_without_side_effects(self, fake_run, tmp_path, monkeypatch):
+        """Test that the result carries topics, answers and timings, and nothing is written or changed."""
+        monkeypatch.chdir(tmp_path)
+        environ = dict(os.environ)
+        result = summarize("https://youtu.be/1", SummaryConfig(provider="gemini"))
+
+        assert isinstance(result, SummaryResult) and result.ok
+        assert result.title == "Video 1" and result.provider == "gemini"
+        assert [(topic.title, question.answer) for topic, question in result.answers()] == [("Rockets", "<b>Cost</b> drops.")]
+        assert result.timings["total"] >= result.timings["SummarizeInOneCall"] >= 0
+        assert "GenerateHTML" not in result.timings
+        assert result.usage["strategy_plan"]
+        assert fake_run == ["gemini"]
+        assert dict(os.environ) == environ
+        assert list(tmp_path.iterdir()) == []
+
+    def test_errors_raise(self, fake_run):
+        """Test that summarize() raises when the video cannot be fetched."""
+        with pytest.raises(Exception, match="unavailable"):
+            summarize("https://youtu.be/missing")
+        with pytest.raises(ValueError, match="provider"):
+            SummaryConfig(provider="claude")
+        with pytest.raises(ValueError, match="dedup policy"):
+            SummaryConfig(dedup={"policy": "merge"})
+
+    def test_dedup_option(self, fake_run):
+        """Test that the dedup option reaches the run, as DEDUP_POLICY does on the command line."""
+        result = summarize("https://youtu.be/1", SummaryConfig(strategy={"strategy": "two_stage"},
+                                                              dedup={"policy": "off"}))
+        assert result.usage["dedup_report"]["policy"] == "off"
+
+    def test_sinks(self, fake_run, tmp_path):
+        """Test that the HTML and JSON sinks save the result where asked."""
+        config = SummaryConfig(provider="openai", sinks=[HTMLFileSink(tmp_path / "html"), JSONFileSink(tmp_path / "json")])
+        collected = []
+        config.sinks.append(collected.append)
+        result = summarize("https://youtu.be/2", config)
+
+        html_path, json_path = result.outputs
+        assert html_path.endswith("Video 2_openai.html") and json_path.endswith("Video 2_openai.json")
+        with open(html_path, encoding="utf-8") as f:
+            assert "Why land rockets?" in f.read()
+        assert collected == [result]
+
+
+class TestSummarizeMany:
+    """Test batches of videos, threaded and async."""
+
+    def test_order_failures_and_concurrency(self, tmp_path):
+        """Test that results keep the input order, failures don't stop the batch and concurrency is capped."""
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def respond(prompt, task=None):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            threading.Event().wait(0.2)
+            with lock:
+                running[0] -= 1
+            return RESPONSE
+
+        urls = ["https://youtu.be/1", "https://youtu.be/2", "https://youtu.be/3", "https://youtu.be/missing"]
+        json_sink = JSONFileSink(tmp_path)
+        with patch('flow.get_video_info', side_effect=video_info), patch('flow.call_llm', side_effect=respond):
+            results = summarize_many(urls, SummaryConfig(provider="openai", sinks=[json_sink]), concurrency=2)
+
+        assert [result.url for result in results] == urls
+        assert [result.ok for result in results] == [True, True, True, False]
+        assert "unavailable" in str(results[3].error)
+        assert len(os.listdir(tmp_path)) == 4
+        assert peak[0] == 2
+
+    def test_async(self, fake_run):
+        """Test the async variants under a per-video deadline."""
+        config = SummaryConfig(provider="gemini", deadline=60)
+
+        async def main():
+            one = await summarize_async("https://youtu.be/1", config)
+            many = await summarize_many_async(["https://youtu.be/2", "https://youtu.be/missing"], config, concurrency=2)
+            return one, many
+
+        one, many = asyncio.run(main())
+        assert one.ok and [result.ok for result in many] == [True, False]
+        assert fake_run == ["gemini", "gemini"]
+        assert current_deadline() is None
+
+
+class TestUsage:
+    """Test the LLM usage meter."""
+
+    def test_calls_and_tokens(self):
+        """Test that provider calls and their reported tokens are counted per model."""
+        client = MagicMock()
+        client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="ok"))], usage=MagicMock(total_tokens=120))
+        reset_clients()
+        with patch.dict(os.environ, {"LLM_PROVIDER": "openai", "OPENAI_API_KEY": "sk-test-key-1234",
+                                     "OPENAI_MODEL": "gpt-4o"}), \
+                patch('utils.call_llm.OpenAI', return_value=client):
+            call_llm("not counted")
+            with track_usage() as meter:
+                call_llm("first")
+                call_llm("second")
+        reset_clients()
+        assert meter.to_dict() == {"calls": 2, "tokens": 240, "prepared": 0,
+                                   "models": {"openai/gpt-4o": {"calls": 2, "tokens": 240}}}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
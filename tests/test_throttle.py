@@ -0,0 +1,142 @@
+"""Tests for per-host throttling and backoff of YouTube requests."""
+
+import os
+import sys
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import youtube_transcript_api
+from utils.throttle import HostThrottle, get_throttle, reset_throttles
+from utils.http_session import create_session
+from utils import youtube_processor
+
+
+@pytest.fixture(autouse=True)
+def fresh_throttles():
+    reset_throttles()
+    yield
+    reset_throttles()
+
+
+def make_response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+class TestHostThrottle:
+    """Test the limiter itself."""
+
+    def test_requests_are_spaced_by_rate(self):
+        """Test that starts are at least 1/rps apart."""
+        throttle = HostThrottle("test", concurrency=4, rps=20)
+        starts = []
+        for _ in range(4):
+            with throttle.slot():
+                starts.append(time.monotonic())
+        gaps = [b - a for a, b in zip(starts, starts[1:])]
+        assert min(gaps) >= 0.045
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than `concurrency` requests run at once."""
+        throttle = HostThrottle("test", concurrency=2, rps=0)
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def request():
+            with throttle.slot():
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=request) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] == 2
+
+    def test_backoff_grows_and_resets(self):
+        """Test exponential cooldown, Retry-After, and reset on success."""
+        throttle = HostThrottle("test", backoff=1, max_backoff=5)
+        assert throttle.report_blocked() == 1
+        assert throttle.report_blocked() == 2
+        assert throttle.report_blocked() == 4
+        assert throttle.report_blocked() == 5
+        assert throttle.cooldown_remaining() > 4
+        throttle.report_ok()
+        assert throttle.report_blocked(retry_after=3) == 3
+
+    def test_only_youtube_is_throttled(self):
+        """Test host matching and that the throttle is shared."""
+        assert get_throttle("https://www.youtube.com/watch?v=x") is get_throttle("https://youtube.com/oembed")
+        assert get_throttle("https://api.openai.com/v1") is None
+
+
+class TestThrottledSession:
+    """Test 429 handling in the shared session and block handling for transcripts."""
+
+    def test_session_retries_after_429(self):
+        """Test that a 429 triggers a cooldown and a retry."""
+        throttle = get_throttle("https://www.youtube.com/")
+        throttle.backoff = 0.05
+        session = create_session()
+        responses = [make_response(429, {"Retry-After": "0.1"}), make_response(200)]
+        with patch('requests.Session.request', side_effect=responses) as mock_request:
+            started = time.monotonic()
+            response = session.get("https://www.youtube.com/oembed")
+
+        assert response.status_code == 200
+        assert mock_request.call_count == 2
+        assert time.monotonic() - started >= 0.1
+        assert throttle.stats["blocked"] == 1
+        assert throttle.strikes == 0
+
+    def test_session_gives_up_after_block_retries(self):
+        """Test that persistent 429s are returned to the caller."""
+        get_throttle("https://www.youtube.com/").backoff = 0.001
+        session = create_session()
+        session.block_retries = 1
+        with patch('requests.Session.request', return_value=make_response(429)) as mock_request:
+            assert session.get("https://www.youtube.com/").status_code == 429
+        assert mock_request.call_count == 2
+
+    def test_unthrottled_hosts_pass_through(self):
+        """Test that other hosts are not rate limited or retried."""
+        session = create_session()
+        with patch('requests.Session.request', return_value=make_response(429)) as mock_request:
+            session.get("https://example.com/")
+        assert mock_request.call_count == 1
+
+    def test_transcript_block_triggers_cooldown(self):
+        """Test that a captcha block from the transcript API backs off and retries."""
+        throttle = get_throttle("https://www.youtube.com/")
+        throttle.backoff = 0.01
+        api = MagicMock()
+        api.fetch.side_effect = [youtube_transcript_api.RequestBlocked("aaaaaaaaaaa"), ["entry"]]
+        api_class = MagicMock(return_value=api)
+        with patch('utils.youtube_processor.YouTubeTranscriptApi', api_class):
+            entries = youtube_processor._fetch_transcript_entries("aaaaaaaaaaa")
+
+        assert entries == ["entry"]
+        assert throttle.stats["blocked"] == 1
+
+    def test_transcript_fetch_uses_shared_session(self):
+        """Test that transcripts are fetched over the pooled, throttled session."""
+        api_class = MagicMock()
+        api_class.return_value.fetch.return_value = ["entry"]
+        with patch('utils.youtube_processor.YouTubeTranscriptApi', api_class):
+            youtube_processor._fetch_transcript_entries("aaaaaaaaaaa")
+        api_class.assert_called_once_with(http_client=youtube_processor.get_session())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
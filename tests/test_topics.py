@@ -0,0 +1,90 @@
+"""Tests for Topic/Question objects and ID-based merging of answers."""
+
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flow import ProcessContent, build_processing_prompt
+from utils.topics import Topic, Question, assign_ids, ensure_ids, topics_to_dicts, topics_from_dicts
+
+
+class TestTopicObjects:
+    """Test IDs, dict access and serialization."""
+
+    def test_assign_ids(self):
+        """Test that topics and questions are numbered with an optional prefix."""
+        topics = assign_ids([Topic(None, "A", [Question(None, "a1"), Question(None, "a2")]),
+                             Topic(None, "B", [Question(None, "b1")])], prefix="w2.")
+        assert [t.id for t in topics] == ["w2.t1", "w2.t2"]
+        assert [q.id for q in topics[0].questions] == ["w2.t1q1", "w2.t1q2"]
+        assert topics[1].questions[0].id == "w2.t2q1"
+
+    def test_round_trip(self):
+        """Test that topics survive JSON serialization unchanged."""
+        topics = assign_ids([Topic(None, "A", [Question(None, "a1", "A one?", "<p>Yes</p>")], "Better A", 60)])
+        restored = topics_from_dicts(json.loads(json.dumps(topics_to_dicts(topics))))
+        assert restored[0].to_dict() == topics[0].to_dict()
+        assert restored[0].questions[0].id == "t1q1"
+
+    def test_dict_access(self):
+        """Test that code written against the dict shape keeps working."""
+        topic = Topic("t1", "A", [Question("t1q1", "a1")])
+        assert topic["title"] == "A"
+        assert topic.get("rephrased_title", "A") == "A"
+        assert topic["questions"][0]["original"] == "a1"
+        with pytest.raises(KeyError):
+            topic["missing"]
+        with pytest.raises(AttributeError):
+            topic.extra = 1
+
+    def test_ensure_ids_keeps_existing(self):
+        """Test that dicts are converted and existing IDs are left alone."""
+        topics = ensure_ids([{"id": "c3", "title": "A", "questions": ["a1"]}])
+        assert topics[0].id == "c3"
+        assert topics[0].questions[0].id == "c3q1"
+        assert ensure_ids([{"title": "B", "questions": ["b1"]}])[0].id == "t1"
+
+
+class TestMergeById:
+    """Test that ProcessContent matches answers by ID rather than wording."""
+
+    def test_reworded_original_still_merged(self):
+        """Test that an answer whose original was rewritten lands on the right question."""
+        shared = {
+            "video_info": {"transcript": "Transcript"},
+            "topics": [{"title": "A", "questions": ["What is A?", "Why A?"]}],
+        }
+        response = """```yaml
+rephrased_title: Better A
+questions:
+  - id: t1q2
+    original: Why would anyone want A?
+    rephrased: Why A?
+    answer: Because.
+  - id: t1q1
+    original: What's A
+    rephrased: What is A?
+    answer: A is a letter.
+```"""
+        with patch('flow.call_llm', return_value=response) as mock_call_llm:
+            ProcessContent().run(shared)
+
+        assert "- [t1q1] What is A?" in mock_call_llm.call_args[0][0]
+        questions = shared["topics"][0].questions
+        assert [q.answer for q in questions] == ["A is a letter.", "Because."]
+        assert questions[0].original == "What is A?"
+
+    def test_prompt_unchanged_without_ids(self):
+        """Test that plain string questions produce the original prompt."""
+        prompt = build_processing_prompt("A", ["What is A?"], "Transcript")
+        assert "- What is A?" in prompt
+        assert "id:" not in prompt
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,92 @@
+"""Tests for the compact timestamped transcript."""
+
+import os
+import sys
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.transcript import Transcript
+from utils.transcript_cache import TranscriptCache
+from utils import youtube_processor
+
+ENTRIES = [
+    {"text": "hello there", "start": 0.0, "duration": 2.0},
+    {"text": "general kenobi", "start": 2.0, "duration": 3.0},
+    {"text": "you are a bold one", "start": 5.0, "duration": 4.0},
+    {"text": "kill him", "start": 9.0, "duration": 1.5},
+]
+
+
+class TestTranscript:
+    """Test the array-backed transcript."""
+
+    def test_text_matches_original_join(self):
+        """Test that the text buffer is identical to joining the entry texts."""
+        transcript = Transcript.from_entries(ENTRIES)
+        assert transcript.text == " ".join(e["text"] for e in ENTRIES)
+        assert len(transcript) == 4
+        assert transcript.segment(2) == (5.0, 4.0, "you are a bold one")
+        assert transcript.duration == pytest.approx(10.5)
+
+    def test_accepts_snippet_objects(self):
+        """Test entries exposed as attributes (youtube-transcript-api 1.x)."""
+        snippets = [SimpleNamespace(**e) for e in ENTRIES]
+        assert Transcript.from_entries(snippets).text == Transcript.from_entries(ENTRIES).text
+
+    def test_time_and_offset_lookup(self):
+        """Test mapping between times and character offsets."""
+        transcript = Transcript.from_entries(ENTRIES)
+        offset = transcript.offset_at_time(6.5)
+        assert transcript.text[offset:].startswith("you are a bold one")
+        assert transcript.time_at_offset(offset + 3) == 5.0
+        assert transcript.segment_at_time(0.0) == 0
+        assert transcript.segment_at_time(100.0) == 3
+
+    def test_slice_and_windows(self):
+        """Test time slicing and fixed-size windows."""
+        transcript = Transcript.from_entries(ENTRIES)
+        window = transcript.slice_time(2.0, 9.0)
+        assert window.text == "general kenobi you are a bold one"
+        assert window.segment(1) == (5.0, 4.0, "you are a bold one")
+
+        windows = list(transcript.windows(5.0))
+        assert [w.text for w in windows] == ["hello there general kenobi", "you are a bold one kill him"]
+
+    def test_empty_transcript(self):
+        """Test that an empty transcript behaves sensibly."""
+        transcript = Transcript.from_entries([])
+        assert transcript.text == ""
+        assert list(transcript.windows(60)) == []
+        with pytest.raises(IndexError):
+            transcript.segment_at_time(1.0)
+
+    def test_cache_round_trip(self, tmp_path):
+        """Test that segments survive the disk cache without storing the text twice."""
+        transcript = Transcript.from_entries(ENTRIES)
+        cache = TranscriptCache(str(tmp_path))
+        cache.put("aaaaaaaaaaa", {"title": "T", "transcript": transcript.text, "segments": transcript})
+
+        loaded = cache.get("aaaaaaaaaaa")
+        assert loaded["transcript"] == transcript.text
+        assert loaded["segments"].starts == transcript.starts
+        assert loaded["segments"].offsets == transcript.offsets
+        with open(tmp_path / "aaaaaaaaaaa.json", encoding="utf-8") as f:
+            assert f.read().count("general kenobi") == 1
+
+    def test_get_video_info_keeps_segments(self):
+        """Test that fetched video info carries the segments alongside the text."""
+        with patch('utils.youtube_processor.fetch_video_metadata', return_value={"title": "Test", "author": None}), \
+             patch('utils.youtube_processor._fetch_transcript_entries', return_value=ENTRIES):
+            info = youtube_processor.get_video_info("https://youtu.be/aaaaaaaaaaa", use_cache=False)
+
+        assert info["title"] == "Test"
+        assert info["transcript"] == " ".join(e["text"] for e in ENTRIES)
+        assert info["segments"].text is info["transcript"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,181 @@
+"""Tests for fetching video information: metadata, shared session and failure caching."""
+
+import os
+import sys
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+import requests
+import youtube_transcript_api
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.video_metadata import fetch_video_metadata, METADATA_TIMEOUT
+from utils.http_session import create_session, get_session, HTTP_TIMEOUT
+from utils import youtube_processor
+
+URL = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+HEAD = ('<html><head><title>Fallback Title - YouTube</title>'
+        '<meta name="title" content="Meta &amp; Title"><link rel="author">'
+        '<meta itemprop="author" content="Channel"></head><body>')
+
+
+def make_page_response(chunks):
+    """A streaming response that records how many chunks were read."""
+    response = MagicMock()
+    response.encoding = "utf-8"
+    response.__enter__.return_value = response
+    response.read_chunks = 0
+
+    def iter_content(chunk_size, decode_unicode):
+        for chunk in chunks:
+            response.read_chunks += 1
+            yield chunk
+    response.iter_content.side_effect = iter_content
+    return response
+
+
+class TestFetchVideoMetadata:
+    """Test oEmbed lookup and the streaming fallback."""
+
+    def test_uses_oembed_with_timeouts(self):
+        """Test that the small oEmbed endpoint is preferred."""
+        session = MagicMock()
+        session.get.return_value.json.return_value = {"title": "Real Title", "author_name": "Channel"}
+
+        metadata = fetch_video_metadata(URL, "aaaaaaaaaaa", session)
+
+        assert metadata == {"title": "Real Title", "author": "Channel"}
+        assert session.get.call_count == 1
+        assert session.get.call_args.kwargs["timeout"] == METADATA_TIMEOUT
+
+    def test_falls_back_to_streaming_page_head(self):
+        """Test that the fallback stops reading once the head is parsed."""
+        oembed = MagicMock()
+        oembed.raise_for_status.side_effect = requests.HTTPError("401")
+        page = make_page_response([HEAD[:40], HEAD[40:], "<div>" * 1000, "never read"])
+        session = MagicMock()
+        session.get.side_effect = [oembed, page]
+
+        metadata = fetch_video_metadata(URL, "aaaaaaaaaaa", session)
+
+        assert metadata == {"title": "Meta & Title", "author": "Channel"}
+        assert page.read_chunks == 2
+        assert session.get.call_args.kwargs["stream"] is True
+
+    def test_fallback_uses_title_tag(self):
+        """Test the <title> tag when there are no meta tags."""
+        session = MagicMock()
+        session.get.side_effect = [requests.ConnectionError("blocked"),
+                                   make_page_response(["<head><title>Only Title - YouTube</title></head>"])]
+
+        assert fetch_video_metadata(URL, "aaaaaaaaaaa", session)["title"] == "Only Title"
+
+    def test_missing_title_raises(self):
+        """Test that a page without a title is an error."""
+        session = MagicMock()
+        session.get.side_effect = [requests.ConnectionError("blocked"), make_page_response(["<head></head>"])]
+
+        with pytest.raises(ValueError):
+            fetch_video_metadata(URL, "aaaaaaaaaaa", session)
+
+
+class TestSharedSession:
+    """Test the pooled session and concurrent fetching in get_video_info."""
+
+    def test_session_is_shared_and_pooled(self):
+        """Test one process-wide session with a blocking per-host pool."""
+        assert get_session() is get_session()
+        session = create_session(max_per_host=3)
+        adapter = session.get_adapter("https://www.youtube.com/")
+        assert adapter._pool_maxsize == 3
+        assert adapter._pool_block is True
+
+    def test_session_applies_default_timeout(self):
+        """Test that requests without a timeout get the default one."""
+        session = create_session()
+        with patch('requests.Session.request') as mock_request:
+            session.get("https://www.youtube.com/")
+            session.get("https://www.youtube.com/", timeout=1)
+        assert mock_request.call_args_list[0].kwargs["timeout"] == HTTP_TIMEOUT
+        assert mock_request.call_args_list[1].kwargs["timeout"] == 1
+
+    def test_title_and_transcript_fetched_concurrently(self):
+        """Test that the fetch takes about as long as the slower request."""
+        def slow_metadata(url, video_id, session):
+            time.sleep(0.3)
+            return {"title": "Title", "author": None}
+
+        def slow_transcript(video_id, session):
+            time.sleep(0.3)
+            return [{"text": "hi", "start": 0.0, "duration": 1.0}]
+
+        with patch('utils.youtube_processor.fetch_video_metadata', side_effect=slow_metadata), \
+             patch('utils.youtube_processor._fetch_transcript_entries', side_effect=slow_transcript):
+            started = time.monotonic()
+            info = youtube_processor.get_video_info("https://youtu.be/aaaaaaaaaaa", use_cache=False)
+            elapsed = time.monotonic() - started
+
+        assert info["title"] == "Title"
+        assert info["transcript"] == "hi"
+        assert elapsed < 0.55
+
+    def test_title_failure_is_reported(self):
+        """Test that an error from the title fetch becomes an error result."""
+        with patch('utils.youtube_processor.fetch_video_metadata', side_effect=requests.ConnectionError("down")), \
+             patch('utils.youtube_processor._fetch_transcript_entries', return_value=[]):
+            info = youtube_processor.get_video_info("https://youtu.be/aaaaaaaaaaa", use_cache=False)
+        assert info == {"error": "down", "permanent": False}
+
+
+
+class TestNegativeCache:
+    """Test classification and caching of permanent failures."""
+
+    @pytest.fixture(autouse=True)
+    def disk_cache(self, tmp_path):
+        youtube_processor.set_transcript_cache_dir(str(tmp_path))
+        youtube_processor.clear_video_info_cache()
+        yield tmp_path
+        youtube_processor.set_transcript_cache_dir(None)
+        youtube_processor.clear_video_info_cache()
+
+    def test_permanent_failure_is_cached_across_runs(self):
+        """Test that a video without captions is fetched once, even after a restart."""
+        disabled = youtube_transcript_api.TranscriptsDisabled("aaaaaaaaaaa")
+        with patch('utils.youtube_processor.fetch_video_metadata', return_value={"title": "T", "author": None}), \
+             patch('utils.youtube_processor._fetch_transcript_entries', side_effect=disabled) as mock_fetch:
+            first = youtube_processor.get_video_info(URL)
+            youtube_processor.clear_video_info_cache()  # simulate a new process
+            second = youtube_processor.get_video_info(URL)
+
+        assert first["permanent"] is True
+        assert second == {"error": first["error"], "permanent": True}
+        assert mock_fetch.call_count == 1
+        assert youtube_processor.get_cached_failure(URL) == first["error"]
+
+    def test_transient_failure_is_not_cached(self):
+        """Test that network errors are retried on the next call."""
+        with patch('utils.youtube_processor.fetch_video_metadata', return_value={"title": "T", "author": None}), \
+             patch('utils.youtube_processor._fetch_transcript_entries',
+                   side_effect=requests.ConnectionError("reset")) as mock_fetch:
+            assert youtube_processor.get_video_info(URL)["permanent"] is False
+            youtube_processor.get_video_info(URL)
+
+        assert mock_fetch.call_count == 2
+        assert youtube_processor.get_cached_failure(URL) is None
+
+    def test_failures_expire(self):
+        """Test that the negative cache honours its TTL."""
+        with patch('utils.youtube_processor.NEGATIVE_CACHE_TTL', -1):
+            youtube_processor._remember_failure("aaaaaaaaaaa", "Video unavailable")
+        assert youtube_processor.get_cached_failure(URL) is None
+
+    def test_invalid_url_is_permanent(self):
+        """Test that malformed URLs are never fetched."""
+        assert youtube_processor.get_video_info("not a url") == {"error": "Invalid YouTube URL", "permanent": True}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,156 @@
+"""Tests for the resident queue worker."""
+
+import os
+import sys
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+
+# Add the parent directory to Python path so we can import modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import worker
+from utils.call_llm import get_current_provider
+from utils.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    """Create a queue in a temporary database."""
+    return JobQueue(str(tmp_path / "jobs.db"), visibility_timeout=60)
+
+
+class TestWorker:
+    """Test that the worker drives jobs through the flow."""
+
+    def test_successful_job_records_result(self, queue):
+        """Test that a finished flow marks the job done with its artifacts."""
+        job_id = queue.enqueue("https://www.youtube.com/watch?v=aaaaaaaaaaa", provider="gemini")
+        seen_providers = []
+
+        def fake_run(shared):
+            seen_providers.append(get_current_provider())
+            shared["video_info"] = {"title": "Test Video", "video_id": "aaaaaaaaaaa"}
+            shared["topics"] = [{"title": "Topic", "questions": []}]
+            shared["output_file"] = "output/Test Video_gemini.html"
+
+        with patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow = MagicMock()
+            mock_flow.run.side_effect = fake_run
+            mock_flow_factory.return_value = mock_flow
+
+            processed = worker.Worker(queue, worker_id="w1", probe_window=0).run(once=True)
+
+        assert processed == 1
+        assert seen_providers == ["gemini"]
+        job = queue.get(job_id)
+        assert job["status"] == "done"
+        assert job["output_file"] == "output/Test Video_gemini.html"
+        assert job["result"]["video_id"] == "aaaaaaaaaaa"
+
+    def test_failed_job_is_retried_later(self, queue):
+        """Test that a flow error is recorded and the job goes back to pending."""
+        job_id = queue.enqueue("https://www.youtube.com/watch?v=aaaaaaaaaaa", max_attempts=2)
+
+        with patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow = MagicMock()
+            mock_flow.run.side_effect = Exception("LLM API Error")
+            mock_flow_factory.return_value = mock_flow
+
+            worker.Worker(queue, worker_id="w1", retry_delay=60, probe_window=0).run(once=True)
+
+        job = queue.get(job_id)
+        assert job["status"] == "pending"
+        assert "LLM API Error" in job["error"]
+
+    def test_provider_override_does_not_touch_environment(self, queue):
+        """Test that per-job providers leave LLM_PROVIDER alone."""
+        queue.enqueue("https://www.youtube.com/watch?v=aaaaaaaaaaa", provider="gemini")
+
+        with patch.dict(os.environ, {'LLM_PROVIDER': 'openai'}):
+            with patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+                mock_flow_factory.return_value = MagicMock()
+                worker.Worker(queue, worker_id="w1", probe_window=0).run(once=True)
+
+            assert os.environ['LLM_PROVIDER'] == 'openai'
+            assert get_current_provider() == 'openai'
+
+
+class TestPriorityLanes:
+    """Test reserved interactive slots and shortest-first bulk ordering."""
+
+    def test_probe_orders_bulk_jobs_shortest_first(self, queue):
+        """Test that probed transcript lengths decide the bulk running order."""
+        lengths = {"aaaaaaaaaaa": 3000, "bbbbbbbbbbb": 100, "ccccccccccc": 2000}
+        for video_id in lengths:
+            queue.enqueue(f"https://www.youtube.com/watch?v={video_id}")
+
+        def fake_video_info(url):
+            return {"transcript": "x" * lengths[url[-11:]]}
+
+        order = []
+        with patch('worker.get_video_info', side_effect=fake_video_info), \
+             patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow = MagicMock()
+            mock_flow.run.side_effect = lambda shared: order.append(shared["url"][-11:])
+            mock_flow_factory.return_value = mock_flow
+
+            worker.Worker(queue, worker_id="w1", probe_window=10).run(once=True)
+
+        assert order == ["bbbbbbbbbbb", "ccccccccccc", "aaaaaaaaaaa"]
+
+    def test_interactive_job_does_not_wait_for_probes(self, queue):
+        """Test that a shared slot leases interactive work while bulk transcripts are still being measured."""
+        for video_id in ("aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"):
+            queue.enqueue(f"https://www.youtube.com/watch?v={video_id}")
+        queue.enqueue("https://www.youtube.com/watch?v=ddddddddddd", lane="interactive")
+        events = []
+        probing, release = threading.Event(), threading.Event()
+
+        def slow_video_info(url):
+            events.append(("probe", url[-11:]))
+            probing.set()
+            release.wait(5)
+            return {"error": "Video unavailable"} if url.endswith("aaaaaaaaaaa") else {"transcript": "x"}
+
+        def fake_run(shared):
+            # Start running only once a probe is under way, so the order below doesn't depend on
+            # which thread is scheduled first; the probe can't finish until this run releases it
+            probing.wait(5)
+            events.append(("run", shared["url"][-11:]))
+            release.set()
+
+        with patch('worker.get_video_info', side_effect=slow_video_info), \
+             patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow_factory.return_value = MagicMock(run=MagicMock(side_effect=fake_run))
+            worker.Worker(queue, worker_id="w1", slots=1, probe_window=10).run(once=True)
+
+        runs = [video_id for kind, video_id in events if kind == "run"]
+        assert runs[0] == "ddddddddddd"
+        assert events.index(("run", "ddddddddddd")) == 1
+        # The unfetchable video is measured as unknown, so it runs after the measured ones
+        assert runs[1:] == ["bbbbbbbbbbb", "ccccccccccc", "aaaaaaaaaaa"]
+        assert sorted(video_id for kind, video_id in events if kind == "probe") == \
+            ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+
+    def test_interactive_slot_ignores_bulk_jobs(self, queue):
+        """Test that a reserved slot never picks up bulk work."""
+        bulk_id = queue.enqueue("https://www.youtube.com/watch?v=aaaaaaaaaaa", lane="bulk")
+        interactive_id = queue.enqueue("https://www.youtube.com/watch?v=bbbbbbbbbbb", lane="interactive")
+
+        with patch('worker.create_youtube_processor_flow') as mock_flow_factory:
+            mock_flow_factory.return_value = MagicMock()
+            worker.Worker(queue, worker_id="w1", slots=1, interactive_slots=1,
+                          probe_window=0).run(once=True)
+
+        assert queue.get(interactive_id)["status"] == "done"
+        assert queue.get(bulk_id)["status"] == "pending"
+
+    def test_interactive_slots_cannot_exceed_slots(self, queue):
+        """Test that the slot configuration is validated."""
+        with pytest.raises(ValueError):
+            worker.Worker(queue, slots=1, interactive_slots=2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,177 @@
+import glob
+import hashlib
+import html
+import json
+import os
+import time
+from utils.youtube_processor import extract_video_id
+
+MANIFEST_DIR = "manifests"
+
+def read_url_list(path):
+    """Read one URL per line, skipping blank lines and # comments"""
+    urls = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                urls.append(line)
+    return urls
+
+def parse_shard(spec):
+    """Parse a shard spec like "2/8" into (index, count), with 1 <= index <= count"""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}': expected i/N, e.g. 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}': index must be between 1 and {max(count, 1)}")
+    return index, count
+
+def shard_key(url):
+    """Stable identity used for sharding: the video ID, or the raw URL if it has none"""
+    return extract_video_id(url) or url
+
+def shard_for(url, count):
+    """Return the 1-based shard that owns url (stable across machines and Python runs)"""
+    digest = hashlib.sha1(shard_key(url).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % count + 1
+
+def select_shard(urls, index, count):
+    """Return the URLs owned by shard index of count, de-duplicated by video ID"""
+    selected, seen = [], set()
+    for url in urls:
+        key = shard_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        if shard_for(url, count) == index:
+            selected.append(url)
+    return selected
+
+def manifest_path(output_dir, index=1, count=1):
+    """Path of the manifest written by one shard"""
+    return os.path.join(output_dir, MANIFEST_DIR, f"shard-{index:04d}-of-{count:04d}.jsonl")
+
+class Manifest:
+    """
+    Append-only JSONL record of what one shard has processed.
+
+    Each line records one (video, provider) attempt. Re-running a shard skips
+    entries that already completed, so an interrupted machine can simply start
+    the same command again.
+    """
+    def __init__(self, path, shard=None):
+        self.path = path
+        self.shard = shard
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def entries(self):
+        """Return all recorded entries in order"""
+        if not os.path.exists(self.path):
+            return []
+        return load_manifest(self.path)
+
+    def completed(self):
+        """Return the set of (video_id, provider) pairs that finished successfully"""
+        return {(e["video_id"], e["provider"]) for e in self.entries() if e["status"] == "done"}
+
+    def record(self, url, provider, status, output_file=None, title=None, error=None, **extra):
+        """Append an entry for one processed (video, provider) pair"""
+        entry = {
+            "video_id": shard_key(url),
+            "url": url,
+            "provider": provider,
+            "status": status,
+            "title": title,
+            "output_file": output_file,
+            "error": error,
+            "shard": self.shard,
+            "finished_at": time.time(),
+        }
+        entry.update(extra)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        return entry
+
+def load_manifest(path):
+    """Read a manifest file, ignoring a trailing partial line from an interrupted write"""
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+    return entries
+
+def merge_manifests(output_dir, expected_urls=None, providers=None):
+    """
+    Combine every shard manifest under output_dir into a single index.
+
+    The latest entry wins for each (video_id, provider) pair. If expected_urls is
+    given, any expected video that has no successful entry for each provider is
+    reported as a gap. Returns a dict with "entries", "gaps" and "manifests".
+    """
+    paths = sorted(glob.glob(os.path.join(output_dir, MANIFEST_DIR, "*.jsonl")))
+    latest = {}
+    for path in paths:
+        for entry in load_manifest(path):
+            key = (entry["video_id"], entry["provider"])
+            if key not in latest or entry.get("finished_at", 0) >= latest[key].get("finished_at", 0):
+                latest[key] = entry
+
+    gaps = []
+    if expected_urls is not None:
+        seen_providers = providers or sorted({provider for _, provider in latest}) or ["openai"]
+        for url in dict.fromkeys(expected_urls):
+            video_id = shard_key(url)
+            for provider in seen_providers:
+                entry = latest.get((video_id, provider))
+                if entry is None or entry["status"] != "done":
+                    gaps.append({
+                        "video_id": video_id,
+                        "url": url,
+                        "provider": provider,
+                        "status": entry["status"] if entry else "missing",
+                        "error": entry.get("error") if entry else None,
+                    })
+
+    entries = sorted(latest.values(), key=lambda e: (e["video_id"], e["provider"]))
+    return {"entries": entries, "gaps": gaps, "manifests": paths}
+
+def write_index(output_dir, merged):
+    """Write index.json and index.html for a merged result set; returns both paths"""
+    json_path = os.path.join(output_dir, "index.json")
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+
+    rows = []
+    for entry in merged["entries"]:
+        label = html.escape(entry.get("title") or entry["video_id"])
+        if entry["status"] == "done" and entry.get("output_file"):
+            link = html.escape(os.path.relpath(entry["output_file"], output_dir))
+            label = f'<a href="{link}">{label}</a>'
+        rows.append(
+            f"      <tr><td>{label}</td><td>{html.escape(entry['provider'])}</td>"
+            f"<td>{html.escape(entry['status'])}</td></tr>"
+        )
+    html_path = os.path.join(output_dir, "index.html")
+    with open(html_path, "w", encoding="utf-8") as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8" />
+  <title>Youtube Made Simple - Index</title>
+</head>
+<body>
+  <h1>{len(merged['entries'])} summaries, {len(merged['gaps'])} gaps</h1>
+  <table>
+    <thead><tr><th>Video</th><th>Provider</th><th>Status</th></tr></thead>
+    <tbody>
+{chr(10).join(rows)}
+    </tbody>
+  </table>
+</body>
+</html>""")
+    return json_path, html_path
@@ -1,7 +1,14 @@
 import os
-import time
+import hashlib
 import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from typing import Optional
+from utils.key_pool import get_key_pool, load_keys
+from utils.fitting import check_prompt, is_context_length_error, context_length_error
+from utils.deadline import check_deadline, bounded_timeout, retry_allowed, sleep_before_retry
+from utils.usage import record_call, record_prepared
 
 # Load environment variables from .env file
 try:
@@ -11,63 +18,331 @@ except ImportError:
     # dotenv is optional, continue without it
     pass
 
+# Provider SDKs are imported on first use; both take close to a second to import
+OpenAI = None
+genai = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Provider selected for the current run. Long-running processes (worker, server)
+# set this per job instead of mutating LLM_PROVIDER in the process environment.
+_provider_override: ContextVar[Optional[str]] = ContextVar("llm_provider_override", default=None)
+
+# Model tier for the current call: None is the task's regular model, "fast" its
+# cheaper first-pass model when a cascade is running (see utils/cascade.py)
+_tier_override: ContextVar[Optional[str]] = ContextVar("llm_tier_override", default=None)
+TIERS = ("fast",)
+
+# Responses prepared ahead of time (by a provider batch job), keyed by prompt_key();
+# call_llm answers from these and only calls the provider for prompts not in them
+_prepared_responses: ContextVar[Optional[dict]] = ContextVar("llm_prepared_responses", default=None)
+
+# Providers call_llm can route to. "compatible" is any OpenAI-compatible endpoint
+# (vLLM, llama.cpp server, an internal gateway) at COMPATIBLE_BASE_URL.
+PROVIDERS = ("openai", "gemini", "compatible")
+
+# Timeouts and concurrency for the compatible endpoint. Local CPU inference is
+# slow, so the read timeout is generous; the concurrency cap keeps a small box
+# from being flooded while its keep-alive connections are reused.
+COMPATIBLE_CONNECT_TIMEOUT = float(os.getenv("COMPATIBLE_CONNECT_TIMEOUT", "5"))
+COMPATIBLE_READ_TIMEOUT = float(os.getenv("COMPATIBLE_READ_TIMEOUT", "300"))
+COMPATIBLE_MAX_CONCURRENCY = int(os.getenv("COMPATIBLE_MAX_CONCURRENCY", "4"))
+_compatible_slots = threading.BoundedSemaphore(max(COMPATIBLE_MAX_CONCURRENCY, 1))
+
+# Clients are reused across calls so resident processes keep their connection pools warm
+_client_cache = {}
+_client_cache_lock = threading.Lock()
+
+# (SDK module, key) genai.configure() was last called with
+_gemini_configured = None
+_gemini_configure_lock = threading.Lock()
+
+def get_current_provider() -> str:
+    """Return the active LLM provider: the per-run override if set, otherwise LLM_PROVIDER."""
+    return (_provider_override.get() or os.getenv("LLM_PROVIDER", "openai")).lower()
+
+def get_provider_for_task(task: str = None, default: Optional[str] = None) -> str:
+    """
+    Return the provider for a task: {TASK}_PROVIDER if set (e.g. SIMPLIFICATION_PROVIDER=compatible
+    sends bulk simplification to a local endpoint), otherwise default or the active provider.
+    """
+    routed = os.getenv(f"{task.upper()}_PROVIDER") if task else None
+    if routed and routed.strip():
+        return routed.strip().lower()
+    return default.lower() if default else get_current_provider()
+
+@contextmanager
+def use_provider(provider: Optional[str]):
+    """Select the LLM provider for calls made inside this block (and tasks spawned from it)."""
+    token = _provider_override.set(provider.lower() if provider else None)
+    try:
+        yield
+    finally:
+        _provider_override.reset(token)
+
+@contextmanager
+def use_tier(tier: Optional[str]):
+    """Select the model tier ("fast", or None for the regular model) for calls made inside this block."""
+    if tier is not None and tier not in TIERS:
+        raise ValueError(f"Unknown model tier: {tier}. Supported tiers: {', '.join(TIERS)}")
+    token = _tier_override.set(tier)
+    try:
+        yield
+    finally:
+        _tier_override.reset(token)
+
+def prompt_key(prompt: str) -> str:
+    """Stable key identifying a prompt's response."""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+@contextmanager
+def use_responses(responses: Optional[dict]):
+    """Answer calls made inside this block from responses ({prompt_key: text}) when they have the prompt."""
+    token = _prepared_responses.set(responses)
+    try:
+        yield
+    finally:
+        _prepared_responses.reset(token)
+
+def _load_openai():
+    """Import the OpenAI SDK on first use."""
+    global OpenAI
+    if OpenAI is None:
+        try:
+            from openai import OpenAI as _OpenAI
+        except ImportError:
+            raise ImportError("OpenAI package is required. Install it with: pip install openai")
+        OpenAI = _OpenAI
+    return OpenAI
+
+def _load_genai():
+    """Import the Google Generative AI SDK on first use."""
+    global genai
+    if genai is None:
+        try:
+            import google.generativeai as _genai
+        except ImportError:
+            raise ImportError("Google Generative AI package is required. Install it with: pip install google-generativeai")
+        genai = _genai
+    return genai
+
+def _get_openai_client(api_key: str):
+    """Return a cached OpenAI client for the given API key."""
+    _load_openai()
+    cache_key = (OpenAI, api_key)
+    with _client_cache_lock:
+        client = _client_cache.get(cache_key)
+        if client is None:
+            client = OpenAI(api_key=api_key)
+            _client_cache[cache_key] = client
+    return client
+
+def _get_compatible_client(base_url: str, api_key: str):
+    """Return a cached OpenAI client for an OpenAI-compatible endpoint."""
+    _load_openai()
+    cache_key = (OpenAI, base_url, api_key)
+    with _client_cache_lock:
+        client = _client_cache.get(cache_key)
+        if client is None:
+            from openai import Timeout
+            # call_llm_compatible does the retrying, so the SDK doesn't multiply it
+            client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0,
+                            timeout=Timeout(COMPATIBLE_READ_TIMEOUT, connect=COMPATIBLE_CONNECT_TIMEOUT))
+            _client_cache[cache_key] = client
+    return client
+
+def _get_gemini_client(api_key: str):
+    """
+    Return a cached Gemini generative service client for the given API key.
+
+    The service client takes its key in client_options, so pooled keys don't
+    go through genai.configure(), which sets one key for the whole process.
+    """
+    from google.ai import generativelanguage as glm
+    cache_key = ("gemini", api_key)
+    with _client_cache_lock:
+        client = _client_cache.get(cache_key)
+        if client is None:
+            client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+            _client_cache[cache_key] = client
+    return client
+
+def get_openai_sdk_client(provider: str):
+    """
+    Return the cached OpenAI SDK client for provider ("openai" or "compatible"),
+    for APIs beyond chat completions such as files and batches.
+    
+    OpenAI uses the first key of its pool, since batch files belong to one key's project.
+    """
+    validate_provider_config(provider)
+    if provider == "openai":
+        return _get_openai_client(load_keys("openai")[0])
+    if provider == "compatible":
+        return _get_compatible_client(os.getenv("COMPATIBLE_BASE_URL"), os.getenv("COMPATIBLE_API_KEY") or "none")
+    raise ValueError(f"Provider {provider} has no OpenAI SDK client")
+
+def reset_clients() -> None:
+    """Drop all cached LLM clients (e.g. after rotating API keys)."""
+    global _gemini_configured
+    with _client_cache_lock:
+        _client_cache.clear()
+    with _gemini_configure_lock:
+        _gemini_configured = None
+
 def validate_provider_config(provider: str) -> None:
     """Validate that the required configuration is available for the specified provider."""
     if provider == "openai":
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key or api_key == "your_openai_api_key_here":
-            raise ValueError("OpenAI API key is required. Please set OPENAI_API_KEY in your .env file.")
+        if not load_keys("openai"):
+            raise ValueError("OpenAI API key is required. Please set OPENAI_API_KEY (or a comma-separated "
+                             "OPENAI_API_KEYS pool) in your .env file.")
     
     elif provider == "gemini":
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key or api_key == "your_gemini_api_key_here":
-            raise ValueError("Gemini API key is required. Please set GEMINI_API_KEY in your .env file.")
+        if not load_keys("gemini"):
+            raise ValueError("Gemini API key is required. Please set GEMINI_API_KEY (or a comma-separated "
+                             "GEMINI_API_KEYS pool) in your .env file.")
+    
+    elif provider == "compatible":
+        if not os.getenv("COMPATIBLE_BASE_URL"):
+            raise ValueError("Compatible endpoint URL is required. Please set COMPATIBLE_BASE_URL "
+                             "(e.g. http://localhost:8000/v1) in your .env file.")
     
     else:
-        raise ValueError(f"Unsupported provider: {provider}. Supported providers: openai, gemini")
+        raise ValueError(f"Unsupported provider: {provider}. Supported providers: {', '.join(PROVIDERS)}")
 
 def call_llm_openai(prompt: str, model: str = None, max_retries: int = 3) -> str:
-    """Call OpenAI's API with retry logic."""
-    try:
-        from openai import OpenAI
-    except ImportError:
-        raise ImportError("OpenAI package is required. Install it with: pip install openai")
+    """Call OpenAI's API with retry logic, rotating through the key pool."""
+    pool = get_key_pool("openai")
     
-    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    for attempt in range(max_retries):
+        # Under a run deadline, the request may take no longer than the time left
+        timeout = bounded_timeout()
+        with pool.acquire() as api_key:
+            try:
+                client = _get_openai_client(api_key)
+                if model is None:
+                    model = os.getenv("OPENAI_MODEL", "gpt-4o")
+                
+                # All models: let them use their defaults
+                # Note: o3 models don't support temperature, but OpenAI handles this gracefully
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    # No parameters set - let models use their optimal defaults
+                    **({"timeout": timeout} if timeout is not None else {})
+                )
+                tokens = getattr(getattr(response, "usage", None), "total_tokens", None)
+                pool.report_ok(api_key, tokens)
+                record_call("openai", model, tokens)
+                return response.choices[0].message.content
+            
+            except Exception as e:
+                # Auth and quota errors bench this key, so the retry goes to another one
+                pool.report_error(api_key, e)
+                if is_context_length_error(e):
+                    # The same prompt would be rejected again
+                    raise context_length_error(prompt, model, e) from e
+                error = e
+        
+        logger.warning(f"OpenAI API call failed (attempt {attempt + 1}/{max_retries}): {error}")
+        # Exponential backoff, unless the run's deadline leaves no time for another attempt
+        if attempt < max_retries - 1 and retry_allowed(2 ** attempt):
+            sleep_before_retry(2 ** attempt)
+        else:
+            raise error
+
+def call_llm_compatible(prompt: str, model: str = None, max_retries: int = 3) -> str:
+    """Call an OpenAI-compatible endpoint (COMPATIBLE_BASE_URL) with retry logic."""
+    # Local servers usually ignore the key, but the SDK insists on one
+    client = _get_compatible_client(os.getenv("COMPATIBLE_BASE_URL"), os.getenv("COMPATIBLE_API_KEY") or "none")
+    if model is None:
+        model = os.getenv("COMPATIBLE_MODEL", "default")
     
     for attempt in range(max_retries):
+        timeout = bounded_timeout(COMPATIBLE_READ_TIMEOUT)
         try:
-            if model is None:
-                model = os.getenv("OPENAI_MODEL", "gpt-4o")
-            
-            # All models: let them use their defaults
-            # Note: o3 models don't support temperature, but OpenAI handles this gracefully
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}]
-                # No parameters set - let models use their optimal defaults
-            )
+            with _compatible_slots:
+                response = client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    **({"timeout": timeout} if timeout != COMPATIBLE_READ_TIMEOUT else {})
+                )
+            record_call("compatible", model, getattr(getattr(response, "usage", None), "total_tokens", None))
             return response.choices[0].message.content
         
         except Exception as e:
-            logger.warning(f"OpenAI API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
+            if is_context_length_error(e):
+                # The same prompt would be rejected again
+                raise context_length_error(prompt, model, e) from e
+            logger.warning(f"Compatible endpoint call failed (attempt {attempt + 1}/{max_retries}): {e}")
+            if attempt < max_retries - 1 and retry_allowed(2 ** attempt):
+                sleep_before_retry(2 ** attempt)  # Exponential backoff
             else:
                 raise
 
+def _gemini_text(response) -> str:
+    """The text of a Gemini response, raising if it was blocked or empty."""
+    # Check if response was blocked by safety filters
+    if response.candidates and len(response.candidates) > 0:
+        candidate = response.candidates[0]
+        if hasattr(candidate, 'finish_reason') and candidate.finish_reason != 1:  # 1 = STOP (normal completion)
+            # Handle different finish reasons
+            finish_reasons = {
+                2: "MAX_TOKENS",
+                3: "SAFETY", 
+                4: "RECITATION",
+                5: "OTHER"
+            }
+            reason = finish_reasons.get(candidate.finish_reason, f"UNKNOWN({candidate.finish_reason})")
+            logger.warning(f"Gemini response blocked/incomplete. Finish reason: {reason}")
+
+            if candidate.finish_reason == 3:  # SAFETY
+                raise Exception("Content was blocked by safety filters. Try rephrasing your prompt.")
+            elif candidate.finish_reason == 2:  # MAX_TOKENS
+                # Try to get partial response
+                if hasattr(candidate.content, 'parts') and candidate.content.parts:
+                    return candidate.content.parts[0].text
+                else:
+                    raise Exception("Response was truncated due to max tokens limit.")
+
+        # Get the text response
+        if hasattr(response, 'text') and response.text:
+            return response.text
+        elif response.candidates and response.candidates[0].content.parts:
+            return response.candidates[0].content.parts[0].text
+        else:
+            raise Exception("No valid response text returned from Gemini API.")
+    else:
+        raise Exception("No candidates returned from Gemini API.")
+
+def _configure_gemini(api_key: str) -> None:
+    """Point the process-wide genai configuration at api_key, once per key change."""
+    global _gemini_configured
+    with _gemini_configure_lock:
+        if _gemini_configured != (genai, api_key):
+            genai.configure(api_key=api_key)
+            _gemini_configured = (genai, api_key)
+
+def _gemini_request(model: str, prompt: str, safety_settings: list):
+    """A GenerateContentRequest for a per-key service client."""
+    from google.ai import generativelanguage as glm
+    return glm.GenerateContentRequest(
+        model=model if model.startswith("models/") else f"models/{model}",
+        contents=[glm.Content(role="user", parts=[glm.Part(text=prompt)])],
+        safety_settings=[glm.SafetySetting(**setting) for setting in safety_settings],
+    )
+
 def call_llm_gemini(prompt: str, model: str = None, max_retries: int = 3) -> str:
-    """Call Google Gemini's API with retry logic."""
-    try:
-        import google.generativeai as genai
-    except ImportError:
-        raise ImportError("Google Generative AI package is required. Install it with: pip install google-generativeai")
+    """Call Google Gemini's API with retry logic, rotating through the key pool."""
+    _load_genai()
+    pool = get_key_pool("gemini")
     
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    # A single key uses the SDK's process-wide configuration, set only when the key changes
+    # (not on every call, while other threads are mid-request); pooled keys get a service client each
+    pooled = len(pool) > 1
+    if not pooled:
+        _configure_gemini(pool.keys[0])
     if model is None:
         model = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
     
@@ -79,59 +354,59 @@ def call_llm_gemini(prompt: str, model: str = None, max_retries: int = 3) -> str
         {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_ONLY_HIGH"},
     ]
     
-    genai_model = genai.GenerativeModel(model)
+    genai_model = None if pooled else genai.GenerativeModel(model)
     
     for attempt in range(max_retries):
-        try:
-            response = genai_model.generate_content(
-                prompt,
-                safety_settings=safety_settings
-            )
-            
-            # Check if response was blocked by safety filters
-            if response.candidates and len(response.candidates) > 0:
-                candidate = response.candidates[0]
-                if hasattr(candidate, 'finish_reason') and candidate.finish_reason != 1:  # 1 = STOP (normal completion)
-                    # Handle different finish reasons
-                    finish_reasons = {
-                        2: "MAX_TOKENS",
-                        3: "SAFETY", 
-                        4: "RECITATION",
-                        5: "OTHER"
-                    }
-                    reason = finish_reasons.get(candidate.finish_reason, f"UNKNOWN({candidate.finish_reason})")
-                    logger.warning(f"Gemini response blocked/incomplete. Finish reason: {reason}")
-                    
-                    if candidate.finish_reason == 3:  # SAFETY
-                        raise Exception("Content was blocked by safety filters. Try rephrasing your prompt.")
-                    elif candidate.finish_reason == 2:  # MAX_TOKENS
-                        # Try to get partial response
-                        if hasattr(candidate.content, 'parts') and candidate.content.parts:
-                            return candidate.content.parts[0].text
-                        else:
-                            raise Exception("Response was truncated due to max tokens limit.")
-                
-                # Get the text response
-                if hasattr(response, 'text') and response.text:
-                    return response.text
-                elif response.candidates and response.candidates[0].content.parts:
-                    return response.candidates[0].content.parts[0].text
+        timeout = bounded_timeout()
+        with pool.acquire() as api_key:
+            try:
+                if pooled:
+                    # This loop does the retrying, so the service client doesn't multiply it
+                    response = _get_gemini_client(api_key).generate_content(
+                        request=_gemini_request(model, prompt, safety_settings), retry=None,
+                        **({"timeout": timeout} if timeout is not None else {})
+                    )
                 else:
-                    raise Exception("No valid response text returned from Gemini API.")
-            else:
-                raise Exception("No candidates returned from Gemini API.")
+                    response = genai_model.generate_content(
+                        prompt,
+                        safety_settings=safety_settings,
+                        **({"request_options": {"timeout": timeout}} if timeout is not None else {})
+                    )
+                text = _gemini_text(response)
+                tokens = getattr(getattr(response, "usage_metadata", None), "total_token_count", None)
+                pool.report_ok(api_key, tokens)
+                record_call("gemini", model, tokens)
+                return text
+            
+            except Exception as e:
+                pool.report_error(api_key, e)
+                if is_context_length_error(e):
+                    # The same prompt would be rejected again
+                    raise context_length_error(prompt, model, e) from e
+                error = e
         
-        except Exception as e:
-            logger.warning(f"Gemini API call failed (attempt {attempt + 1}/{max_retries}): {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)  # Exponential backoff
-            else:
-                raise
+        logger.warning(f"Gemini API call failed (attempt {attempt + 1}/{max_retries}): {error}")
+        if attempt < max_retries - 1 and retry_allowed(2 ** attempt):
+            sleep_before_retry(2 ** attempt)  # Exponential backoff
+        else:
+            raise error
 
-def get_model_for_task(provider: str, task: str = None) -> str:
-    """Get the appropriate model for a given provider and task type."""
+def get_model_for_task(provider: str, task: str = None, tier: str = None) -> str:
+    """
+    Get the appropriate model for a given provider and task type.
+    
+    With tier="fast", the cheap first-pass model of a cascade:
+    {PROVIDER}_FAST_{TASK}_MODEL, then {PROVIDER}_FAST_MODEL, then a built-in default.
+    """
     provider = provider.lower()
     
+    if tier == "fast" and provider in PROVIDERS:
+        prefix = provider.upper()
+        # A compatible endpoint has no known cheaper model; without one the cascade is skipped
+        default = {"openai": "gpt-4o-mini", "gemini": "gemini-1.5-flash"}.get(provider) or get_model_for_task(provider, task)
+        fast_model = os.getenv(f"{prefix}_FAST_MODEL", default)
+        return os.getenv(f"{prefix}_FAST_{task.upper()}_MODEL", fast_model) if task else fast_model
+    
     if task:
         task = task.upper()
         if provider == "openai":
@@ -144,18 +419,26 @@ def get_model_for_task(provider: str, task: str = None) -> str:
                 return os.getenv("GEMINI_ANALYSIS_MODEL", os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
             elif task == "SIMPLIFICATION":
                 return os.getenv("GEMINI_SIMPLIFICATION_MODEL", os.getenv("GEMINI_MODEL", "gemini-1.5-flash"))
+        elif provider == "compatible":
+            if task == "ANALYSIS":
+                return os.getenv("COMPATIBLE_ANALYSIS_MODEL", os.getenv("COMPATIBLE_MODEL", "default"))
+            elif task == "SIMPLIFICATION":
+                return os.getenv("COMPATIBLE_SIMPLIFICATION_MODEL", os.getenv("COMPATIBLE_MODEL", "default"))
     
     # Fallback to general model
     if provider == "openai":
         return os.getenv("OPENAI_MODEL", "gpt-4o")
     elif provider == "gemini":
         return os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    elif provider == "compatible":
+        return os.getenv("COMPATIBLE_MODEL", "default")
     
     raise ValueError(f"Unsupported provider: {provider}")
 
 def call_llm(prompt: str, task: str = None) -> str:
     """
-    Call the configured LLM provider based on the LLM_PROVIDER environment variable.
+    Call the configured LLM provider based on the LLM_PROVIDER environment variable
+    (or the provider selected with use_provider(), or the task's {TASK}_PROVIDER).
     
     Args:
         prompt: The prompt to send to the LLM
@@ -166,23 +449,42 @@ def call_llm(prompt: str, task: str = None) -> str:
         
     Raises:
         ValueError: If the provider is not supported or configuration is missing
+        PromptTooLargeError: If the prompt fits neither the model nor the provider's long-context model
         ImportError: If required packages are not installed
+        DeadlineExceeded: If the run's deadline (see utils.deadline) passed or the run was cancelled
     """
-    provider = os.getenv("LLM_PROVIDER", "openai").lower()
+    check_deadline()
+    
+    prepared = _prepared_responses.get()
+    if prepared is not None:
+        response = prepared.get(prompt_key(prompt))
+        if response is not None:
+            record_prepared()
+            return response
+        logger.info(f"No prepared response for this {task or 'general'} prompt; calling the provider")
+    
+    provider = get_provider_for_task(task)
     
     # Validate configuration
     validate_provider_config(provider)
     
-    # Get the appropriate model for this task
-    model = get_model_for_task(provider, task)
+    # Get the appropriate model for this task (and tier, inside use_tier)
+    tier = _tier_override.get()
+    model = get_model_for_task(provider, task, tier)
+    
+    # Prompts over the model's context go to a longer-context model, or fail here without a request
+    model = check_prompt(prompt, provider, model)
     
-    logger.info(f"Using LLM provider: {provider}, model: {model}, task: {task or 'general'}")
+    logger.info(f"Using LLM provider: {provider}, model: {model}, task: {task or 'general'}"
+                + (f", tier: {tier}" if tier else ""))
     
     try:
         if provider == "openai":
             return call_llm_openai(prompt, model=model)
         elif provider == "gemini":
             return call_llm_gemini(prompt, model=model)
+        elif provider == "compatible":
+            return call_llm_compatible(prompt, model=model)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
             
@@ -222,7 +524,7 @@ def test_all_providers() -> None:
     print("Testing LLM providers...")
     print("=" * 50)
     
-    providers = ["openai", "gemini"]
+    providers = list(PROVIDERS)
     results = {}
     
     for provider in providers:
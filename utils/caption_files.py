@@ -0,0 +1,119 @@
+import html
+import json
+import os
+import re
+from utils.transcript import Transcript
+
+CAPTION_EXTENSIONS = (".srt", ".vtt", ".json")
+
+# "00:01:02,500 --> 00:01:05,000" (SRT) or "01:02.500 --> 01:05.000 align:start" (WebVTT)
+_TIMING = re.compile(r"((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})\s*-->\s*((?:\d+:)?\d{1,2}:\d{2}[,.]\d{1,3})")
+# Inline markup: <c>, <i>, <v Speaker>, karaoke timestamps <00:00:01.500>
+_TAG = re.compile(r"<[^>]*>")
+# yt-dlp names files "Title [VIDEO_ID].en.vtt"
+_YT_DLP_NAME = re.compile(r"^(?P<title>.*?)\s*\[(?P<id>[0-9A-Za-z_-]{11})\]$")
+
+def _parse_timestamp(timestamp):
+    """Seconds from HH:MM:SS,mmm / MM:SS.mmm"""
+    parts = timestamp.replace(",", ".").split(":")
+    seconds = 0.0
+    for part in parts:
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+def iter_cues(lines):
+    """
+    Yield {"text", "start", "duration"} entries from SRT or WebVTT lines.
+
+    Works line by line, so a file is never held in memory in full. Cue numbers,
+    the WEBVTT header, NOTE/STYLE blocks and inline markup are skipped.
+    """
+    start = end = None
+    text_lines = []
+    for line in lines:
+        line = line.strip()
+        timing = _TIMING.search(line) if "-->" in line else None
+        if timing:
+            start, end = _parse_timestamp(timing.group(1)), _parse_timestamp(timing.group(2))
+            text_lines = []
+        elif not line:
+            if start is not None and text_lines:
+                yield {"text": " ".join(text_lines), "start": start, "duration": max(end - start, 0.0)}
+            start = None
+            text_lines = []
+        elif start is not None:
+            text = html.unescape(_TAG.sub("", line)).strip()
+            if text:
+                text_lines.append(text)
+    if start is not None and text_lines:
+        yield {"text": " ".join(text_lines), "start": start, "duration": max(end - start, 0.0)}
+
+def _json_entries(data):
+    """Entries from youtube-transcript-api JSON, our own export, or YouTube json3 (yt-dlp)"""
+    if isinstance(data, dict) and "events" in data:
+        for event in data["events"]:
+            text = "".join(seg.get("utf8", "") for seg in event.get("segs", [])).strip()
+            if text:
+                yield {"text": text, "start": event.get("tStartMs", 0) / 1000,
+                       "duration": event.get("dDurationMs", 0) / 1000}
+        return
+    if isinstance(data, dict):
+        data = data.get("segments") or data.get("transcript") or []
+    for entry in data:
+        yield {"text": entry["text"], "start": entry.get("start", 0.0), "duration": entry.get("duration", 0.0)}
+
+def _describe(path):
+    """Title and video ID from a file name, understanding yt-dlp's "Title [ID].lang.ext" naming"""
+    stem = os.path.basename(path)
+    stem = stem[:stem.rfind(".")] if "." in stem else stem
+    match = _YT_DLP_NAME.match(stem) or _YT_DLP_NAME.match(stem.rsplit(".", 1)[0])
+    if match:
+        return match.group("title") or match.group("id"), match.group("id")
+    return stem, None
+
+def load_transcript_file(path):
+    """
+    Read a local .srt, .vtt or .json caption file into the same video_info shape
+    that get_video_info returns, timestamps included.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in CAPTION_EXTENSIONS:
+        return {"error": f"Unsupported transcript file type: {path}", "permanent": True}
+    title, video_id = _describe(path)
+    extra = {}
+    try:
+        if extension == ".json":
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                title = data.get("title") or title
+                video_id = data.get("video_id") or video_id
+                # Chapter markers, if the export has them
+                extra = {key: data[key] for key in ("description", "chapters") if data.get(key)}
+            segments = Transcript.from_entries(_json_entries(data))
+        else:
+            with open(path, encoding="utf-8-sig") as f:
+                segments = Transcript.from_entries(iter_cues(f))
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return {"error": f"Could not read {path}: {e}", "permanent": True}
+    if not len(segments):
+        return {"error": f"No captions found in {path}", "permanent": True}
+
+    return {
+        "title": title,
+        "transcript": segments.text,
+        "segments": segments,
+        "thumbnail_url": f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg" if video_id else "",
+        "video_id": video_id or title,
+        "source_file": path,
+        **extra,
+    }
+
+def find_transcript_files(path):
+    """The caption files at path: the file itself, or every caption file under a directory, sorted"""
+    if not os.path.isdir(path):
+        return [path]
+    found = []
+    for root, _, files in os.walk(path):
+        found.extend(os.path.join(root, name) for name in files if name.lower().endswith(CAPTION_EXTENSIONS))
+    return sorted(found)
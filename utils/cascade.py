@@ -0,0 +1,153 @@
+import os
+import re
+import logging
+from html.parser import HTMLParser
+from utils.call_llm import use_tier, get_provider_for_task, get_model_for_task
+
+logger = logging.getLogger(__name__)
+
+# Defaults for the model cascade; callers can override any of them per run
+DEFAULT_OPTIONS = {
+    # Run tasks on the fast model first and escalate only the items whose
+    # output fails local validation
+    "enabled": os.getenv("LLM_CASCADE", "off").strip().lower() in ("1", "true", "yes", "on"),
+    # Tasks that cascade; the others always use their regular model
+    "tasks": [t.strip().lower() for t in os.getenv("CASCADE_TASKS", "analysis,simplification").split(",") if t.strip()],
+    # Answers shorter or longer than this (in characters, without tags) are escalated
+    "min_answer_chars": int(os.getenv("CASCADE_MIN_ANSWER_CHARS", "40")),
+    "max_answer_chars": int(os.getenv("CASCADE_MAX_ANSWER_CHARS", "4000")),
+}
+TASKS = ("analysis", "simplification")
+
+# Tags the answering prompt asks for; anything else is a sign of a confused response
+ALLOWED_TAGS = {"b", "i", "em", "strong", "ol", "ul", "li", "p", "br", "code"}
+VOID_TAGS = {"br"}
+
+_TAG = re.compile(r"<[^>]*>")
+
+def cascade_options(overrides=None):
+    """DEFAULT_OPTIONS updated with any non-None overrides"""
+    options = dict(DEFAULT_OPTIONS)
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    unknown = [task for task in options["tasks"] if task not in TASKS]
+    if unknown:
+        raise ValueError(f"Unknown cascade task '{unknown[0]}'; use {', '.join(TASKS)}")
+    return options
+
+def cascade_active(task, options):
+    """Whether task cascades: enabled for it, and its fast model differs from its regular one"""
+    if not options["enabled"] or task not in options["tasks"]:
+        return False
+    provider = get_provider_for_task(task)
+    return get_model_for_task(provider, task, "fast") != get_model_for_task(provider, task)
+
+class _TagChecker(HTMLParser):
+    """Collects unexpected and unbalanced tags"""
+    def __init__(self):
+        super().__init__()
+        self.open_tags = []
+        self.problems = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in ALLOWED_TAGS:
+            self.problems.append(f"unexpected <{tag}>")
+        elif tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_endtag(self, tag):
+        # Unexpected tags were reported when they opened
+        if tag in VOID_TAGS or tag not in ALLOWED_TAGS:
+            return
+        if tag not in self.open_tags:
+            self.problems.append(f"stray </{tag}>")
+            return
+        # Tags closed out of order are unbalanced
+        while self.open_tags:
+            last = self.open_tags.pop()
+            if last == tag:
+                break
+            self.problems.append(f"unclosed <{last}>")
+
+def check_html(text):
+    """Problems with the tags in an answer: tags the prompt doesn't use, and unbalanced ones"""
+    checker = _TagChecker()
+    checker.feed(text)
+    checker.close()
+    return checker.problems + [f"unclosed <{tag}>" for tag in checker.open_tags]
+
+def validate_answered_topic(topic, result, options):
+    """
+    Problems with result, the answers to topic's questions.
+
+    Checks that every question came back (by ID, or wording if the ID was
+    dropped) with a rephrasing and an answer, that answers are neither stubs
+    nor runaways, and that their HTML is sane.
+    """
+    problems = []
+    if not (result.rephrased_title or "").strip():
+        problems.append("no rephrased title")
+    answered_ids = {q.id for q in result.questions}
+    answered_texts = {q.original.strip() for q in result.questions}
+    missing = [q.id for q in topic.questions if q.id not in answered_ids and q.original.strip() not in answered_texts]
+    if missing:
+        problems.append(f"questions {', '.join(missing)} not answered")
+    for q in result.questions:
+        if not (q.rephrased or "").strip() or not (q.answer or "").strip():
+            problems.append(f"question {q.id} incomplete")
+            continue
+        length = len(_TAG.sub("", q.answer).strip())
+        if length < options["min_answer_chars"]:
+            problems.append(f"answer to {q.id} too short ({length} chars)")
+        elif length > options["max_answer_chars"]:
+            problems.append(f"answer to {q.id} too long ({length} chars)")
+        problems.extend(f"answer to {q.id}: {problem}" for problem in check_html(q.answer))
+    return problems
+
+def validate_extracted_topics(topics, options):
+    """Problems with extracted topics: none at all, or topics without a title or questions"""
+    if not topics:
+        return ["no topics"]
+    problems = []
+    for topic in topics:
+        if not isinstance(topic.title, str) or not topic.title.strip():
+            problems.append(f"topic {topic.id} has no title")
+        questions = [q for q in topic.questions if isinstance(q.original, str) and q.original.strip()]
+        if not questions or len(questions) != len(topic.questions):
+            problems.append(f"topic {topic.id} has missing or empty questions")
+    return problems
+
+def run_cascade(task, items, run, validate, options):
+    """
+    Run items on task's fast model and rerun only the failures on its regular model.
+
+    run(items) returns one result per item; validate(item, result, options)
+    returns a list of problems, and any problem escalates the item. A fast
+    attempt that raises escalates every item. Returns (results, escalated).
+    """
+    try:
+        with use_tier("fast"):
+            results = run(items)
+    except Exception as e:
+        logger.warning(f"Fast {task} call failed ({e}); escalating {len(items)} items")
+        results = [None] * len(items)
+
+    failing = []
+    for i, (item, result) in enumerate(zip(items, results)):
+        problems = ["no result"] if result is None else validate(item, result, options)
+        if problems:
+            logger.info(f"Escalating {task} item {i + 1}: {'; '.join(problems[:3])}")
+            failing.append(i)
+
+    if failing:
+        with use_tier(None):
+            for i, result in zip(failing, run([items[i] for i in failing])):
+                results[i] = result
+    return results, len(failing)
+
+def record_escalations(shared, task, items, escalated):
+    """Add a node's counts to shared["cascade_stats"][task] and return that task's stats"""
+    stats = shared.setdefault("cascade_stats", {}).setdefault(task, {"items": 0, "escalated": 0, "rate": 0.0})
+    stats["items"] += items
+    stats["escalated"] += escalated
+    stats["rate"] = round(stats["escalated"] / stats["items"], 3) if stats["items"] else 0.0
+    return stats
@@ -0,0 +1,139 @@
+import math
+import os
+import re
+from collections import Counter
+from utils.transcript import Transcript
+
+# Target chapter lengths for transcripts without chapter markers
+CHAPTER_TARGET_SECONDS = float(os.getenv("CHAPTER_TARGET_SECONDS", "600"))
+CHAPTER_MIN_SECONDS = float(os.getenv("CHAPTER_MIN_SECONDS", "180"))
+CHAPTER_MAX_SECONDS = float(os.getenv("CHAPTER_MAX_SECONDS", "1200"))
+# Size of the blocks compared when looking for topic shifts
+BLOCK_SECONDS = 60
+
+# "0:00 Intro", "12:34 - Setup", "1:02:03 Q&A" at the start of a description line
+_MARKER = re.compile(r"^\s*[\[(]?((?:\d+:)?\d{1,2}:\d{2})[\])]?\s*[-–—:|]?\s*(.+?)\s*$")
+_WORD = re.compile(r"[a-z']{4,}")
+_STOP_WORDS = frozenset("""
+that this with have from they what there their about would which when were your will just like know
+been than then them also into some could more other very because really going thing things actually
+right yeah okay well here where these those only over even want think people make made much many
+""".split())
+
+def _parse_timestamp(timestamp):
+    seconds = 0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds
+
+def format_timestamp(seconds):
+    """1:02:03 or 2:03, as YouTube shows it"""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+def timestamp_url(video_id, seconds):
+    """Link that opens the video at seconds"""
+    return f"https://www.youtube.com/watch?v={video_id}&t={int(seconds)}s"
+
+def parse_chapter_markers(description):
+    """
+    Chapter (start, title) pairs from a video description.
+
+    Follows YouTube's own rule: at least three timestamps, starting at 0:00,
+    in increasing order. Anything else is not a chapter list.
+    """
+    markers = []
+    for line in (description or "").splitlines():
+        match = _MARKER.match(line)
+        if match:
+            markers.append((_parse_timestamp(match.group(1)), match.group(2)))
+    if len(markers) < 3 or markers[0][0] != 0:
+        return []
+    if any(b[0] <= a[0] for a, b in zip(markers, markers[1:])):
+        return []
+    return markers
+
+def _block_vectors(transcript):
+    blocks = list(transcript.windows(BLOCK_SECONDS))
+    vectors = [Counter(w for w in _WORD.findall(block.text.lower()) if w not in _STOP_WORDS) for block in blocks]
+    return blocks, vectors
+
+def _cosine(a, b):
+    dot = sum(count * b[word] for word, count in a.items() if word in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm if norm else 0.0
+
+def segment_by_topic(transcript, target_seconds=CHAPTER_TARGET_SECONDS,
+                     min_seconds=CHAPTER_MIN_SECONDS, max_seconds=CHAPTER_MAX_SECONDS):
+    """
+    Chapter start times for a transcript without markers.
+
+    The transcript is cut into one-minute blocks, and the vocabulary of each
+    block is compared with the next (a lightweight TextTiling). Cuts go where
+    adjacent blocks share the fewest words, about one per target_seconds,
+    never closer than min_seconds. Chapters still longer than max_seconds are
+    then split at their own weakest gap.
+    """
+    if not len(transcript) or transcript.duration <= max(target_seconds, min_seconds):
+        return [transcript.starts[0]] if len(transcript) else []
+    blocks, vectors = _block_vectors(transcript)
+    # gaps[i] is the boundary at the start of block i + 1
+    gaps = [(_cosine(vectors[i], vectors[i + 1]), blocks[i + 1].starts[0]) for i in range(len(blocks) - 1)]
+    begin = transcript.starts[0]
+    end = transcript.starts[-1] + transcript.durations[-1]
+    cuts = [begin, end]
+
+    def fits(time):
+        return all(abs(time - cut) >= min_seconds for cut in cuts)
+
+    wanted = max(round((end - begin) / target_seconds) - 1, 0)
+    for _, time in sorted(gaps):
+        if len(cuts) - 2 >= wanted:
+            break
+        if fits(time):
+            cuts.append(time)
+    cuts.sort()
+
+    # Enforce the maximum length
+    changed = True
+    while changed:
+        changed = False
+        for left, right in zip(cuts, cuts[1:]):
+            if right - left <= max_seconds:
+                continue
+            inside = [(sim, time) for sim, time in gaps
+                      if left + min_seconds <= time <= right - min_seconds]
+            if inside:
+                cuts.append(min(inside)[1])
+                cuts.sort()
+                changed = True
+                break
+    return cuts[:-1]
+
+def build_chapters(video_info):
+    """
+    Split a video into chapters: {"title", "start", "end", "transcript"} dicts.
+
+    Uses chapter markers when the video has them (video_info["chapters"], or
+    timestamps in video_info["description"]); otherwise finds topic shifts in
+    the transcript. Titles are None for chapters found by segmentation.
+    """
+    segments = video_info.get("segments")
+    if not isinstance(segments, Transcript) or not len(segments):
+        transcript = video_info.get("transcript", "")
+        return [{"title": None, "start": 0.0, "end": None, "transcript": transcript}] if transcript else []
+
+    markers = [(float(c.get("start_time", c.get("start", 0))), c.get("title")) for c in video_info.get("chapters") or []]
+    markers = markers or parse_chapter_markers(video_info.get("description"))
+    if not markers:
+        markers = [(start, None) for start in segment_by_topic(segments)]
+
+    end_of_video = segments.starts[-1] + segments.durations[-1]
+    chapters = []
+    for index, (start, title) in enumerate(markers):
+        end = markers[index + 1][0] if index + 1 < len(markers) else end_of_video + 1
+        text = segments.slice_time(start if index else 0.0, end).text
+        if text:
+            chapters.append({"title": title, "start": start, "end": min(end, end_of_video), "transcript": text})
+    return chapters
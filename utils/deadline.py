@@ -0,0 +1,147 @@
+import math
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# A retry is only attempted if, after waiting for it, at least this much of
+# the run's deadline is left for the attempt itself
+DEADLINE_MIN_ATTEMPT_SECONDS = float(os.getenv("DEADLINE_MIN_ATTEMPT_SECONDS", "5"))
+
+_DURATION = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(s|sec|m|min|h)?\s*$", re.IGNORECASE)
+_UNIT_SECONDS = {None: 1, "s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600}
+
+class DeadlineExceeded(TimeoutError):
+    """The run's deadline passed, or the run was cancelled"""
+
+class Deadline:
+    """
+    Time budget for one run, shared by every call made inside use_deadline().
+
+    HTTP and LLM calls bound their timeouts by remaining(), and retries are
+    skipped when their wait would leave no time for the attempt. cancel()
+    (Ctrl-C, a server shutting down) makes every later check raise and wakes
+    up retry waits at once. seconds=None has no time limit but can still be
+    cancelled. A deadline made inside another one never outlasts it and is
+    cancelled with it.
+
+    Cancelling doesn't abort a request already on the wire: the SDKs and
+    requests give no safe way to interrupt a blocking read from another
+    thread, so such a call runs until it returns or its timeout (already
+    bounded by remaining()) expires, and the run stops at its next check.
+    """
+    def __init__(self, seconds=None, parent=None, clock=time.monotonic):
+        self.seconds = seconds
+        self.parent = parent
+        self._clock = clock
+        self.expires_at = clock() + seconds if seconds is not None else math.inf
+        self._cancelled = threading.Event()
+        self._children = weakref.WeakSet()
+        self.reason = None
+        if parent is not None:
+            parent._children.add(self)
+            if parent.cancelled:
+                self.cancel(parent.reason)
+
+    def remaining(self):
+        """Seconds left (math.inf without a time limit)"""
+        remaining = max(self.expires_at - self._clock(), 0.0)
+        return min(remaining, self.parent.remaining()) if self.parent is not None else remaining
+
+    def cancel(self, reason="cancelled"):
+        """Stop the run: retry waits wake up and later checks raise (requests in flight finish first)"""
+        self.reason = reason
+        self._cancelled.set()
+        for child in list(self._children):
+            child.cancel(reason)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        """Raise DeadlineExceeded if the run was cancelled or is out of time"""
+        if self.cancelled:
+            raise DeadlineExceeded(f"Run {self.reason}")
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(f"Run deadline of {self.seconds:g}s passed" if self.seconds is not None
+                                   else "Run deadline passed")
+
+    def timeout(self, timeout=None):
+        """timeout (seconds or a (connect, read) tuple, None for none) bounded by the time left"""
+        self.check()
+        remaining = self.remaining()
+        if remaining == math.inf:
+            return timeout
+        if timeout is None:
+            return remaining
+        if isinstance(timeout, tuple):
+            return tuple(remaining if t is None else min(t, remaining) for t in timeout)
+        return min(timeout, remaining)
+
+    def allows(self, wait):
+        """Whether waiting wait seconds leaves time for another attempt"""
+        return not self.cancelled and self.remaining() > wait + DEADLINE_MIN_ATTEMPT_SECONDS
+
+    def sleep(self, seconds):
+        """Wait seconds, waking up early (and raising) if the run is cancelled"""
+        self.check()
+        if seconds >= self.remaining():
+            raise DeadlineExceeded(f"Waiting {seconds:g}s would pass the run's deadline")
+        if self._cancelled.wait(seconds):
+            self.check()
+
+_current_deadline: ContextVar = ContextVar("run_deadline", default=None)
+
+def current_deadline():
+    """The Deadline of the current run, or None"""
+    return _current_deadline.get()
+
+@contextmanager
+def use_deadline(deadline):
+    """
+    Run the block under deadline: a Deadline, seconds from now, or None for
+    no deadline. Seconds inside an enclosing deadline never outlast it.
+    Yields the Deadline in effect.
+    """
+    if deadline is not None and not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline, parent=current_deadline())
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def parse_duration(text):
+    """Seconds in a duration such as "180s", "3m", "1.5h" or "90" """
+    match = _DURATION.match(str(text))
+    if not match:
+        raise ValueError(f"Invalid duration '{text}'; use e.g. 180s, 3m or 1h")
+    return float(match.group(1)) * _UNIT_SECONDS[match.group(2) and match.group(2).lower()]
+
+def check_deadline():
+    """Raise DeadlineExceeded if the current run was cancelled or is out of time"""
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+def bounded_timeout(timeout=None):
+    """timeout bounded by the current run's time left (unchanged outside a deadline)"""
+    deadline = current_deadline()
+    return timeout if deadline is None else deadline.timeout(timeout)
+
+def retry_allowed(wait):
+    """Whether a retry after waiting wait seconds fits in the current run's deadline"""
+    deadline = current_deadline()
+    return deadline is None or deadline.allows(wait)
+
+def sleep_before_retry(seconds):
+    """Wait seconds before a retry; under a deadline the wait is cut short if the run is cancelled"""
+    deadline = current_deadline()
+    if deadline is None:
+        time.sleep(seconds)
+    else:
+        deadline.sleep(seconds)
@@ -0,0 +1,70 @@
+import os
+import re
+import zlib
+
+# Defaults for question deduplication; callers can override any of them per run
+DEFAULT_OPTIONS = {
+    # "fanout" answers one question per cluster and copies the answer to the
+    # others, "drop" removes the duplicates, "off" keeps every question
+    "policy": os.getenv("DEDUP_POLICY", "fanout").strip().lower(),
+    # Estimated Jaccard similarity of shingles at which questions are duplicates
+    "threshold": float(os.getenv("DEDUP_THRESHOLD", "0.7")),
+}
+POLICIES = ("fanout", "drop", "off")
+
+# Shingle sets are hashed into fixed-width bit signatures, so comparing two
+# questions is one AND, one OR and two popcounts on Python ints
+SIGNATURE_BITS = 4096
+SHINGLE_SIZE = 3
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+def dedup_options(overrides=None):
+    """DEFAULT_OPTIONS updated with any non-None overrides"""
+    options = dict(DEFAULT_OPTIONS)
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    if options["policy"] not in POLICIES:
+        raise ValueError(f"Unknown dedup policy '{options['policy']}'; use one of {', '.join(POLICIES)}")
+    return options
+
+def signature(text):
+    """Bit signature of text's character shingles, ignoring case and punctuation"""
+    text = f" {_NON_WORD.sub(' ', text.casefold()).strip()} "
+    bits = 0
+    for i in range(max(len(text) - SHINGLE_SIZE + 1, 1)):
+        bits |= 1 << (zlib.crc32(text[i:i + SHINGLE_SIZE].encode("utf-8")) % SIGNATURE_BITS)
+    return bits
+
+def _bit_count(bits):
+    """Set bits in bits (int.bit_count() needs Python 3.10)"""
+    return bin(bits).count("1")
+
+def similarity(a, b):
+    """Estimated Jaccard similarity of two signatures"""
+    union = _bit_count(a | b)
+    return _bit_count(a & b) / union if union else 1.0
+
+def find_duplicates(texts, threshold=DEFAULT_OPTIONS["threshold"]):
+    """
+    For each text, the index of the first text it is a near-duplicate of.
+
+    Texts are clustered transitively (if a ~ b and b ~ c, all three share
+    one cluster), and every cluster is represented by its earliest member,
+    so representatives map to themselves.
+    """
+    signatures = [signature(text) for text in texts]
+    parent = list(range(len(texts)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for j in range(1, len(texts)):
+        for i in range(j):
+            if similarity(signatures[i], signatures[j]) >= threshold:
+                a, b = root(i), root(j)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+    return [root(i) for i in range(len(texts))]
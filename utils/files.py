@@ -0,0 +1,18 @@
+import json
+import os
+import tempfile
+
+def write_json(path, data, indent=2):
+    """
+    Write data to path as JSON, atomically: a reader sees the old file or the
+    new one, never a partial write, even if the process dies midway.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
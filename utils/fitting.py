@@ -0,0 +1,162 @@
+import logging
+import os
+from utils.model_catalog import get_context_window, get_max_output_tokens
+from utils.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+# What a node does with a prompt that would not fit its model's context:
+#   route  send it to the provider's long-context model if it fits there, otherwise trim
+#   trim   cut the transcript down to what fits, at a sentence break
+#   chunk  split the transcript and make one call per chunk where the node can
+#          merge the parts (topic extraction); elsewhere the same as trim
+#   fail   raise PromptTooLargeError without calling the provider
+POLICIES = ("route", "trim", "chunk", "fail")
+
+# Defaults for prompt fitting; callers can override any of them per run
+DEFAULT_OPTIONS = {
+    "policy": os.getenv("PROMPT_FIT_POLICY", "route").strip().lower(),
+    # Context kept free for the response, capped at the model's max output
+    "output_reserve_tokens": int(os.getenv("PROMPT_FIT_OUTPUT_RESERVE_TOKENS", "4000")),
+    # Share of the context held back because token counts are estimates
+    "safety_margin": float(os.getenv("PROMPT_FIT_SAFETY_MARGIN", "0.05")),
+}
+
+# Where oversized prompts are routed; {PROVIDER}_LONG_CONTEXT_MODEL overrides
+# these, and a provider without one (e.g. compatible) is never routed
+LONG_CONTEXT_MODELS = {"openai": "gpt-4.1", "gemini": "gemini-1.5-pro"}
+
+# How providers word "the prompt is longer than the context" (OpenAI, Gemini, vLLM, llama.cpp)
+CONTEXT_ERROR_MARKERS = (
+    "context_length_exceeded", "maximum context length", "exceeds the maximum number of tokens",
+    "exceeds the available context size", "prompt is too long",
+)
+
+class PromptTooLargeError(ValueError):
+    """A prompt too large for its model's context; sending it again can't succeed"""
+    def __init__(self, tokens, limit, model, detail=None):
+        super().__init__(detail or f"Prompt of about {tokens} tokens is over the {limit}-token prompt budget of {model}")
+        self.tokens = tokens
+        self.limit = limit
+        self.model = model
+
+def fit_options(overrides=None):
+    """DEFAULT_OPTIONS updated with any non-None overrides"""
+    options = dict(DEFAULT_OPTIONS)
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    if options["policy"] not in POLICIES:
+        raise ValueError(f"Unknown prompt fit policy '{options['policy']}'; use one of {', '.join(POLICIES)}")
+    return options
+
+def prompt_budget(model, options=None):
+    """Prompt tokens model can take while leaving room for its response"""
+    options = fit_options(options)
+    reserve = min(options["output_reserve_tokens"], get_max_output_tokens(model))
+    return max(int((get_context_window(model) - reserve) * (1 - options["safety_margin"])), 0)
+
+def count_prompt_tokens(prompt, model, limit):
+    """Token estimate for prompt, skipping the count when it is too short to be anywhere near limit"""
+    # A token is at least one character, so a prompt this short always fits
+    if len(prompt) <= limit:
+        return len(prompt) // int(CHARS_PER_TOKEN)
+    return estimate_tokens(prompt, model)
+
+def get_long_context_model(provider):
+    """The model oversized prompts for provider are routed to, or None"""
+    model = os.getenv(f"{provider.upper()}_LONG_CONTEXT_MODEL", LONG_CONTEXT_MODELS.get(provider, ""))
+    return model.strip() or None
+
+def _routed_model(prompt, provider, model, options):
+    """provider's long-context model if prompt fits there, otherwise None"""
+    routed = get_long_context_model(provider)
+    if routed and routed != model:
+        limit = prompt_budget(routed, options)
+        if count_prompt_tokens(prompt, routed, limit) <= limit:
+            return routed
+    return None
+
+def check_prompt(prompt, provider, model, options=None):
+    """
+    The model to send prompt to: model when it fits, otherwise the provider's
+    long-context model when it fits there. Raises PromptTooLargeError before
+    any request is made when neither does.
+    """
+    limit = prompt_budget(model, options)
+    tokens = count_prompt_tokens(prompt, model, limit)
+    if tokens <= limit:
+        return model
+    routed = _routed_model(prompt, provider, model, options)
+    if routed is None:
+        raise PromptTooLargeError(tokens, limit, model)
+    logger.warning(f"Prompt of about {tokens} tokens is over the {limit}-token budget of {model}; routing to {routed}")
+    return routed
+
+def trim_text(text, max_tokens, model=None):
+    """The start of text in at most max_tokens tokens, cut at a sentence break (or a space) when there is one"""
+    if estimate_tokens(text, model) <= max_tokens:
+        return text
+    chars = int(max_tokens * CHARS_PER_TOKEN)
+    while chars > 0:
+        cut = text.rfind(". ", chars // 2, chars)
+        cut = cut + 1 if cut != -1 else text.rfind(" ", 0, chars)
+        head = text[:cut if cut > 0 else chars].strip()
+        tokens = estimate_tokens(head, model)
+        if tokens <= max_tokens:
+            return head
+        # Denser text than four characters a token: shrink in proportion and try again
+        chars = min(int(chars * max_tokens / tokens * 0.95), chars - 1)
+    return ""
+
+def split_text(text, max_tokens, model=None):
+    """text split, in order, into pieces of at most max_tokens tokens"""
+    pieces = []
+    rest = text.strip()
+    while rest:
+        piece = trim_text(rest, max_tokens, model) or rest[:max(int(max_tokens * CHARS_PER_TOKEN), 1)]
+        pieces.append(piece)
+        rest = rest[len(piece):].strip()
+    return pieces
+
+def fit_transcript(build, transcript, provider, model, options=None, chunkable=False):
+    """
+    Apply the fit policy to the prompt build(transcript) for model.
+
+    Returns {"action", "transcripts", "tokens", "limit", "model"}: the action is
+    "fits", "route" (call_llm will send the prompt to the long-context model),
+    "trim" or "chunk", and the prompts are built from "transcripts". Chunking
+    needs a node that can merge the parts (chunkable); otherwise it trims.
+    Raises PromptTooLargeError under the "fail" policy, or when even an empty
+    transcript doesn't fit.
+    """
+    options = fit_options(options)
+    prompt = build(transcript)
+    limit = prompt_budget(model, options)
+    tokens = count_prompt_tokens(prompt, model, limit)
+    plan = {"action": "fits", "transcripts": [transcript], "tokens": tokens, "limit": limit, "model": model}
+    if tokens <= limit:
+        return plan
+    if options["policy"] == "fail":
+        raise PromptTooLargeError(tokens, limit, model)
+    if options["policy"] == "route":
+        routed = _routed_model(prompt, provider, model, options)
+        if routed is not None:
+            return {**plan, "action": "route", "model": routed}
+
+    room = limit - estimate_tokens(build(""), model)
+    if room <= 0:
+        raise PromptTooLargeError(tokens, limit, model)
+    if options["policy"] == "chunk" and chunkable:
+        return {**plan, "action": "chunk", "transcripts": split_text(transcript, room, model)}
+    return {**plan, "action": "trim", "transcripts": [trim_text(transcript, room, model)]}
+
+def is_context_length_error(error):
+    """Whether a provider rejected a request for being longer than the model's context"""
+    if getattr(error, "code", None) == "context_length_exceeded":
+        return True
+    text = str(error).lower()
+    return any(marker in text for marker in CONTEXT_ERROR_MARKERS)
+
+def context_length_error(prompt, model, error):
+    """PromptTooLargeError for a provider's context length rejection of prompt"""
+    return PromptTooLargeError(estimate_tokens(prompt, model), get_context_window(model), model,
+                               detail=f"{model} rejected the prompt as too long for its context: {error}")
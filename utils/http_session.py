@@ -0,0 +1,72 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from utils.throttle import get_throttle, parse_retry_after
+from utils.deadline import bounded_timeout
+
+# (connect, read) timeouts in seconds applied to every request that doesn't set its own
+HTTP_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+                float(os.getenv("HTTP_READ_TIMEOUT", "30")))
+# Keep-alive connections per host; further requests to the same host wait for a free one
+HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "8"))
+# How many times a request to a throttled host is retried after a 429, once its cooldown ends
+HTTP_BLOCK_RETRIES = int(os.getenv("HTTP_BLOCK_RETRIES", "3"))
+
+_session = None
+_session_lock = threading.Lock()
+
+class TimeoutSession(requests.Session):
+    """
+    Session that applies a default timeout, so libraries that don't pass one can't hang forever.
+    Inside a run deadline (see utils.deadline), every timeout is cut to the time left.
+
+    Requests to throttled hosts (see utils.throttle) wait for a slot, and a 429
+    response puts the host into cooldown and is retried up to block_retries times.
+    """
+    def __init__(self, timeout=HTTP_TIMEOUT, block_retries=HTTP_BLOCK_RETRIES):
+        super().__init__()
+        self.timeout = timeout
+        self.block_retries = block_retries
+
+    def request(self, method, url, **kwargs):
+        kwargs["timeout"] = bounded_timeout(kwargs.get("timeout") or self.timeout)
+        throttle = get_throttle(url)
+        if throttle is None:
+            return super().request(method, url, **kwargs)
+
+        for attempt in range(self.block_retries + 1):
+            with throttle.slot():
+                response = super().request(method, url, **kwargs)
+            if response.status_code != 429:
+                throttle.report_ok()
+                return response
+            throttle.report_blocked(parse_retry_after(response.headers.get("Retry-After")))
+            if attempt < self.block_retries:
+                response.close()
+        return response
+
+def create_session(max_per_host=HTTP_MAX_PER_HOST, timeout=HTTP_TIMEOUT):
+    """Create a pooled keep-alive session with a per-host connection limit"""
+    session = TimeoutSession(timeout)
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_per_host, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session():
+    """Process-wide session shared by all YouTube fetches"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+def reset_session():
+    """Close the shared session (tests, or after fork)"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
@@ -0,0 +1,297 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VISIBILITY_TIMEOUT = 900  # seconds a leased job stays invisible to other workers
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_PROBE_CLAIM_TIMEOUT = 300  # seconds a claimed transcript probe stays with its prober
+
+# Priority classes. Interactive jobs are always leased before bulk jobs, and
+# workers can reserve slots that only ever take interactive work.
+LANES = ("interactive", "bulk")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    provider TEXT,
+    priority INTEGER NOT NULL DEFAULT 0,
+    lane TEXT NOT NULL DEFAULT 'bulk',
+    deadline REAL,
+    transcript_chars INTEGER,
+    probe_owner TEXT,
+    probe_expires REAL,
+    probe_error TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    output_file TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs (status, priority, available_at);
+"""
+
+# Columns added after the first release, migrated into existing databases
+_ADDED_COLUMNS = {
+    "lane": "TEXT NOT NULL DEFAULT 'bulk'",
+    "deadline": "REAL",
+    "transcript_chars": "INTEGER",
+    "probe_owner": "TEXT",
+    "probe_expires": "REAL",
+    "probe_error": "TEXT",
+}
+
+# Interactive lane first; within a lane: priority, earliest deadline, then
+# shortest known transcript (unknown lengths, including failed probes, last), then FIFO
+_LEASE_ORDER = (
+    "CASE lane WHEN 'interactive' THEN 0 ELSE 1 END, priority DESC, "
+    "deadline IS NULL, deadline, transcript_chars IS NULL, transcript_chars, id"
+)
+
+class JobQueue:
+    """
+    Durable job queue backed by a local SQLite database.
+
+    Jobs are leased rather than popped: a leased job becomes visible again once its
+    visibility timeout expires, so a crashed worker never loses work. Several worker
+    processes on the same host can share one database file; leasing runs inside an
+    IMMEDIATE transaction so two workers can never lease the same job.
+    """
+    def __init__(self, path="jobs.db", visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for name, declaration in _ADDED_COLUMNS.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {declaration}")
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def enqueue(self, url, provider=None, priority=0, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                lane="bulk", deadline=None):
+        """
+        Add a job and return its ID.
+
+        lane is "interactive" or "bulk"; deadline is an absolute UNIX timestamp
+        after which the job is no longer worth starting.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}. Supported lanes: {', '.join(LANES)}")
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (url, provider, priority, lane, deadline, max_attempts, available_at, "
+            "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, provider, priority, lane, deadline, max_attempts, now, now, now)
+        )
+        return cursor.lastrowid
+
+    def lease(self, worker_id, visibility_timeout=None, lanes=LANES):
+        """
+        Lease the next ready job for worker_id from the given lanes.
+
+        Returns the job as a dict, or None if nothing is ready. Jobs whose previous
+        lease expired are picked up again; if they have used up their attempts they
+        are marked failed instead. Jobs past their deadline are marked expired.
+        """
+        timeout = visibility_timeout or self.visibility_timeout
+        lane_filter = ", ".join("?" for _ in lanes)
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "UPDATE jobs SET status = 'expired', error = 'deadline passed', lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'pending' AND deadline IS NOT NULL AND deadline < ?",
+                (now, now)
+            )
+            # Abandoned leases that have no attempts left are failed, not retried
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'lease expired', lease_owner = NULL, updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs "
+                "WHERE ((status = 'pending' AND available_at <= ?) "
+                "   OR (status = 'leased' AND lease_expires < ?)) "
+                f"  AND lane IN ({lane_filter}) "
+                f"ORDER BY {_LEASE_ORDER} LIMIT 1",
+                (now, now, *lanes)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (worker_id, now + timeout, now, row["id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"])
+
+    def heartbeat(self, job_id, worker_id, visibility_timeout=None):
+        """Extend the lease on a running job. Returns False if the lease was lost."""
+        timeout = visibility_timeout or self.visibility_timeout
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (now + timeout, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result=None, output_file=None):
+        """Mark a leased job as done and store its result. Returns False if the lease was lost."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'done', result = ?, output_file = ?, error = NULL, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+            (json.dumps(result) if result is not None else None, output_file, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry_delay=30):
+        """
+        Record a failed attempt.
+
+        The job goes back to pending after retry_delay seconds (doubling with every
+        attempt) until it runs out of attempts, after which it is marked failed.
+        Returns the job's new status, or None if the lease was lost.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = "failed", now
+            else:
+                status, available_at = "pending", now + retry_delay * (2 ** (row["attempts"] - 1))
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, available_at = ?, lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (status, str(error), available_at, now, job_id)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return status
+
+    def set_transcript_chars(self, job_id, transcript_chars):
+        """Record a job's transcript length so bulk work can run shortest-first"""
+        self._connect().execute(
+            "UPDATE jobs SET transcript_chars = ?, probe_owner = NULL, probe_expires = NULL, updated_at = ? "
+            "WHERE id = ?",
+            (transcript_chars, time.time(), job_id)
+        )
+
+    def set_probe_failed(self, job_id, error):
+        """Record that a job's transcript couldn't be fetched; its length stays unknown and it isn't probed again"""
+        self._connect().execute(
+            "UPDATE jobs SET probe_error = ?, probe_owner = NULL, probe_expires = NULL, updated_at = ? WHERE id = ?",
+            (str(error), time.time(), job_id)
+        )
+
+    def claim_unprobed(self, prober_id, lane="bulk", claim_timeout=DEFAULT_PROBE_CLAIM_TIMEOUT):
+        """
+        Claim the next pending job in lane whose transcript length is still unknown.
+
+        The claim keeps other probers off the job for claim_timeout seconds,
+        after which an unfinished probe can be claimed again. Returns the job
+        as a dict, or None if nothing is left to probe.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'pending' AND lane = ? "
+                "  AND transcript_chars IS NULL AND probe_error IS NULL "
+                "  AND (probe_owner IS NULL OR probe_expires < ?) "
+                "ORDER BY priority DESC, deadline IS NULL, deadline, id LIMIT 1",
+                (lane, now)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET probe_owner = ?, probe_expires = ?, updated_at = ? WHERE id = ?",
+                    (prober_id, now + claim_timeout, now, row["id"])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.get(row["id"]) if row is not None else None
+
+    def count_pending(self, lane, probed=None):
+        """Count pending jobs in lane, optionally only those probed already (or not yet), successfully or not"""
+        query = "SELECT COUNT(*) FROM jobs WHERE status = 'pending' AND lane = ?"
+        if probed is True:
+            query += " AND (transcript_chars IS NOT NULL OR probe_error IS NOT NULL)"
+        elif probed is False:
+            query += " AND transcript_chars IS NULL AND probe_error IS NULL"
+        return self._connect().execute(query, (lane,)).fetchone()[0]
+
+    def get(self, job_id):
+        """Return a job as a dict, or None if it doesn't exist"""
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row is not None else None
+
+    def counts(self, by_lane=False):
+        """Return the number of jobs in each status (or each (lane, status) pair)"""
+        if by_lane:
+            rows = self._connect().execute(
+                "SELECT lane, status, COUNT(*) AS n FROM jobs GROUP BY lane, status"
+            ).fetchall()
+            return {(row["lane"], row["status"]): row["n"] for row in rows}
+        rows = self._connect().execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+def _row_to_job(row):
+    """Convert a jobs row into a plain dict, decoding the stored result"""
+    job = dict(row)
+    if job.get("result"):
+        job["result"] = json.loads(job["result"])
+    return job
@@ -0,0 +1,165 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Each provider reads a comma-separated pool ({PROVIDER}_API_KEYS) plus its
+# single key ({PROVIDER}_API_KEY); the placeholders from .env.example don't count
+KEY_ENV = {"openai": "OPENAI_API_KEY", "gemini": "GEMINI_API_KEY"}
+PLACEHOLDER_KEYS = {"your_openai_api_key_here", "your_gemini_api_key_here"}
+
+# How long a key sits out after errors. Quota and rate-limit errors eject it
+# briefly, doubling with consecutive strikes; auth errors eject it for long.
+KEY_QUOTA_EJECT_SECONDS = float(os.getenv("KEY_QUOTA_EJECT_SECONDS", "30"))
+KEY_AUTH_EJECT_SECONDS = float(os.getenv("KEY_AUTH_EJECT_SECONDS", "900"))
+KEY_MAX_EJECT_SECONDS = float(os.getenv("KEY_MAX_EJECT_SECONDS", "900"))
+# Window over which a key's recent requests count as its load
+KEY_LOAD_WINDOW_SECONDS = 60.0
+
+def load_keys(provider):
+    """The API keys configured for provider, pool first, without duplicates or placeholders"""
+    name = KEY_ENV.get(provider.lower())
+    if name is None:
+        return []
+    candidates = os.getenv(f"{name}S", "").split(",") + [os.getenv(name, "")]
+    keys = []
+    for key in (k.strip() for k in candidates):
+        if key and key not in PLACEHOLDER_KEYS and key not in keys:
+            keys.append(key)
+    return keys
+
+def mask_key(key):
+    """Key shortened for logs and stats"""
+    return f"{key[:3]}...{key[-4:]}" if len(key) > 10 else "***"
+
+def classify_error(error):
+    """"auth" for rejected keys, "quota" for rate and quota limits, None for anything else"""
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "code", None)
+    text = str(error).lower()
+    if status in (401, 403) or any(s in text for s in ("invalid api key", "incorrect api key",
+                                                         "api key not valid", "permission denied")):
+        return "auth"
+    if status == 429 or any(s in text for s in ("rate limit", "quota", "resource exhausted")):
+        return "quota"
+    return None
+
+class KeyPool:
+    """
+    Rotation over one provider's API keys.
+
+    acquire() hands out the key with the fewest requests in flight, then the
+    fewest in the last minute, so load spreads across every key's rate limit.
+    report_error() ejects a key after auth or quota errors, and report_ok()
+    forgives its strikes. While every key is ejected, the one due back first
+    is used. Usage is counted per key.
+    """
+    def __init__(self, provider, keys, clock=time.monotonic):
+        if not keys:
+            raise ValueError(f"No API keys configured for {provider}")
+        self.provider = provider
+        self.keys = list(keys)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = {key: 0 for key in self.keys}
+        self._recent = {key: deque() for key in self.keys}
+        self._ejected_until = {key: 0.0 for key in self.keys}
+        self._strikes = {key: 0 for key in self.keys}
+        self.stats = {key: {"requests": 0, "errors": 0, "ejections": 0, "tokens": 0} for key in self.keys}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _load(self, key, now):
+        recent = self._recent[key]
+        while recent and recent[0] <= now - KEY_LOAD_WINDOW_SECONDS:
+            recent.popleft()
+        return self._in_flight[key], len(recent)
+
+    def _choose(self):
+        now = self._clock()
+        available = [key for key in self.keys if self._ejected_until[key] <= now]
+        if not available:
+            key = min(self.keys, key=lambda k: self._ejected_until[k])
+            logger.warning(f"All {self.provider} keys are ejected; using {mask_key(key)}, due back first")
+            return key, now
+        return min(available, key=lambda k: self._load(k, now)), now
+
+    @contextmanager
+    def acquire(self):
+        """Hold the least loaded available key for the duration of a request"""
+        with self._lock:
+            key, now = self._choose()
+            self._in_flight[key] += 1
+            self._recent[key].append(now)
+            self.stats[key]["requests"] += 1
+        try:
+            yield key
+        finally:
+            with self._lock:
+                self._in_flight[key] -= 1
+
+    def report_ok(self, key, tokens=None):
+        """A request with key succeeded, using tokens if known"""
+        with self._lock:
+            self._strikes[key] = 0
+            if isinstance(tokens, int):
+                self.stats[key]["tokens"] += tokens
+
+    def report_error(self, key, error):
+        """Count a failed request and eject key for auth or quota errors; returns the ejection in seconds"""
+        kind = classify_error(error)
+        with self._lock:
+            self.stats[key]["errors"] += 1
+            if kind is None:
+                return 0.0
+            self._strikes[key] += 1
+            if kind == "auth":
+                delay = KEY_AUTH_EJECT_SECONDS
+            else:
+                delay = min(KEY_QUOTA_EJECT_SECONDS * 2 ** (self._strikes[key] - 1), KEY_MAX_EJECT_SECONDS)
+            self._ejected_until[key] = max(self._ejected_until[key], self._clock() + delay)
+            self.stats[key]["ejections"] += 1
+        if len(self.keys) > 1:
+            logger.warning(f"Ejecting {self.provider} key {mask_key(key)} for {delay:.0f}s after {kind} error")
+        return delay
+
+    def usage(self):
+        """Per-key stats, keyed by masked key (numbered if two keys mask alike)"""
+        with self._lock:
+            now = self._clock()
+            usage = {}
+            for position, key in enumerate(self.keys, 1):
+                label = mask_key(key)
+                if label in usage:
+                    label = f"{label}#{position}"
+                usage[label] = {**self.stats[key], "in_flight": self._in_flight[key],
+                                "ejected_seconds": round(max(self._ejected_until[key] - now, 0.0), 1)}
+            return usage
+
+# Pools are shared process-wide, one per provider and key set, so changing
+# the configured keys starts a fresh pool
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_key_pool(provider):
+    """The KeyPool for provider's configured keys"""
+    provider = provider.lower()
+    keys = tuple(load_keys(provider))
+    with _pools_lock:
+        pool = _pools.get((provider, keys))
+        if pool is None:
+            pool = KeyPool(provider, keys)
+            _pools[(provider, keys)] = pool
+        return pool
+
+def key_usage():
+    """Usage of every pool in use, keyed by provider"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.provider: pool.usage() for pool in pools}
@@ -0,0 +1,138 @@
+import json
+import os
+from functools import lru_cache
+
+# USD per million tokens as (input, output). Prices change; override or extend
+# this table with a JSON file in MODEL_PRICING_FILE:
+#   {"my-model": [0.5, 1.5]}
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "o3-mini": (1.10, 4.40),
+    "o3": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-1.5-flash": (0.075, 0.30),
+}
+
+# Context window in tokens (prompt plus output). Models not listed here are
+# assumed to have DEFAULT_CONTEXT_TOKENS.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o-mini": 128_000,
+    "gpt-4o": 128_000,
+    "gpt-4.1-mini": 1_047_576,
+    "gpt-4.1-nano": 1_047_576,
+    "gpt-4.1": 1_047_576,
+    "o3-mini": 200_000,
+    "o3": 200_000,
+    "o4-mini": 200_000,
+    "gpt-3.5-turbo": 16_385,
+    "gemini-2.5-pro": 1_048_576,
+    "gemini-2.5-flash": 1_048_576,
+    "gemini-2.0-flash": 1_048_576,
+    "gemini-1.5-pro": 2_097_152,
+    "gemini-1.5-flash": 1_048_576,
+}
+DEFAULT_CONTEXT_TOKENS = int(os.getenv("DEFAULT_CONTEXT_TOKENS", "128000"))
+
+# Most output tokens one response can have. Models not listed here are
+# assumed to have DEFAULT_MAX_OUTPUT_TOKENS.
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-4o-mini": 16_384,
+    "gpt-4o": 16_384,
+    "gpt-4.1-mini": 32_768,
+    "gpt-4.1-nano": 32_768,
+    "gpt-4.1": 32_768,
+    "o3-mini": 100_000,
+    "o3": 100_000,
+    "o4-mini": 100_000,
+    "gpt-3.5-turbo": 4_096,
+    "gemini-2.5-pro": 65_536,
+    "gemini-2.5-flash": 65_536,
+    "gemini-2.0-flash": 8_192,
+    "gemini-1.5-pro": 8_192,
+    "gemini-1.5-flash": 8_192,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = int(os.getenv("DEFAULT_MAX_OUTPUT_TOKENS", "4096"))
+
+# Capabilities of models missing above (e.g. a model on a compatible endpoint)
+# or corrections to them, from a JSON file in MODEL_CAPABILITIES_FILE:
+#   {"qwen2.5-7b-instruct": {"context_tokens": 32768, "max_output_tokens": 8192}}
+
+# Lookups run on every LLM call and inside the planner's loops, so the files
+# are parsed once and re-read only when they change (keyed on path, mtime and size)
+
+def _file_version(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+@lru_cache(maxsize=16)
+def _read_json(path, version):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+@lru_cache(maxsize=16)
+def _read_prices(path, version):
+    return {name: tuple(price) for name, price in _read_json(path, version).items()}
+
+@lru_cache(maxsize=16)
+def _read_capabilities(path, version, field):
+    return {name: int(caps[field]) for name, caps in _read_json(path, version).items() if field in caps}
+
+def _load_overrides():
+    """Read extra prices from MODEL_PRICING_FILE, if set"""
+    path = os.getenv("MODEL_PRICING_FILE")
+    if not path:
+        return {}
+    return _read_prices(path, _file_version(path))
+
+def _load_capabilities(field):
+    """Read one capability of every model in MODEL_CAPABILITIES_FILE, if set"""
+    path = os.getenv("MODEL_CAPABILITIES_FILE")
+    if not path:
+        return {}
+    return _read_capabilities(path, _file_version(path), field)
+
+def _lookup(table, model):
+    """Find model in table, falling back to the longest matching prefix (e.g. dated snapshots)"""
+    if model in table:
+        return table[model]
+    matches = [name for name in table if model.startswith(name)]
+    return table[max(matches, key=len)] if matches else None
+
+def get_model_price(model):
+    """Return (input, output) USD per million tokens for model, or None if unknown"""
+    if not model:
+        return None
+    return _lookup({**MODEL_PRICES, **_load_overrides()}, model)
+
+def estimate_cost(model, input_tokens, output_tokens):
+    """Return the USD cost of a call, or None if the model's price is unknown"""
+    price = get_model_price(model)
+    if price is None:
+        return None
+    return (input_tokens * price[0] + output_tokens * price[1]) / 1_000_000
+
+def get_context_window(model):
+    """Return the context window of model in tokens"""
+    if not model:
+        return DEFAULT_CONTEXT_TOKENS
+    return _lookup({**MODEL_CONTEXT_TOKENS, **_load_capabilities("context_tokens")}, model) or DEFAULT_CONTEXT_TOKENS
+
+def get_max_output_tokens(model):
+    """Return the most output tokens one response of model can have"""
+    if not model:
+        return DEFAULT_MAX_OUTPUT_TOKENS
+    return (_lookup({**MODEL_MAX_OUTPUT_TOKENS, **_load_capabilities("max_output_tokens")}, model)
+            or DEFAULT_MAX_OUTPUT_TOKENS)
+
+def get_model_capabilities(model):
+    """Return {"context_tokens", "max_output_tokens"} for model"""
+    return {"context_tokens": get_context_window(model), "max_output_tokens": get_max_output_tokens(model)}
@@ -0,0 +1,137 @@
+import os
+import re
+from utils.tokens import estimate_tokens
+from utils.transcript import Transcript
+
+def _env_flag(name, default):
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+# Defaults for the normalization stage; callers can override any of them per run
+DEFAULT_OPTIONS = {
+    "enabled": _env_flag("NORMALIZE_TRANSCRIPT", "1"),
+    "dedupe": True,
+    "strip_annotations": True,
+    "strip_fillers": _env_flag("NORMALIZE_STRIP_FILLERS", "0"),
+    "resegment": _env_flag("NORMALIZE_RESEGMENT", "1"),
+}
+
+# Non-speech annotations: [Music], [Applause], [Laughter], [__] (bleeped), (inaudible), ♪ ... ♪
+_ANNOTATION = re.compile(r"\[[^\]]{0,40}\]|\((?:music|applause|laughter|laughs|inaudible|silence|crosstalk)\)|[♪♫]+",
+                         re.IGNORECASE)
+_FILLER = re.compile(r"(?<![\w'])(?:u+m+|u+h+|uhm|erm|er|ah|hmm+|mhm|you know|i mean)(?![\w'])[,.]?\s*",
+                     re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+# Breaks after .!? and up to two closing quotes/brackets, which stay with their sentence
+# (lookbehinds need a fixed width, hence one per closer count)
+_SENTENCE_BREAK = re.compile(r"(?:(?<=[.!?])|(?<=[.!?][\"')\]])|(?<=[.!?][\"')\]]{2}))\s+")
+_SENTENCE_END = re.compile(r"[.!?][\"')\]]*$")
+_WORD = re.compile(r"[\w']+")
+
+# Rolling captions repeat the end of the previous cue at the start of the next one.
+# Overlaps shorter than this many words are treated as real speech ("the ... the",
+# "no. no."), even when they make up the whole cue.
+MIN_OVERLAP_WORDS = 2
+# How far back to look for a repeated fragment
+OVERLAP_WINDOW_WORDS = 40
+
+def normalization_options(overrides=None):
+    """DEFAULT_OPTIONS updated with any non-None overrides"""
+    options = dict(DEFAULT_OPTIONS)
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return options
+
+def _clean(text, strip_annotations, strip_fillers):
+    if strip_annotations:
+        text = _ANNOTATION.sub(" ", text)
+    if strip_fillers:
+        text = _FILLER.sub("", text)
+    return _SPACES.sub(" ", text).strip(" ,")
+
+def _drop_repeated_prefix(tail, text):
+    """Remove the start of text that repeats the end of the words already emitted"""
+    words = text.split(" ")
+    keys = [w.lower() for w in (" ".join(_WORD.findall(word)) for word in words)]
+    for k in range(min(len(tail), len(keys)), 0, -1):
+        if k >= MIN_OVERLAP_WORDS and tail[-k:] == keys[:k]:
+            return " ".join(words[k:]), keys[k:]
+    return text, keys
+
+def _resegment(entries):
+    """
+    Merge caption fragments into whole sentences (and split fragments holding
+    several), interpolating timestamps by character position.
+    """
+    sentences = []
+    parts, start = [], None
+    for entry in entries:
+        text, length = entry["text"], len(entry["text"])
+        position = 0
+        pieces = _SENTENCE_BREAK.split(text)
+        for index, piece in enumerate(pieces):
+            offset = text.find(piece, position)
+            position = offset + len(piece)
+            if start is None:
+                start = entry["start"] + entry["duration"] * offset / length
+            parts.append(piece)
+            if index < len(pieces) - 1 or _SENTENCE_END.search(piece):
+                end = entry["start"] + entry["duration"] * position / length
+                sentences.append({"text": " ".join(parts), "start": start, "duration": max(end - start, 0.0)})
+                parts, start = [], None
+        last_end = entry["start"] + entry["duration"]
+    if parts:
+        sentences.append({"text": " ".join(parts), "start": start, "duration": max(last_end - start, 0.0)})
+    return sentences
+
+def normalize_transcript(transcript, dedupe=True, strip_annotations=True, strip_fillers=False, resegment=True, **_):
+    """
+    Return a cleaned copy of a Transcript.
+
+    Strips non-speech annotations and (optionally) filler words, drops the
+    repeated fragments rolling auto-captions produce, and regroups the
+    fragments into sentences when the captions are punctuated.
+    """
+    entries, tail = [], []
+    for index in range(len(transcript)):
+        start, duration, text = transcript.segment(index)
+        text = _clean(text, strip_annotations, strip_fillers)
+        if dedupe and text:
+            text, keys = _drop_repeated_prefix(tail, text)
+            tail = (tail + keys)[-OVERLAP_WINDOW_WORDS:]
+        if text:
+            entries.append({"text": text, "start": start, "duration": duration})
+
+    # Resegmenting unpunctuated auto-captions would just make one giant "sentence"
+    if resegment and any(_SENTENCE_END.search(e["text"]) for e in entries):
+        entries = _resegment(entries)
+    return Transcript.from_entries(entries)
+
+def normalize_video_info(video_info, options=None):
+    """
+    Normalize video_info's transcript according to options.
+
+    Returns (new_video_info, report), where report has the estimated token
+    counts before and after.
+    """
+    options = normalization_options(options)
+    original = video_info.get("transcript", "")
+    tokens_before = estimate_tokens(original)
+    if not options["enabled"]:
+        return video_info, {"enabled": False, "tokens_before": tokens_before, "tokens_after": tokens_before,
+                            "reduction": 0.0}
+
+    segments = video_info.get("segments")
+    if not isinstance(segments, Transcript):
+        # Video info without timestamps (e.g. cached before they were kept)
+        segments = Transcript.from_entries([{"text": original, "start": 0.0, "duration": 0.0}] if original else [])
+    normalized = normalize_transcript(segments, **options)
+
+    info = dict(video_info)
+    info["segments"] = normalized
+    info["transcript"] = normalized.text
+    tokens_after = estimate_tokens(normalized.text)
+    return info, {
+        "enabled": True,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "reduction": 1 - tokens_after / tokens_before if tokens_before else 0.0,
+    }
@@ -0,0 +1,121 @@
+import os
+from utils.call_llm import get_model_for_task, get_provider_for_task
+from utils.model_catalog import get_context_window
+from utils.tokens import estimate_tokens, CHARS_PER_TOKEN
+
+# How a video is summarized:
+#   single      one call extracts topics and answers them (short videos)
+#   two_stage   one extraction call, then calls that answer the topics (the classic flow)
+#   map_reduce  each transcript chunk is summarized on its own, then the best
+#               topics are selected (transcripts too long to re-send per topic)
+STRATEGIES = ("single", "two_stage", "map_reduce")
+
+# Defaults for strategy selection; callers can override any of them per run
+DEFAULT_OPTIONS = {
+    # "auto" picks from the transcript size; anything in STRATEGIES forces it
+    "strategy": os.getenv("SUMMARY_STRATEGY", "auto").strip().lower(),
+    # Transcripts up to this many tokens get a single combined call
+    "single_max_tokens": int(os.getenv("STRATEGY_SINGLE_MAX_TOKENS", "6000")),
+    # Transcripts over this many tokens, or over context_fraction of the
+    # smallest model context, are chunked
+    "map_reduce_min_tokens": int(os.getenv("STRATEGY_MAP_REDUCE_MIN_TOKENS", "100000")),
+    "context_fraction": float(os.getenv("STRATEGY_CONTEXT_FRACTION", "0.5")),
+    # Transcript tokens per chunk in map_reduce
+    "chunk_tokens": int(os.getenv("STRATEGY_CHUNK_TOKENS", "30000")),
+}
+
+# Expected output of answering one topic, for packing topics into calls
+TITLE_OUTPUT_TOKENS = 30         # rephrased topic title and YAML scaffolding
+ANSWER_OUTPUT_TOKENS = 250       # one rephrased question plus its HTML answer
+# Output tokens one ProcessContent call may be asked to produce; topics are
+# packed into a call until their expected answers would exceed it. 0 answers
+# every topic in its own call.
+PROCESS_OUTPUT_TOKEN_BUDGET = int(os.getenv("PROCESS_OUTPUT_TOKEN_BUDGET", "4000"))
+
+def strategy_options(overrides=None):
+    """DEFAULT_OPTIONS updated with any non-None overrides"""
+    options = dict(DEFAULT_OPTIONS)
+    options.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    if options["strategy"] != "auto" and options["strategy"] not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{options['strategy']}'; use auto or one of {', '.join(STRATEGIES)}")
+    return options
+
+def choose_strategy(transcript_tokens, context_tokens, options=None):
+    """Return (strategy, reason) for a transcript of transcript_tokens"""
+    options = strategy_options(options)
+    if options["strategy"] != "auto":
+        return options["strategy"], "forced"
+    if transcript_tokens <= options["single_max_tokens"]:
+        return "single", f"<= {options['single_max_tokens']} tokens"
+    limit = min(options["map_reduce_min_tokens"], int(context_tokens * options["context_fraction"]))
+    if transcript_tokens > limit:
+        return "map_reduce", f"> {limit} tokens"
+    return "two_stage", f"<= {limit} tokens"
+
+def plan_strategy(transcript, provider, options=None):
+    """
+    Pick the strategy for transcript with provider's models.
+
+    The context limit is the smaller of the analysis and simplification
+    models' context windows, since both are sent the transcript; a task
+    routed elsewhere with {TASK}_PROVIDER uses that provider's model. Returns a dict with the strategy, the reason, the
+    token counts it was based on and the chunk size map_reduce would use.
+    """
+    options = strategy_options(options)
+    analysis_model = get_model_for_task(get_provider_for_task("analysis", provider), "analysis")
+    simplification_model = get_model_for_task(get_provider_for_task("simplification", provider), "simplification")
+    context_tokens = min(get_context_window(analysis_model), get_context_window(simplification_model))
+    transcript_tokens = estimate_tokens(transcript, analysis_model)
+    strategy, reason = choose_strategy(transcript_tokens, context_tokens, options)
+    return {
+        "strategy": strategy,
+        "reason": reason,
+        "transcript_tokens": transcript_tokens,
+        "context_tokens": context_tokens,
+        "chunk_tokens": min(options["chunk_tokens"], int(context_tokens * options["context_fraction"])),
+    }
+
+def split_transcript(text, max_tokens):
+    """
+    Split text into chunks of about max_tokens each.
+
+    Chunks end at a sentence break when there is one in the second half of
+    the chunk, otherwise at a space, so words are never cut.
+    """
+    max_chars = max(int(max_tokens * CHARS_PER_TOKEN), 1)
+    chunks = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        cut = text.rfind(". ", start + max_chars // 2, end)
+        cut = cut + 1 if cut != -1 else text.rfind(" ", start, end)
+        if cut <= start:
+            cut = end
+        chunks.append(text[start:cut].strip())
+        start = cut
+    if text[start:].strip():
+        chunks.append(text[start:].strip())
+    return chunks
+
+def estimate_answer_tokens(question_count):
+    """Expected output tokens for rephrasing and answering a topic with question_count questions"""
+    return TITLE_OUTPUT_TOKENS + ANSWER_OUTPUT_TOKENS * question_count
+
+def pack_topics(topics, budget=PROCESS_OUTPUT_TOKEN_BUDGET):
+    """
+    Group Topics, in order, into packs whose expected answers fit budget.
+
+    A topic that doesn't fit on its own still gets a pack of its own. A budget
+    of 0 (or less) puts every topic in its own pack.
+    """
+    packs, current, used = [], [], 0
+    for topic in topics:
+        tokens = estimate_answer_tokens(len(topic.questions))
+        if current and (budget <= 0 or used + tokens > budget):
+            packs.append(current)
+            current, used = [], 0
+        current.append(topic)
+        used += tokens
+    if current:
+        packs.append(current)
+    return packs
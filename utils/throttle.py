@@ -0,0 +1,114 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+from utils.deadline import sleep_before_retry
+
+logger = logging.getLogger(__name__)
+
+# Domains whose requests are rate limited, and how hard
+THROTTLED_DOMAINS = ("youtube.com",)
+YOUTUBE_MAX_CONCURRENCY = int(os.getenv("YOUTUBE_MAX_CONCURRENCY", "4"))
+YOUTUBE_RPS = float(os.getenv("YOUTUBE_RPS", "2"))
+YOUTUBE_BACKOFF_SECONDS = float(os.getenv("YOUTUBE_BACKOFF_SECONDS", "30"))
+YOUTUBE_MAX_BACKOFF_SECONDS = float(os.getenv("YOUTUBE_MAX_BACKOFF_SECONDS", "900"))
+
+class HostThrottle:
+    """
+    Concurrency and request-rate limit for one host, with a shared cooldown.
+
+    Every request to the host goes through slot(). When the host blocks us
+    (HTTP 429, captcha page), report_blocked() puts the whole process into a
+    cooldown that grows exponentially with consecutive blocks; report_ok()
+    resets it. All threads wait out the cooldown instead of each one hammering
+    the host and extending the block.
+    """
+    def __init__(self, name, concurrency=YOUTUBE_MAX_CONCURRENCY, rps=YOUTUBE_RPS,
+                 backoff=YOUTUBE_BACKOFF_SECONDS, max_backoff=YOUTUBE_MAX_BACKOFF_SECONDS):
+        self.name = name
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._semaphore = threading.BoundedSemaphore(max(concurrency, 1))
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+        self._cooldown_until = 0.0
+        self.strikes = 0
+        self.stats = {"requests": 0, "blocked": 0, "waited_seconds": 0.0}
+
+    def cooldown_remaining(self):
+        """Seconds until requests may resume (0 when not cooling down)"""
+        return max(self._cooldown_until - time.monotonic(), 0.0)
+
+    def _reserve_start(self):
+        """Reserve the next start time allowed by the rate limit and cooldown"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start, self._cooldown_until)
+            self._next_start = start + self.interval
+            self.stats["requests"] += 1
+            return start - now
+
+    @contextmanager
+    def slot(self):
+        """Hold one of the host's concurrent slots for the duration of a request"""
+        with self._semaphore:
+            delay = self._reserve_start()
+            # A block reported while we waited pushes the start back further
+            while delay > 0:
+                # A cooldown longer than the run's deadline fails the request instead of outliving the run
+                sleep_before_retry(delay)
+                self.stats["waited_seconds"] += delay
+                delay = self.cooldown_remaining()
+            yield
+
+    def report_blocked(self, retry_after=None):
+        """Start (or extend) the cooldown after a 429 or block; returns its length in seconds"""
+        with self._lock:
+            self.strikes += 1
+            self.stats["blocked"] += 1
+            delay = min(self.backoff * 2 ** (self.strikes - 1), self.max_backoff)
+            if retry_after:
+                delay = max(delay, retry_after)
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + delay)
+        logger.warning(f"{self.name} is rate limiting us; pausing requests for {delay:.0f}s (strike {self.strikes})")
+        return delay
+
+    def report_ok(self):
+        """A request succeeded, so the next block starts from the base backoff again"""
+        if self.strikes:
+            with self._lock:
+                self.strikes = 0
+
+_throttles = {}
+_throttles_lock = threading.Lock()
+
+def _throttled_domain(host):
+    for domain in THROTTLED_DOMAINS:
+        if host == domain or host.endswith("." + domain):
+            return domain
+    return None
+
+def get_throttle(url):
+    """The process-wide throttle for url's host, or None if the host isn't throttled"""
+    domain = _throttled_domain((urlsplit(url).hostname or "").lower())
+    if domain is None:
+        return None
+    with _throttles_lock:
+        if domain not in _throttles:
+            _throttles[domain] = HostThrottle(domain)
+        return _throttles[domain]
+
+def reset_throttles():
+    """Forget all throttle state (tests)"""
+    with _throttles_lock:
+        _throttles.clear()
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (HTTP dates are ignored)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
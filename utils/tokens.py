@@ -0,0 +1,38 @@
+import math
+
+# tiktoken is optional: exact counts for OpenAI models when installed,
+# a character-based estimate otherwise
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4.0
+
+_encodings = {}
+
+def _get_encoding(model):
+    """Return a cached tiktoken encoding for model, or None if unavailable"""
+    if tiktoken is None or not model:
+        return None
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return _encodings[model]
+
+def estimate_tokens(text, model=None):
+    """
+    Estimate the number of tokens in text without calling any API.
+
+    Uses tiktoken for OpenAI models when it is installed; otherwise assumes about
+    four characters per token, which is close for English prose on both OpenAI
+    and Gemini tokenizers.
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model) if model and not model.startswith("gemini") else None
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN))
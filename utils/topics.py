@@ -0,0 +1,111 @@
+class Question:
+    """
+    One question about a topic, with its rephrasing and answer once processed.
+
+    id is assigned when the question is extracted (e.g. "t2q1") and never
+    changes; prompts carry it to the LLM and responses carry it back, so
+    answers are matched by ID rather than by the question's exact wording.
+    """
+    __slots__ = ("id", "original", "rephrased", "answer")
+
+    def __init__(self, id, original, rephrased="", answer=""):
+        self.id = id
+        self.original = original
+        self.rephrased = rephrased
+        self.answer = answer
+
+    def __repr__(self):
+        return f"Question({self.id!r}, {self.original!r})"
+
+    def __getitem__(self, key):
+        """Dict-style read access, for code written against the JSON shape"""
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+    def to_dict(self):
+        return {"id": self.id, "original": self.original, "rephrased": self.rephrased, "answer": self.answer}
+
+    @classmethod
+    def from_dict(cls, data, id=None):
+        """Build from a dict (or a bare question string, as extraction returns them)"""
+        if isinstance(data, str):
+            return cls(id, data)
+        question_id = str(data["id"]) if data.get("id") is not None else id
+        return cls(question_id, data.get("original") or "", data.get("rephrased") or "", data.get("answer") or "")
+
+class Topic:
+    """
+    A topic with its questions.
+
+    start is the time in seconds where the topic begins (chapters, live
+    windows), or None.
+    """
+    __slots__ = ("id", "title", "rephrased_title", "questions", "start")
+
+    def __init__(self, id, title, questions=None, rephrased_title=None, start=None):
+        self.id = id
+        self.title = title
+        self.questions = questions if questions is not None else []
+        self.rephrased_title = rephrased_title
+        self.start = start
+
+    def __repr__(self):
+        return f"Topic({self.id!r}, {self.title!r}, {len(self.questions)} questions)"
+
+    def __getitem__(self, key):
+        """Dict-style read access, for code written against the JSON shape"""
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def to_dict(self):
+        data = {"id": self.id, "title": self.title, "questions": [q.to_dict() for q in self.questions]}
+        if self.rephrased_title is not None:
+            data["rephrased_title"] = self.rephrased_title
+        if self.start is not None:
+            data["start"] = self.start
+        return data
+
+    @classmethod
+    def from_dict(cls, data, id=None):
+        """Build from a dict; questions without an ID get one derived from the topic's"""
+        topic_id = str(data["id"]) if data.get("id") is not None else id
+        questions = [Question.from_dict(q, f"{topic_id}q{i}" if topic_id else None)
+                     for i, q in enumerate(data.get("questions") or [], 1)]
+        return cls(topic_id, data.get("title") or "", questions, data.get("rephrased_title"), data.get("start"))
+
+    @classmethod
+    def coerce(cls, topic):
+        """topic as a Topic, converting from a dict if needed"""
+        return topic if isinstance(topic, cls) else cls.from_dict(topic)
+
+def assign_ids(topics, prefix=""):
+    """Give topics IDs t1, t2, ... and their questions t1q1, t1q2, ..., each with prefix"""
+    for i, topic in enumerate(topics, 1):
+        topic.id = f"{prefix}t{i}"
+        for j, question in enumerate(topic.questions, 1):
+            question.id = f"{topic.id}q{j}"
+    return topics
+
+def ensure_ids(topics):
+    """topics as Topics, numbered with assign_ids unless every topic and question already has an ID"""
+    topics = [Topic.coerce(topic) for topic in topics]
+    if not all(topic.id and all(q.id for q in topic.questions) for topic in topics):
+        assign_ids(topics)
+    return topics
+
+def topics_to_dicts(topics):
+    """JSON-ready list of topic dicts"""
+    return [topic.to_dict() if isinstance(topic, Topic) else topic for topic in topics]
+
+def topics_from_dicts(data):
+    """Topics from topics_to_dicts output"""
+    return [Topic.coerce(topic) for topic in data]
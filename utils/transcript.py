@@ -0,0 +1,138 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from io import StringIO
+
+SEPARATOR = " "
+
+def _field(entry, name):
+    """Read a field from a transcript entry (dict or snippet object)"""
+    return entry[name] if isinstance(entry, dict) else getattr(entry, name)
+
+class Transcript:
+    """
+    Timestamped transcript stored as one text buffer plus parallel arrays.
+
+    Segment i covers text[offsets[i]:offsets[i + 1] - 1] (the separator is not
+    part of the segment) and starts at starts[i] seconds for durations[i]
+    seconds. Compared to a list of per-segment dicts this uses a few bytes per
+    segment instead of a few hundred, and `text` is the same string the flow
+    sends to the LLM, so keeping timestamps costs no extra copy of the text.
+    """
+    __slots__ = ("text", "offsets", "starts", "durations")
+
+    def __init__(self, text="", offsets=None, starts=None, durations=None):
+        self.text = text
+        self.offsets = offsets if offsets is not None else array("I")
+        self.starts = starts if starts is not None else array("d")
+        self.durations = durations if durations is not None else array("d")
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Build a transcript from API entries with text, start and duration.
+
+        The text is exactly what " ".join(entry["text"] ...) produced, so the
+        prompts see the same transcript as before.
+        """
+        buffer = StringIO()
+        offsets, starts, durations = array("I"), array("d"), array("d")
+        position = 0
+        for entry in entries:
+            text = _field(entry, "text")
+            if offsets:
+                buffer.write(SEPARATOR)
+                position += len(SEPARATOR)
+            offsets.append(position)
+            starts.append(float(_field(entry, "start")))
+            durations.append(float(_field(entry, "duration") or 0.0))
+            buffer.write(text)
+            position += len(text)
+        return cls(buffer.getvalue(), offsets, starts, durations)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __repr__(self):
+        return f"Transcript({len(self)} segments, {len(self.text)} chars, {self.duration:.0f}s)"
+
+    @property
+    def duration(self):
+        """Time from the first segment's start to the last segment's end"""
+        if not self.offsets:
+            return 0.0
+        return self.starts[-1] + self.durations[-1] - self.starts[0]
+
+    def _segment_end(self, index):
+        """Character offset just past segment index"""
+        if index + 1 < len(self.offsets):
+            return self.offsets[index + 1] - len(SEPARATOR)
+        return len(self.text)
+
+    def segment(self, index):
+        """Return (start, duration, text) for segment index"""
+        return (self.starts[index], self.durations[index],
+                self.text[self.offsets[index]:self._segment_end(index)])
+
+    def segment_at_time(self, seconds):
+        """Index of the segment being spoken at time seconds (O(log n))"""
+        if not self.offsets:
+            raise IndexError("empty transcript")
+        return max(bisect_right(self.starts, seconds) - 1, 0)
+
+    def segment_at_offset(self, offset):
+        """Index of the segment containing character offset (O(log n))"""
+        if not self.offsets:
+            raise IndexError("empty transcript")
+        return max(bisect_right(self.offsets, offset) - 1, 0)
+
+    def offset_at_time(self, seconds):
+        """Character offset where the segment spoken at time seconds begins"""
+        return self.offsets[self.segment_at_time(seconds)]
+
+    def time_at_offset(self, offset):
+        """Start time of the segment containing character offset"""
+        return self.starts[self.segment_at_offset(offset)]
+
+    def slice_segments(self, first, last):
+        """Return a new Transcript with segments first..last-1"""
+        last = min(last, len(self.offsets))
+        if first >= last:
+            return Transcript()
+        base = self.offsets[first]
+        end = self._segment_end(last - 1)
+        offsets = array("I", (o - base for o in self.offsets[first:last]))
+        return Transcript(self.text[base:end], offsets, self.starts[first:last], self.durations[first:last])
+
+    def slice_time(self, start, end):
+        """Return the segments that start in [start, end)"""
+        first = bisect_left(self.starts, start)
+        last = bisect_left(self.starts, end)
+        return self.slice_segments(first, last)
+
+    def windows(self, seconds, overlap=0.0):
+        """Yield consecutive windows of roughly `seconds` each, overlapping by `overlap` seconds"""
+        if not self.offsets or seconds <= 0:
+            return
+        step = max(seconds - overlap, 1e-6)
+        window_start = self.starts[0]
+        end_time = self.starts[-1] + self.durations[-1]
+        while window_start < end_time:
+            window = self.slice_time(window_start, window_start + seconds)
+            if len(window):
+                yield window
+            window_start += step
+
+    def to_dict(self):
+        """Serialize to JSON-compatible data"""
+        return {
+            "text": self.text,
+            "offsets": self.offsets.tolist(),
+            "starts": self.starts.tolist(),
+            "durations": self.durations.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Inverse of to_dict"""
+        return cls(data["text"], array("I", data["offsets"]),
+                   array("d", data["starts"]), array("d", data["durations"]))
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+from utils.files import write_json
+from utils.transcript import Transcript
+
+class TranscriptCache:
+    """
+    On-disk cache of fetched video information, one JSON file per video ID.
+
+    Lets a planning run and the batch run that follows it (or several shards on
+    a shared filesystem) fetch each transcript only once.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, video_id, kind="json"):
+        return os.path.join(self.directory, f"{video_id}.{kind}")
+
+    def get(self, video_id):
+        """Return the cached video info, or None"""
+        try:
+            with open(self._path(video_id), encoding="utf-8") as f:
+                video_info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(video_info.get("segments"), dict):
+            segments = Transcript.from_dict(video_info["segments"])
+            video_info["segments"] = segments
+            video_info["transcript"] = segments.text
+        return video_info
+
+    def put(self, video_id, video_info):
+        """Store video info atomically so concurrent readers never see a partial file"""
+        data = dict(video_info)
+        if isinstance(data.get("segments"), Transcript):
+            # The segments carry the transcript text; don't store it twice
+            data["segments"] = data["segments"].to_dict()
+            data.pop("transcript", None)
+        write_json(self._path(video_id), data, indent=None)
+
+    def get_failure(self, video_id):
+        """Return the recorded permanent failure for a video if it hasn't expired, or None"""
+        path = self._path(video_id, "unavailable.json")
+        try:
+            with open(path, encoding="utf-8") as f:
+                failure = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if failure.get("expires_at", 0) <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return failure
+
+    def put_failure(self, video_id, error, ttl):
+        """Record that a video can't be processed, for ttl seconds"""
+        write_json(self._path(video_id, "unavailable.json"),
+                   {"error": error, "expires_at": time.time() + ttl}, indent=None)
@@ -0,0 +1,63 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+class UsageMeter:
+    """
+    LLM calls made inside track_usage(), with the tokens providers reported.
+
+    One meter is shared by every thread and task the run spawns, so it locks.
+    tokens is None for a model whose provider reported no token counts.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+        self.prepared = 0
+        self.models = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider, model, tokens=None):
+        """Count a successful provider call"""
+        if not isinstance(tokens, int):
+            tokens = None
+        with self._lock:
+            self.calls += 1
+            self.tokens += tokens or 0
+            entry = self.models.setdefault(f"{provider}/{model}", {"calls": 0, "tokens": None})
+            entry["calls"] += 1
+            if tokens is not None:
+                entry["tokens"] = (entry["tokens"] or 0) + tokens
+
+    def record_prepared(self):
+        """Count a call answered from prepared responses, without a request"""
+        with self._lock:
+            self.prepared += 1
+
+    def to_dict(self):
+        with self._lock:
+            return {"calls": self.calls, "tokens": self.tokens, "prepared": self.prepared,
+                    "models": {name: dict(entry) for name, entry in self.models.items()}}
+
+_current_meter: ContextVar = ContextVar("llm_usage_meter", default=None)
+
+@contextmanager
+def track_usage(meter=None):
+    """Count the LLM calls made inside this block on meter (a new one by default); yields the meter"""
+    meter = meter if meter is not None else UsageMeter()
+    token = _current_meter.set(meter)
+    try:
+        yield meter
+    finally:
+        _current_meter.reset(token)
+
+def record_call(provider, model, tokens=None):
+    """Count a provider call on the current run's meter, if any"""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.record(provider, model, tokens)
+
+def record_prepared():
+    """Count a prepared response on the current run's meter, if any"""
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.record_prepared()
@@ -0,0 +1,89 @@
+import os
+from html.parser import HTMLParser
+import requests
+
+OEMBED_URL = "https://www.youtube.com/oembed"
+WATCH_URL = "https://www.youtube.com/watch?v={video_id}"
+
+# (connect, read) timeouts in seconds for metadata requests
+METADATA_TIMEOUT = (float(os.getenv("METADATA_CONNECT_TIMEOUT", "5")),
+                    float(os.getenv("METADATA_READ_TIMEOUT", "10")))
+# The fallback stops reading the watch page after this many bytes even without a title
+MAX_PAGE_BYTES = 512 * 1024
+CHUNK_SIZE = 16 * 1024
+
+class _HeadParser(HTMLParser):
+    """
+    Streaming tokenizer that collects <title> and <meta> tags from a page head.
+
+    Feed it chunks as they arrive and stop as soon as `done` is set, instead of
+    downloading the whole page and building a DOM.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.meta = {}
+        self.done = False
+        self._in_title = False
+        self._title_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and self.title is None:
+            self._in_title = True
+        elif tag == "meta":
+            attrs = dict(attrs)
+            key = attrs.get("property") or attrs.get("name") or attrs.get("itemprop")
+            if key and "content" in attrs:
+                self.meta.setdefault(key, attrs["content"])
+        elif tag == "body":
+            self.done = True
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = "".join(self._title_parts).strip()
+        elif tag == "head":
+            self.done = True
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title_parts.append(data)
+
+def _fetch_oembed(video_id, session):
+    """Title and channel from the oEmbed endpoint (a few hundred bytes of JSON)"""
+    response = session.get(OEMBED_URL, params={"url": WATCH_URL.format(video_id=video_id), "format": "json"},
+                           timeout=METADATA_TIMEOUT)
+    response.raise_for_status()
+    data = response.json()
+    return {"title": data["title"], "author": data.get("author_name")}
+
+def _fetch_from_page(url, session):
+    """Stream the watch page and stop once the head has been parsed"""
+    parser = _HeadParser()
+    received = 0
+    with session.get(url, stream=True, timeout=METADATA_TIMEOUT) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE, decode_unicode=True):
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode(response.encoding or "utf-8", errors="replace")
+            parser.feed(chunk)
+            received += len(chunk)
+            if parser.done or received >= MAX_PAGE_BYTES:
+                break
+    title = parser.meta.get("og:title") or parser.meta.get("title") or parser.title
+    if not title:
+        raise ValueError("No title found on video page")
+    return {"title": title.replace(" - YouTube", ""), "author": parser.meta.get("author")}
+
+def fetch_video_metadata(url, video_id, session=None):
+    """
+    Get a video's title (and channel name when available) without downloading the watch page.
+
+    Tries the oEmbed endpoint first, then falls back to streaming the watch page
+    head. Raises the fallback's exception if both fail.
+    """
+    session = session or requests
+    try:
+        return _fetch_oembed(video_id, session)
+    except (requests.RequestException, ValueError, KeyError):
+        return _fetch_from_page(url, session)
@@ -1,7 +1,44 @@
+import contextvars
+import os
 import re
-import requests
-from bs4 import BeautifulSoup
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import youtube_transcript_api
 from youtube_transcript_api import YouTubeTranscriptApi
+from utils.transcript import Transcript
+from utils.transcript_cache import TranscriptCache
+from utils.http_session import get_session, HTTP_BLOCK_RETRIES
+from utils.throttle import get_throttle
+from utils.video_metadata import fetch_video_metadata
+
+# Recently fetched videos, kept so long-running processes (worker, server) don't
+# re-download the same transcript for retries or for a second provider
+VIDEO_INFO_CACHE_SIZE = int(os.getenv("VIDEO_INFO_CACHE_SIZE", "64"))
+_video_info_cache = OrderedDict()
+_video_info_cache_lock = threading.Lock()
+
+# Errors meaning YouTube is refusing our requests rather than that the video has no transcript
+BLOCK_ERRORS = tuple(getattr(youtube_transcript_api, name) for name in ("RequestBlocked", "IpBlocked")
+                     if hasattr(youtube_transcript_api, name))
+
+# Errors that won't go away by retrying: no captions, private/removed/age-gated videos, bad IDs
+PERMANENT_ERRORS = tuple(getattr(youtube_transcript_api, name) for name in (
+    "TranscriptsDisabled", "NoTranscriptFound", "VideoUnavailable",
+    "VideoUnplayable", "AgeRestricted", "InvalidVideoId") if hasattr(youtube_transcript_api, name))
+
+# Permanent failures are remembered for this long, so batch runs skip those videos
+# instead of retrying them (captions are sometimes added later, hence the expiry)
+NEGATIVE_CACHE_TTL = float(os.getenv("NEGATIVE_CACHE_TTL", str(7 * 24 * 3600)))
+_failure_cache = {}
+
+# Runs title lookups while the calling thread downloads the transcript
+_fetch_executor = ThreadPoolExecutor(max_workers=int(os.getenv("METADATA_FETCH_THREADS", "4")),
+                                     thread_name_prefix="metadata")
+
+# Optional on-disk cache shared between runs (and machines, on a shared filesystem)
+_disk_cache = TranscriptCache(os.environ["TRANSCRIPT_CACHE_DIR"]) if os.getenv("TRANSCRIPT_CACHE_DIR") else None
 
 def extract_video_id(url):
     """Extract YouTube video ID from URL"""
@@ -9,34 +46,128 @@ def extract_video_id(url):
     match = re.search(pattern, url)
     return match.group(1) if match else None
 
-def get_video_info(url):
-    """Get video title, transcript and thumbnail"""
+def set_transcript_cache_dir(directory):
+    """Persist fetched video information under directory (None disables the disk cache)"""
+    global _disk_cache
+    _disk_cache = TranscriptCache(directory) if directory else None
+
+def clear_video_info_cache():
+    """Forget all cached video information, including remembered failures"""
+    with _video_info_cache_lock:
+        _video_info_cache.clear()
+        _failure_cache.clear()
+
+def get_cached_failure(url):
+    """
+    The error for a video already known to be unprocessable, or None.
+
+    Only looks at the negative cache (memory, then disk); never fetches.
+    """
+    video_id = extract_video_id(url)
+    if not video_id:
+        return "Invalid YouTube URL"
+    with _video_info_cache_lock:
+        failure = _failure_cache.get(video_id)
+        if failure is not None and failure["expires_at"] <= time.time():
+            del _failure_cache[video_id]
+            failure = None
+    if failure is None and _disk_cache is not None:
+        failure = _disk_cache.get_failure(video_id)
+        if failure is not None:
+            with _video_info_cache_lock:
+                _failure_cache[video_id] = failure
+    return failure["error"] if failure else None
+
+def _remember_failure(video_id, error):
+    with _video_info_cache_lock:
+        _failure_cache[video_id] = {"error": error, "expires_at": time.time() + NEGATIVE_CACHE_TTL}
+    if _disk_cache is not None:
+        _disk_cache.put_failure(video_id, error, NEGATIVE_CACHE_TTL)
+
+def get_video_info(url, use_cache=True):
+    """
+    Get video title, transcript and thumbnail.
+
+    Failures come back as {"error": message, "permanent": bool}. Permanent
+    failures (invalid URL, no captions, private video, ...) are worth neither
+    retrying nor fetching again until NEGATIVE_CACHE_TTL has passed.
+    """
     video_id = extract_video_id(url)
     if not video_id:
-        return {"error": "Invalid YouTube URL"}
+        return {"error": "Invalid YouTube URL", "permanent": True}
+    
+    if use_cache:
+        with _video_info_cache_lock:
+            cached = _video_info_cache.get(video_id)
+            if cached is not None:
+                _video_info_cache.move_to_end(video_id)
+                return dict(cached)
+        error = get_cached_failure(url)
+        if error is not None:
+            return {"error": error, "permanent": True}
+    
+    info = _disk_cache.get(video_id) if use_cache and _disk_cache is not None else None
+    if info is None:
+        info = _fetch_video_info(url, video_id)
+        if use_cache and _disk_cache is not None and "error" not in info:
+            _disk_cache.put(video_id, info)
+        if use_cache and info.get("permanent"):
+            _remember_failure(video_id, info["error"])
+    
+    # Only successful lookups are cached
+    if use_cache and "error" not in info and VIDEO_INFO_CACHE_SIZE > 0:
+        with _video_info_cache_lock:
+            _video_info_cache[video_id] = info
+            while len(_video_info_cache) > VIDEO_INFO_CACHE_SIZE:
+                _video_info_cache.popitem(last=False)
+        info = dict(info)
     
+    return info
+
+def _fetch_video_info(url, video_id):
+    """Download title and transcript for a video, concurrently over the shared session"""
+    session = get_session()
+    # Get title from the metadata endpoint rather than the full watch page
+    metadata_future = _fetch_executor.submit(contextvars.copy_context().run,
+                                             fetch_video_metadata, url, video_id, session)
     try:
-        # Get title using BeautifulSoup
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        title_tag = soup.find('title')
-        title = title_tag.text.replace(" - YouTube", "")
-        
+        # Get transcript, keeping segment timestamps in a compact form
+        segments = Transcript.from_entries(_fetch_transcript_entries(video_id, session))
+        metadata = metadata_future.result()
+        title = metadata["title"]
+
         # Get thumbnail
         thumbnail_url = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
-        
-        # Get transcript
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
-        transcript = " ".join([entry["text"] for entry in transcript_list])
-        
+
         return {
             "title": title,
-            "transcript": transcript,
+            "author": metadata.get("author"),
+            "transcript": segments.text,
+            "segments": segments,
             "thumbnail_url": thumbnail_url,
             "video_id": video_id
         }
     except Exception as e:
-        return {"error": str(e)}
+        return {"error": str(e), "permanent": isinstance(e, PERMANENT_ERRORS)}
+
+def _fetch_transcript_entries(video_id, session=None):
+    """
+    Transcript entries from youtube-transcript-api, fetched over the shared
+    session so they are pooled and throttled with our other YouTube requests.
+
+    A block (captcha page or IP ban, which YouTube often serves with status 200)
+    puts the shared YouTube throttle into cooldown before retrying, the same
+    way the session handles 429 responses.
+    """
+    throttle = get_throttle("https://www.youtube.com/")
+    for attempt in range(HTTP_BLOCK_RETRIES + 1):
+        try:
+            return YouTubeTranscriptApi(http_client=session or get_session()).fetch(video_id)
+        except BLOCK_ERRORS:
+            throttle.report_blocked()
+            if attempt == HTTP_BLOCK_RETRIES:
+                raise
+            # The next attempt waits out the cooldown in throttle.slot()
 
 if __name__ == "__main__":
     test_url = "https://www.youtube.com/watch?v=_1f-o0nqpEI&t"
@@ -0,0 +1,284 @@
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from flow import create_youtube_processor_flow
+from utils.call_llm import use_provider, PROVIDERS
+from utils.deadline import Deadline, use_deadline, parse_duration
+from utils.job_queue import JobQueue, DEFAULT_VISIBILITY_TIMEOUT, LANES
+from utils.topics import topics_to_dicts
+from utils.youtube_processor import get_video_info
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class Heartbeat:
+    """Keep a job's lease alive from a background thread while the flow runs"""
+    def __init__(self, queue, job_id, worker_id, interval):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.interval):
+                if not self.queue.heartbeat(self.job_id, self.worker_id):
+                    logger.warning(f"Lost lease on job {self.job_id}")
+                    return
+        finally:
+            self.queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+class Worker:
+    """
+    Resident worker that pulls jobs from the queue and runs them through the flow.
+
+    The worker runs `slots` jobs at a time. The first `interactive_slots` of them
+    only take interactive jobs, so an analyst's request never waits behind a bulk
+    backlog, and every slot checks the interactive lane before anything else. A
+    background prober fetches transcripts for up to `probe_window` pending bulk
+    jobs and records their length, which lets the queue hand out the shortest
+    transcripts first; slots hold off on bulk work while it has probing to do.
+    Probes are claimed in the queue, so workers sharing it never fetch the same
+    video twice, and fetched transcripts stay in the in-process cache, so the
+    probe is not repeated when the job runs.
+
+    job_deadline bounds each job's run in seconds (see utils.deadline), so a
+    stuck socket or provider fails the job instead of holding its slot.
+    """
+    def __init__(self, queue, worker_id=None, poll_interval=2.0, retry_delay=30,
+                 slots=1, interactive_slots=0, probe_window=20, job_deadline=None):
+        if interactive_slots > slots:
+            raise ValueError("interactive_slots cannot exceed slots")
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.slots = slots
+        self.interactive_slots = interactive_slots
+        self.probe_window = probe_window
+        self.job_deadline = job_deadline
+        # Deadlines of the jobs running now, cancelled on Ctrl-C
+        self._running = set()
+        self._stopping = threading.Event()
+        self._processed = 0
+        self._processed_lock = threading.Lock()
+        # Set while the prober has nothing left to measure, so bulk leases see every known length
+        self._probe_idle = threading.Event()
+        if probe_window <= 0:
+            self._probe_idle.set()
+
+    def stop(self):
+        """Finish the current jobs, then exit the run loop"""
+        self._stopping.set()
+
+    def probe_next(self, prober_id=None):
+        """Measure one pending bulk job's transcript; False when the window is full or nothing is left"""
+        if self.queue.count_pending("bulk", probed=True) >= self.probe_window:
+            return False
+        job = self.queue.claim_unprobed(prober_id or f"{self.worker_id}/probe")
+        if job is None:
+            return False
+        try:
+            video_info = get_video_info(job["url"])
+        except Exception as e:
+            video_info = {"error": str(e)}
+        if "error" in video_info:
+            # Unknown length, not a short one: the job sorts with the unmeasured ones
+            self.queue.set_probe_failed(job["id"], video_info["error"])
+        else:
+            self.queue.set_transcript_chars(job["id"], len(video_info.get("transcript", "")))
+        return True
+
+    def probe_bulk(self):
+        """Record transcript lengths until probe_window pending bulk jobs have one"""
+        while not self._stopping.is_set() and self.probe_next():
+            pass
+
+    def _run_prober(self, once):
+        """Keep the probe window filled until stopped (or, with once, until nothing is left to probe)"""
+        try:
+            while not self._stopping.is_set():
+                if self.probe_next():
+                    self._probe_idle.clear()
+                    continue
+                self._probe_idle.set()
+                if once:
+                    return
+                self._stopping.wait(self.poll_interval)
+        except Exception as e:
+            logger.error(f"Transcript prober stopped: {e}")
+        finally:
+            # Bulk work must never wait on a prober that is gone
+            self._probe_idle.set()
+            self.queue.close()
+
+    def run_job(self, job, worker_id=None):
+        """Run a single leased job through the flow and record the outcome"""
+        worker_id = worker_id or self.worker_id
+        logger.info(f"Job {job['id']} [{job['lane']}]: processing {job['url']} "
+                    f"(attempt {job['attempts']}/{job['max_attempts']})")
+        if job["deadline"] is not None and job["deadline"] < time.time():
+            self.queue.fail(job["id"], worker_id, "deadline passed", retry_delay=0)
+            logger.warning(f"Job {job['id']} skipped: deadline passed")
+            return False
+
+        shared = {"url": job["url"]}
+        deadline = Deadline(self.job_deadline)
+        self._running.add(deadline)
+        try:
+            with Heartbeat(self.queue, job["id"], worker_id, self.queue.visibility_timeout / 3):
+                with use_provider(job["provider"]), use_deadline(deadline):
+                    create_youtube_processor_flow().run(shared)
+        except Exception as e:
+            status = self.queue.fail(job["id"], worker_id, e, retry_delay=self.retry_delay)
+            logger.error(f"❌ Job {job['id']} failed ({status}): {e}")
+            return False
+        finally:
+            self._running.discard(deadline)
+
+        video_info = shared.get("video_info", {})
+        result = {
+            "title": video_info.get("title"),
+            "video_id": video_info.get("video_id"),
+            "topics": topics_to_dicts(shared.get("topics", [])),
+        }
+        if self.queue.complete(job["id"], worker_id, result=result, output_file=shared.get("output_file")):
+            logger.info(f"✅ Job {job['id']} completed: {shared.get('output_file')}")
+        else:
+            logger.warning(f"Job {job['id']} finished after its lease was lost; result discarded")
+        return True
+
+    def _run_slot(self, slot, lanes, once):
+        """Lease and run jobs from the given lanes until stopped"""
+        slot_id = f"{self.worker_id}/{slot}"
+        try:
+            while not self._stopping.is_set():
+                job = None
+                if "interactive" in lanes:
+                    job = self.queue.lease(slot_id, lanes=("interactive",))
+                if job is None and "bulk" in lanes:
+                    if not self._probe_idle.is_set():
+                        # Check the interactive lane again while the prober measures
+                        self._probe_idle.wait(min(self.poll_interval, 0.5))
+                        continue
+                    job = self.queue.lease(slot_id, lanes=("bulk",))
+                if job is None:
+                    if once:
+                        break
+                    self._stopping.wait(self.poll_interval)
+                    continue
+                self.run_job(job, worker_id=slot_id)
+                with self._processed_lock:
+                    self._processed += 1
+        finally:
+            self.queue.close()
+
+    def run(self, once=False):
+        """Run all slots until stopped (or until the queue is empty if once=True)"""
+        logger.info(f"Worker {self.worker_id} started on {self.queue.path} "
+                    f"with {self.slots} slots ({self.interactive_slots} reserved for interactive jobs)")
+        threads = []
+        if self.probe_window > 0 and self.slots > self.interactive_slots:
+            prober = threading.Thread(target=self._run_prober, args=(once,), daemon=True)
+            prober.start()
+            threads.append(prober)
+        else:
+            self._probe_idle.set()
+        for slot in range(self.slots):
+            lanes = ("interactive",) if slot < self.interactive_slots else LANES
+            thread = threading.Thread(target=self._run_slot, args=(slot, lanes, once), daemon=True)
+            thread.start()
+            threads.append(thread)
+        try:
+            # Join with a timeout so Ctrl-C still reaches the main thread
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop()
+            for deadline in list(self._running):
+                deadline.cancel("interrupted")
+            raise
+        logger.info(f"Worker {self.worker_id} stopped after {self._processed} jobs")
+        return self._processed
+
+def main():
+    """Command line entry point for the worker and its queue."""
+    parser = argparse.ArgumentParser(
+        description="Run a resident worker that processes YouTube videos from a SQLite job queue."
+    )
+    parser.add_argument("--db", type=str, default="jobs.db", help="Path to the SQLite job queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Process jobs from the queue")
+    run_parser.add_argument("--visibility-timeout", type=float, default=DEFAULT_VISIBILITY_TIMEOUT,
+                            help="Seconds before an unacknowledged job is handed to another worker")
+    run_parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds to wait when the queue is empty")
+    run_parser.add_argument("--once", action="store_true", help="Exit when the queue is empty")
+    run_parser.add_argument("--slots", type=int, default=1, help="Jobs processed at the same time")
+    run_parser.add_argument("--interactive-slots", type=int, default=0,
+                            help="Slots reserved for the interactive lane")
+    run_parser.add_argument("--probe-window", type=int, default=20,
+                            help="Pending bulk jobs to measure ahead of time for shortest-first ordering (0 disables)")
+    run_parser.add_argument("--deadline", type=parse_duration,
+                            help="Time budget for each job's run, e.g. 180s or 3m (default: none)")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Add a video to the queue")
+    enqueue_parser.add_argument("url", type=str, help="YouTube video URL to process")
+    enqueue_parser.add_argument("--provider", type=str, choices=list(PROVIDERS), help="LLM provider for this job")
+    enqueue_parser.add_argument("--priority", type=int, default=0, help="Higher priority jobs are leased first")
+    enqueue_parser.add_argument("--max-attempts", type=int, default=3, help="Attempts before the job is marked failed")
+    enqueue_parser.add_argument("--lane", type=str, choices=list(LANES), default="bulk",
+                                help="Priority class: interactive jobs always run before bulk jobs")
+    enqueue_parser.add_argument("--deadline", type=float,
+                                help="Seconds from now after which the job should not be started")
+
+    subparsers.add_parser("status", help="Show job counts by status")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        queue = JobQueue(args.db)
+        deadline = time.time() + args.deadline if args.deadline else None
+        job_id = queue.enqueue(args.url, provider=args.provider, priority=args.priority,
+                               max_attempts=args.max_attempts, lane=args.lane, deadline=deadline)
+        print(f"Enqueued job {job_id}")
+        return 0
+
+    if args.command == "status":
+        queue = JobQueue(args.db)
+        for (lane, status), count in sorted(queue.counts(by_lane=True).items()):
+            print(f"{lane} {status}: {count}")
+        return 0
+
+    queue = JobQueue(args.db, visibility_timeout=args.visibility_timeout)
+    worker = Worker(queue, poll_interval=args.poll_interval, slots=args.slots,
+                    interactive_slots=args.interactive_slots, probe_window=args.probe_window,
+                    job_deadline=args.deadline)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    try:
+        worker.run(once=args.once)
+    except KeyboardInterrupt:
+        logger.info("Interrupted; unfinished job will be retried once its lease expires")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())